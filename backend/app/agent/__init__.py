@@ -0,0 +1 @@
+# Voice agent package
@@ -0,0 +1,73 @@
+"""
+LLM function context for the voice agent
+Exposes the agent tools to the LLM; every call goes through the session's
+ToolRunner, so parallel calls run concurrently within their budgets.
+"""
+import json
+from typing import Annotated
+
+from livekit.agents import llm
+
+from app.agent.runner import ToolRunner
+
+
+class NammaGuideFunctions(llm.FunctionContext):
+    """Bengaluru transit, maps and ONDC lookups"""
+
+    def __init__(self, runner: ToolRunner):
+        super().__init__()
+        self.runner = runner
+
+    async def _run(self, name: str, **kwargs) -> str:
+        outcome = (await self.runner.run([(name, kwargs)]))[0]
+        if outcome["status"] != "ok":
+            # Tell the LLM what happened instead of failing the turn
+            return json.dumps({"status": outcome["status"], "message": outcome["error"]})
+        return json.dumps(outcome["result"], default=str)
+
+    @llm.ai_callable(description="Bus and metro journeys between two places in Bengaluru")
+    async def search_routes(
+        self,
+        origin: Annotated[str, llm.TypeInfo(description="Where the trip starts")],
+        destination: Annotated[str, llm.TypeInfo(description="Where the trip ends")],
+    ):
+        return await self._run("search_routes", origin=origin, destination=destination)
+
+    @llm.ai_callable(description="Next buses or metro trains at a stop, station or area")
+    async def next_arrivals(
+        self,
+        stop: Annotated[str, llm.TypeInfo(description="Stop, station or area name")],
+    ):
+        return await self._run("next_arrivals", stop=stop)
+
+    @llm.ai_callable(description="Bus stops and metro stations closest to a place")
+    async def nearest_stops(
+        self,
+        place: Annotated[str, llm.TypeInfo(description="Place or landmark")],
+    ):
+        return await self._run("nearest_stops", place=place)
+
+    @llm.ai_callable(description="Road route with live traffic by car, bike or auto")
+    async def road_route(
+        self,
+        origin: Annotated[str, llm.TypeInfo(description="Start")],
+        destination: Annotated[str, llm.TypeInfo(description="End")],
+        mode: Annotated[str, llm.TypeInfo(description="car, bike or auto")] = "car",
+    ):
+        return await self._run("road_route", origin=origin, destination=destination, mode=mode)
+
+    @llm.ai_callable(description="Auto and cab fare quotes between two places")
+    async def search_rides(
+        self,
+        pickup: Annotated[str, llm.TypeInfo(description="Pickup place")],
+        dropoff: Annotated[str, llm.TypeInfo(description="Drop place")],
+    ):
+        return await self._run("search_rides", pickup=pickup, dropoff=dropoff)
+
+    @llm.ai_callable(description="Restaurants near a place, optionally for a dish or cuisine")
+    async def search_food(
+        self,
+        location: Annotated[str, llm.TypeInfo(description="Area or landmark")],
+        query: Annotated[str, llm.TypeInfo(description="Dish or cuisine, if any")] = "",
+    ):
+        return await self._run("search_food", location=location, query=query or None)
@@ -0,0 +1,62 @@
+"""
+Per-session latency stats for the voice agent
+Times each turn from the final transcript to the LLM's first token, tool
+time and TTS start, and summarizes them when the session ends.
+"""
+import statistics
+import time
+from typing import List, Dict, Any, Optional
+
+# Turn milestones, in the order they normally happen
+MARKS = ("stt_final", "llm_first_token", "tts_start")
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/max in milliseconds"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+class SessionLatency:
+    """Turn timings of one session; mark() milestones, then end_turn()"""
+
+    def __init__(self):
+        self._marks: Dict[str, float] = {}
+        self._tool_seconds_at_start = 0.0
+        self.samples: Dict[str, List[float]] = {
+            "stt_to_first_token": [],
+            "stt_to_tts_start": [],
+            "tool_time": [],
+        }
+
+    def mark(self, event: str, tool_seconds: float = None):
+        """Record a milestone of the current turn; only the first of each counts"""
+        if event not in MARKS:
+            raise ValueError(f"Unknown latency mark: {event}")
+        if event == "stt_final" and tool_seconds is not None and "stt_final" not in self._marks:
+            self._tool_seconds_at_start = tool_seconds
+        self._marks.setdefault(event, time.monotonic())
+
+    def _since_stt(self, event: str) -> Optional[float]:
+        if "stt_final" in self._marks and event in self._marks:
+            return max(0.0, self._marks[event] - self._marks["stt_final"])
+        return None
+
+    def end_turn(self, tool_seconds: float = None):
+        """Close the turn; tool_seconds is the runner's running total"""
+        for name, event in (("stt_to_first_token", "llm_first_token"), ("stt_to_tts_start", "tts_start")):
+            elapsed = self._since_stt(event)
+            if elapsed is not None:
+                self.samples[name].append(elapsed)
+        if tool_seconds is not None and "stt_final" in self._marks:
+            self.samples["tool_time"].append(tool_seconds - self._tool_seconds_at_start)
+            self._tool_seconds_at_start = tool_seconds
+        self._marks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: percentiles(values) for name, values in self.samples.items() if values}
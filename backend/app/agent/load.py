@@ -0,0 +1,188 @@
+"""
+Agent worker load reporting and job admission
+Each job reports its sessions, event-loop lag and in-flight tool calls to a
+small file; the worker process sums them into the load LiveKit dispatches on
+and rejects jobs it cannot serve with acceptable latency.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import List, Dict, Any
+
+import psutil
+from livekit.agents import JobRequest
+
+logger = logging.getLogger("namma-guide")
+
+LOAD_DIR = os.getenv("AGENT_LOAD_DIR", "agent_load")
+REPORT_INTERVAL = 1.0  # Seconds between a job's load reports
+STALE_AFTER = 5.0  # A report this old belongs to a job that died without cleaning up
+
+# Capacity of one worker; load is the most-used of these, 0..1
+MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", "8"))
+MAX_IN_FLIGHT_TOOLS = int(os.getenv("AGENT_MAX_IN_FLIGHT_TOOLS", "64"))
+MAX_LOOP_LAG = float(os.getenv("AGENT_MAX_LOOP_LAG", "0.25"))  # Seconds
+LOAD_THRESHOLD = float(os.getenv("AGENT_LOAD_THRESHOLD", "0.75"))
+CPU_SAMPLE_INTERVAL = 1.0  # Seconds each CPU reading averages over
+
+# Jobs accepted this recently may not have reported yet; count them anyway
+ADMISSION_GRACE = 10.0
+_admitted: Dict[str, float] = {}  # job id -> when accepted
+
+
+class JobLoadReporter:
+    """Runs in a job: publishes its session count, loop lag and in-flight tool calls"""
+
+    def __init__(self, job_id: str, runner):
+        self.job_id = job_id
+        self.runner = runner
+        self.path = os.path.join(LOAD_DIR, f"{os.getpid()}-{job_id}.json")
+        self.loop_lag = 0.0
+        self._task = None
+
+    def start(self):
+        os.makedirs(LOAD_DIR, exist_ok=True)
+        self._write()
+        self._task = asyncio.create_task(self._run(), name="agent_load_reporter")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(REPORT_INTERVAL)
+            # How late the loop woke us: audio frames and tool results wait this long too
+            self.loop_lag = max(0.0, loop.time() - scheduled - REPORT_INTERVAL)
+            self._write()
+
+    def _write(self):
+        report = {
+            "job_id": self.job_id,
+            "sessions": 1,
+            "in_flight": self.runner.in_flight(),
+            "loop_lag": round(self.loop_lag, 4),
+            "updated": time.time(),
+        }
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(report, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write load report: {e}")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class CpuSampler:
+    """
+    Node CPU use, measured over fixed windows by one background thread
+
+    psutil.cpu_percent() without an interval measures since the previous
+    call, so load_fnc and admission calling it would each see only the gap
+    since the other's call. Both read the last full window instead.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.value = 0.0  # 0..1, 0 until the first window completes
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def read(self) -> float:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="agent_cpu_sampler", daemon=True)
+                self._thread.start()
+        return self.value
+
+    def _run(self):
+        while True:
+            self.value = psutil.cpu_percent(interval=self.interval) / 100.0
+
+
+cpu_sampler = CpuSampler(CPU_SAMPLE_INTERVAL)
+
+
+def read_reports() -> List[Dict[str, Any]]:
+    """Live job reports on this node; stale ones are removed"""
+    reports = []
+    now = time.time()
+    try:
+        names = os.listdir(LOAD_DIR)
+    except FileNotFoundError:
+        return reports
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(LOAD_DIR, name)
+        try:
+            with open(path) as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue  # Removed or being replaced; next poll will see it
+        if now - report.get("updated", 0) > STALE_AFTER:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        reports.append(report)
+    return reports
+
+
+def load_snapshot() -> Dict[str, Any]:
+    """Totals behind worker_load(), for logs and sizing"""
+    reports = read_reports()
+    now = time.monotonic()
+    reported = {r.get("job_id") for r in reports}
+    for job_id, accepted_at in list(_admitted.items()):
+        if job_id in reported or now - accepted_at > ADMISSION_GRACE:
+            _admitted.pop(job_id, None)
+    sessions = sum(r["sessions"] for r in reports) + len(_admitted)
+    in_flight = sum(r["in_flight"] for r in reports)
+    loop_lag = max((r["loop_lag"] for r in reports), default=0.0)
+    cpu = cpu_sampler.read()
+    load = max(
+        sessions / MAX_SESSIONS,
+        in_flight / MAX_IN_FLIGHT_TOOLS,
+        loop_lag / MAX_LOOP_LAG,
+        cpu,
+    )
+    return {
+        "load": round(min(load, 1.0), 3),
+        "sessions": sessions,
+        "starting": len(_admitted),
+        "in_flight_tools": in_flight,
+        "max_loop_lag": loop_lag,
+        "cpu": round(cpu, 3),
+    }
+
+
+def worker_load() -> float:
+    """WorkerOptions.load_fnc: LiveKit stops dispatching here at LOAD_THRESHOLD"""
+    return load_snapshot()["load"]
+
+
+async def admit_job(req: JobRequest):
+    """
+    WorkerOptions.request_fnc: accept a job only with capacity to spare
+
+    The load LiveKit last saw can be a few seconds old, so check again here;
+    a rejected job is offered to another worker.
+    """
+    snapshot = await asyncio.get_running_loop().run_in_executor(None, load_snapshot)
+    if snapshot["load"] >= LOAD_THRESHOLD:
+        logger.warning(f"⛔ Rejecting job {req.id} for room {req.room.name}: {snapshot}")
+        await req.reject()
+        return
+    _admitted[req.id] = time.monotonic()
+    await req.accept(name="Namma Guide")
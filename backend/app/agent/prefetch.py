@@ -0,0 +1,91 @@
+"""
+Speculative prefetch from partial transcripts
+While the user is still speaking, places they mention are geocoded and
+their nearest stops and next arrivals fetched, so the tool calls made
+after end-of-speech find the results ready.
+"""
+import re
+from typing import List, Dict, Optional
+
+from app.agent.runner import ToolRunner
+
+MAX_NGRAM = 5  # Longest place name, in words
+MAX_PLACES_PER_TURN = 3  # Prefetch budget: beyond this, speculation mostly wastes upstream calls
+
+ARRIVAL_WORDS = {"next", "when", "arrive", "arriving", "arrival", "arrivals", "coming", "leaves", "departure"}
+ROUTE_PATTERN = re.compile(r"\bfrom\s+(?P<origin>.+?)\s+to\s+(?P<destination>.+)$")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9 ]", " ", text.lower()).split())
+
+
+class Gazetteer:
+    """Known place names, matched as word n-grams in a transcript"""
+
+    def __init__(self, names: List[str]):
+        self._names: Dict[str, str] = {}
+        for name in names:
+            normalized = _normalize(name)
+            if normalized:
+                self._names.setdefault(normalized, name)
+
+    def find(self, text: str) -> List[str]:
+        """Place names in `text`, longest match first at each position, in spoken order"""
+        words = _normalize(text).split()
+        found, i = [], 0
+        while i < len(words):
+            for n in range(min(MAX_NGRAM, len(words) - i), 0, -1):
+                name = self._names.get(" ".join(words[i:i + n]))
+                if name:
+                    if name not in found:
+                        found.append(name)
+                    i += n
+                    break
+            else:
+                i += 1
+        return found
+
+
+class SpeculativePrefetcher:
+    """Turns partial transcripts into speculative tool calls on a ToolRunner"""
+
+    def __init__(self, runner: ToolRunner, gazetteer: Gazetteer):
+        self.runner = runner
+        self.gazetteer = gazetteer
+        self._places: List[str] = []
+        self._route: Optional[tuple] = None
+
+    def on_partial(self, transcript: str):
+        """Called for every interim transcript of the current utterance"""
+        places = self.gazetteer.find(transcript)
+        for place in places:
+            if place in self._places or len(self._places) >= MAX_PLACES_PER_TURN:
+                continue
+            self._places.append(place)
+            self.runner.prefetch("geocode", place=place)
+            self.runner.prefetch("nearest_stops", place=place)
+
+        words = set(_normalize(transcript).split())
+        if words & ARRIVAL_WORDS:
+            for place in self._places[:1]:
+                self.runner.prefetch("next_arrivals", stop=place)
+
+        # "from X to Y" with both ends recognized: the route search itself
+        match = ROUTE_PATTERN.search(_normalize(transcript))
+        if match and len(places) >= 2:
+            origin = next((p for p in places if _normalize(p) in match.group("origin")), None)
+            destination = next((p for p in places if _normalize(p) in match.group("destination")), None)
+            if origin and destination and (origin, destination) != self._route:
+                self._route = (origin, destination)
+                self.runner.prefetch("search_routes", origin=origin, destination=destination)
+
+    def on_final(self, transcript: str):
+        """The committed transcript may name places the partials did not"""
+        self.on_partial(transcript)
+
+    def end_turn(self):
+        """The agent has answered; drop this utterance's speculation"""
+        self._places.clear()
+        self._route = None
+        return self.runner.end_turn()
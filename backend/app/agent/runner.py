@@ -0,0 +1,191 @@
+"""
+Tool execution for the voice agent
+Runs a turn's tool calls concurrently, each within its latency budget, and
+shares in-flight calls (including speculative prefetches) by canonical key.
+"""
+import asyncio
+import logging
+import time
+from typing import List, Dict, Any, Hashable, Tuple
+
+from app.coalescing import canonical_text
+from app.agent.tools import AgentTools, TOOL_BUDGETS
+
+logger = logging.getLogger("namma-guide")
+
+ToolCall = Tuple[str, Dict[str, Any]]
+
+
+class ToolTimeout(Exception):
+    """A tool did not finish within its budget"""
+
+
+def tool_key(name: str, kwargs: Dict[str, Any]) -> Hashable:
+    """Calls that differ only in case or spacing of their text arguments share a key"""
+    return (name, tuple(sorted(
+        (k, canonical_text(v) if isinstance(v, str) else v) for k, v in kwargs.items()
+    )))
+
+
+class ToolRunner:
+    """
+    Per-session tool executor
+
+    Calls are memoized for the current turn. A prefetch starts a call early
+    and marks it speculative; the first real call for the same key claims it.
+    end_turn() cancels speculative calls nobody claimed, and a result from a
+    closed turn is never served again. With a session context, calls
+    answered earlier in the conversation are reused within their TTL.
+    """
+
+    def __init__(self, tools: AgentTools, budgets: Dict[str, float] = None, context=None):
+        self.tools = tools
+        tools.runner = self
+        self.budgets = {**TOOL_BUDGETS, **(budgets or {})}
+        self.context = context  # SessionContext of the participant being served
+        self._turn: Dict[Hashable, asyncio.Task] = {}
+        self._started_in: Dict[Hashable, int] = {}  # key -> turn its task was started in
+        self._speculative: Dict[Hashable, float] = {}  # key -> when the prefetch started
+        self.turns = 0
+
+        # Counters for the session's latency report
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.prefetched = 0
+        self.prefetch_hits = 0
+        self.prefetch_wasted = 0
+        self.prefetch_lead_seconds = 0.0  # How much earlier than the real call prefetches started
+        self.context_hits = 0
+        self.tool_seconds = 0.0
+
+    def _start(self, name: str, kwargs: Dict[str, Any]) -> Tuple[Hashable, asyncio.Task]:
+        if name not in self.budgets:
+            raise ValueError(f"Unknown tool: {name}")
+        key = tool_key(name, kwargs)
+        task = self._usable(key)
+        if task is None:
+            task = asyncio.create_task(getattr(self.tools, name)(**kwargs), name=f"tool:{name}")
+            self._turn[key] = task
+            self._started_in[key] = self.turns
+        return key, task
+
+    def _usable(self, key: Hashable):
+        # A finished call is only reused by the turn it belongs to
+        task = self._turn.get(key)
+        if task is None or task.cancelled() or (task.done() and self._started_in.get(key) != self.turns):
+            return None
+        return task
+
+    def prefetch(self, name: str, **kwargs) -> bool:
+        """Start a call speculatively; returns False if it was already running or done"""
+        key = tool_key(name, kwargs)
+        if self._usable(key) is not None or (self.context is not None and self.context.fresh(name, kwargs)):
+            return False
+        self._start(name, kwargs)
+        self._speculative[key] = time.monotonic()
+        self.prefetched += 1
+        return True
+
+    async def call(self, name: str, **kwargs) -> Any:
+        """
+        One tool call within its budget
+
+        On timeout the call keeps running (a follow-up can still use it) and
+        ToolTimeout is raised.
+        """
+        if self.context is not None:
+            found, result = self.context.lookup(name, kwargs)
+            if found:
+                self.context_hits += 1
+                return result
+
+        key, task = self._start(name, kwargs)
+        prefetched_at = self._speculative.pop(key, None)
+        if prefetched_at is not None:
+            self.prefetch_hits += 1
+            self.prefetch_lead_seconds += time.monotonic() - prefetched_at
+
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), self.budgets[name])
+        except asyncio.TimeoutError:
+            raise ToolTimeout(name) from None
+        finally:
+            self.tool_seconds += time.perf_counter() - started
+        if self.context is not None:
+            self.context.put(name, kwargs, result)
+        return result
+
+    async def run(self, calls: List[ToolCall]) -> List[Dict[str, Any]]:
+        """
+        Independent tool calls of one turn, concurrently
+
+        Returns:
+            Per call, in order: {"tool", "status": ok|timeout|error, "result"|"error", "ms"}
+        """
+        return list(await asyncio.gather(*(self._run_one(name, kwargs) for name, kwargs in calls)))
+
+    async def _run_one(self, name: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        self.calls += 1
+        started = time.perf_counter()
+        outcome: Dict[str, Any] = {"tool": name}
+        try:
+            outcome["result"] = await self.call(name, **kwargs)
+            outcome["status"] = "ok"
+        except ToolTimeout:
+            self.timeouts += 1
+            outcome["status"] = "timeout"
+            outcome["error"] = f"{name} is taking longer than usual"
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Tool {name} failed: {e}")
+            outcome["status"] = "error"
+            outcome["error"] = str(e)
+        outcome["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return outcome
+
+    def end_turn(self) -> Dict[Hashable, Any]:
+        """
+        Close the turn: cancel unclaimed prefetches and forget finished calls
+
+        Claimed calls still running (they overran their budget) carry over
+        into the next turn, where a follow-up can pick up their result.
+
+        Returns:
+            Results of the turn's completed, claimed calls by key
+        """
+        completed, running = {}, {}
+        for key, task in self._turn.items():
+            if key in self._speculative:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # Retrieved, so a failed prefetch is not logged as unhandled
+                self.prefetch_wasted += 1
+            elif not task.done():
+                running[key] = task
+            elif not task.cancelled() and task.exception() is None:
+                completed[key] = task.result()
+        self.turns += 1
+        self._turn = running
+        self._started_in = {key: self.turns for key in running}  # Adopted by the next turn
+        self._speculative.clear()
+        return completed
+
+    def in_flight(self) -> int:
+        """Calls still running, speculative ones included"""
+        return sum(not task.done() for task in self._turn.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "tool_seconds": round(self.tool_seconds, 3),
+            "prefetched": self.prefetched,
+            "prefetch_hits": self.prefetch_hits,
+            "prefetch_wasted": self.prefetch_wasted,
+            "prefetch_lead_seconds": round(self.prefetch_lead_seconds, 3),
+            "context_hits": self.context_hits,
+        }
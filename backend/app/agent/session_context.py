@@ -0,0 +1,156 @@
+"""
+Per-session conversational context for the voice agent
+Remembers what a participant has already asked about in this room (places,
+nearest stops, routes, arrivals) so follow-ups are answered from memory.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Hashable, Optional, Tuple
+
+from app.agent.runner import tool_key
+from app.metrics import record_cache
+
+# Seconds a tool result stays usable for follow-ups; arrivals go stale fast
+CONTEXT_TTLS = {
+    "geocode": 3600,
+    "nearest_stops": 3600,
+    "search_routes": 600,
+    "road_route": 120,
+    "search_rides": 60,
+    "search_food": 600,
+    "next_arrivals": 30,
+}
+SUBSCRIPTION_TTL = 900  # Seconds a stop the user asked about stays subscribed
+MAX_ENTRIES = 256  # Per session; oldest results are evicted first
+
+
+class SessionContext:
+    """Tool results and conversation state of one participant in one room"""
+
+    def __init__(self, room: str, identity: str, ttls: Dict[str, float] = None):
+        self.room = room
+        self.identity = identity
+        self.ttls = {**CONTEXT_TTLS, **(ttls or {})}
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()  # key -> (expires_at, result)
+        self._subscriptions: Dict[str, float] = {}  # stop -> expires_at
+        self.last_trip: Optional[Tuple[str, str]] = None  # (origin, destination) of the latest route asked
+        self.touched = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+
+    def fresh(self, name: str, kwargs: Dict[str, Any]) -> bool:
+        """Whether lookup() would hit, without counting it"""
+        entry = self._entries.get(tool_key(name, kwargs))
+        return entry is not None and entry[0] > time.monotonic()
+
+    def lookup(self, name: str, kwargs: Dict[str, Any]) -> Tuple[bool, Any]:
+        """(True, result) if the same call was answered recently, else (False, None)"""
+        key = tool_key(name, kwargs)
+        self.touched = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > self.touched:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            record_cache("agent_context", "hit")
+            return True, entry[1]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        record_cache("agent_context", "miss")
+        return False, None
+
+    def put(self, name: str, kwargs: Dict[str, Any], result: Any):
+        """Remember a tool result; calls differing only in case or spacing share it"""
+        ttl = self.ttls.get(name)
+        # Empty answers may be a transient upstream failure; ask again next time
+        if not ttl or result is None or result == [] or result == {}:
+            return
+        now = time.monotonic()
+        self.touched = now
+        key = tool_key(name, kwargs)
+        self._entries[key] = (now + ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > MAX_ENTRIES:
+            self._entries.popitem(last=False)
+            record_cache("agent_context", "eviction")
+
+        if name in ("search_routes", "road_route"):
+            self.last_trip = (kwargs["origin"], kwargs["destination"])
+        elif name == "next_arrivals":
+            self._subscriptions[kwargs["stop"]] = now + SUBSCRIPTION_TTL
+
+    def subscriptions(self) -> List[str]:
+        """Stops the user recently asked arrivals for"""
+        now = time.monotonic()
+        self._subscriptions = {stop: exp for stop, exp in self._subscriptions.items() if exp > now}
+        return list(self._subscriptions)
+
+    def prune(self) -> int:
+        """Drop expired results; returns how many were dropped"""
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def clear(self):
+        self._entries.clear()
+        self._subscriptions.clear()
+        self.last_trip = None
+
+    def summary(self) -> Dict[str, Any]:
+        """What the conversation is about, for the LLM or the session log"""
+        return {
+            "last_trip": self.last_trip,
+            "arrival_subscriptions": self.subscriptions(),
+            "cached_results": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class SessionContexts:
+    """Contexts of the participants this worker is serving, by (room, identity)"""
+
+    def __init__(self):
+        # A session nobody has touched for this long is dropped even without a disconnect event
+        self.idle_ttl = int(os.getenv("AGENT_SESSION_IDLE_TTL", "1800"))
+        self._sessions: Dict[Tuple[str, str], SessionContext] = {}
+
+    def get(self, room: str, identity: str) -> SessionContext:
+        """The participant's context, created on first use"""
+        self.prune_idle()
+        context = self._sessions.get((room, identity))
+        if context is None:
+            context = self._sessions[(room, identity)] = SessionContext(room, identity)
+        return context
+
+    def drop(self, room: str, identity: str) -> bool:
+        """The participant left; forget everything about their session"""
+        context = self._sessions.pop((room, identity), None)
+        if context is None:
+            return False
+        context.clear()
+        return True
+
+    def drop_room(self, room: str) -> int:
+        """The job for a room ended; drop all of its sessions"""
+        identities = [identity for r, identity in self._sessions if r == room]
+        for identity in identities:
+            self.drop(room, identity)
+        return len(identities)
+
+    def prune_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_ttl
+        idle = [key for key, context in self._sessions.items() if context.touched < cutoff]
+        for key in idle:
+            self.drop(*key)
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# Singleton instance
+session_contexts = SessionContexts()
@@ -0,0 +1,88 @@
+"""
+Voice agent tools
+Transit, maps and mobility lookups the agent can call, over the services
+picked in prewarm. Tools that need another tool's result (a stop needs a
+geocode) go through the runner, so they share its in-flight calls.
+"""
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.tools.catalog_sync import catalog_sync
+
+# Seconds a tool may take before the agent answers without it
+TOOL_BUDGETS = {
+    "geocode": 0.8,
+    "nearest_stops": 1.0,
+    "next_arrivals": 1.0,
+    "search_routes": 2.0,
+    "road_route": 2.0,
+    "search_rides": 3.0,
+    "search_food": 1.5,
+}
+
+NEAREST_STOP_RADIUS_KM = 0.8
+
+
+class AgentTools:
+    """Tool implementations; every public coroutine named in TOOL_BUDGETS is a tool"""
+
+    def __init__(self, transit, maps, mobility):
+        self.transit = transit
+        self.maps = maps
+        self.mobility = mobility
+        self.runner = None  # Set by ToolRunner
+
+    async def _call(self, name: str, **kwargs) -> Any:
+        if self.runner is not None:
+            return await self.runner.call(name, **kwargs)
+        return await getattr(self, name)(**kwargs)
+
+    def place_names(self) -> List[str]:
+        """Names worth recognizing in a transcript"""
+        names = list(self.transit.place_names())
+        pois = getattr(self.maps, "bengaluru_pois", {})
+        names += [name.split(",")[0] for _, _, name in pois.values()]
+        return names
+
+    async def geocode(self, place: str) -> Optional[Tuple[float, float]]:
+        """Coordinates of a place name, or None if the maps service does not know it"""
+        return await self.maps.geocode(place)
+
+    async def nearest_stops(self, place: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """Bus stops and metro stations closest to a place"""
+        if not hasattr(self.transit, "nearby_stops"):
+            # The mock has no stop coordinates; its stops are matched by name instead
+            return [{"stop_name": place, "distance_km": None}]
+        coords = await self._call("geocode", place=place)
+        if coords is None:
+            return []
+        return await self.transit.nearby_stops(coords[0], coords[1], NEAREST_STOP_RADIUS_KM, limit)
+
+    async def next_arrivals(self, stop: str) -> List[Dict[str, Any]]:
+        """Next buses or trains at a stop (or at the stop nearest a place)"""
+        arrivals = await self.transit.get_live_arrivals(stop)
+        if arrivals:
+            return arrivals
+        stops = await self._call("nearest_stops", place=stop)
+        if stops and stops[0]["stop_name"] != stop:
+            return await self.transit.get_live_arrivals(stops[0]["stop_name"])
+        return []
+
+    async def search_routes(self, origin: str, destination: str) -> List[Dict[str, Any]]:
+        """Bus and metro journeys between two places"""
+        return await self.transit.search_routes(origin, destination)
+
+    async def road_route(self, origin: str, destination: str, mode: str = "car") -> Dict[str, Any]:
+        """Driving, bike or auto route with live traffic"""
+        return await self.maps.route(origin, destination, mode)
+
+    async def search_rides(self, pickup: str, dropoff: str) -> List[Dict[str, Any]]:
+        """Auto and cab quotes over ONDC"""
+        return await self.mobility.search_mobility(pickup, dropoff)
+
+    async def search_food(self, location: str, query: str = None) -> List[Dict[str, Any]]:
+        """Restaurants near a place, from the local ONDC catalog"""
+        restaurants = await catalog_sync.search_food(location, query, limit=5)
+        if catalog_sync.food_count == 0 and hasattr(self.mobility, "search_food"):
+            # Nothing synced yet: ask the mobility service rather than answer "no restaurants"
+            return await self.mobility.search_food(location, query, limit=5)
+        return restaurants
@@ -0,0 +1,70 @@
+"""
+Live arrivals push
+Clients subscribe to stops over a WebSocket and receive a snapshot per stop,
+then only the changes, instead of polling for arrivals.
+"""
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from typing import Optional
+import asyncio
+import logging
+import orjson
+
+from app.tools.arrivals_hub import arrivals_hub, ArrivalSubscriber
+
+router = APIRouter(prefix="/api/transport", tags=["transport"])
+logger = logging.getLogger(__name__)
+
+MAX_STOPS_PER_CONNECTION = 10
+
+
+def _error(subscriber: ArrivalSubscriber, message: str):
+    # Through the queue, so _pump stays the socket's only writer
+    subscriber.send(orjson.dumps({"type": "error", "message": message}).decode())
+
+
+async def _pump(websocket: WebSocket, subscriber: ArrivalSubscriber):
+    """Forward the hub's messages for this client"""
+    while True:
+        await websocket.send_text(await subscriber.queue.get())
+
+
+@router.websocket("/arrivals/ws")
+async def arrivals_socket(websocket: WebSocket, stop: Optional[str] = None):
+    """
+    Live arrivals for one or more stops
+
+    Subscribe with ?stop=<name> or by sending
+    {"action": "subscribe" | "unsubscribe", "stop": "<name>"}.
+    Server messages are {"type": "snapshot", "stop", "seq", "arrivals"} and
+    {"type": "diff", "stop", "seq", "upsert", "remove"}, where arrivals are
+    matched by their "id".
+    """
+    await websocket.accept()
+    subscriber = ArrivalSubscriber()
+    sender = asyncio.create_task(_pump(websocket, subscriber))
+    try:
+        if stop:
+            await arrivals_hub.subscribe(subscriber, stop)
+        while True:
+            try:
+                message = await websocket.receive_json()
+                action, stop = message.get("action"), (message.get("stop") or "").strip()
+            except (ValueError, AttributeError):
+                _error(subscriber, 'Expected {"action", "stop"}')
+                continue
+
+            if not stop or action not in ("subscribe", "unsubscribe"):
+                _error(subscriber, "Unknown action or missing stop")
+            elif action == "unsubscribe":
+                arrivals_hub.unsubscribe(subscriber, stop)
+            elif len(subscriber.stops) >= MAX_STOPS_PER_CONNECTION:
+                _error(subscriber, f"At most {MAX_STOPS_PER_CONNECTION} stops per connection")
+            else:
+                await arrivals_hub.subscribe(subscriber, stop)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Arrivals socket error: {e}")
+    finally:
+        sender.cancel()
+        arrivals_hub.disconnect(subscriber)
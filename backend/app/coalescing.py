@@ -0,0 +1,80 @@
+"""
+In-flight request coalescing
+Concurrent requests with the same canonical key share one computation
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class RequestCoalescer:
+    """Share one in-progress computation between identical concurrent requests"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+        # Coalescing metrics
+        self.requests = 0
+        self.leaders = 0
+        self.coalesced = 0
+        self.cancelled_waiters = 0
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run compute() once per key while it is in flight
+
+        Args:
+            key: Canonical request key (identical requests must produce equal keys)
+            compute: Zero-argument coroutine factory doing the actual work
+
+        Returns:
+            The shared result. Exceptions raised by compute() reach every waiter.
+        """
+        self.requests += 1
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t, k=key: self._finish(k, t))
+        else:
+            self.coalesced += 1
+
+        # Shield so a disconnecting waiter (even the first one) never cancels the shared work
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                self.cancelled_waiters += 1
+            raise
+
+    def _finish(self, key: Hashable, task: asyncio.Future):
+        """Drop a completed computation so later requests start fresh"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Coalescing counters and ratio (share of requests served by another request's work)"""
+        return {
+            "name": self.name,
+            "requests": self.requests,
+            "computations": self.leaders,
+            "coalesced": self.coalesced,
+            "coalescing_ratio": round(self.coalesced / self.requests, 4) if self.requests else 0.0,
+            "cancelled_waiters": self.cancelled_waiters,
+            "in_flight": len(self._in_flight),
+        }
+
+
+def canonical_text(value: str) -> str:
+    """Normalize free-text request fields so trivially different spellings share a key"""
+    return " ".join((value or "").lower().split())
+
+
+# Shared coalescers for the search handlers
+transport_coalescer = RequestCoalescer("transport_search")
+discovery_coalescer = RequestCoalescer("discovery_search")
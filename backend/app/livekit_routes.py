@@ -0,0 +1,98 @@
+"""
+LiveKit token endpoints
+Join tokens for voice sessions, single or pre-issued in bulk for a room
+"""
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from uuid import uuid4
+import asyncio
+import logging
+import os
+
+from app.tools.livekit_tokens import livekit_tokens, DEFAULT_ROOM
+
+router = APIRouter(prefix="/livekit", tags=["livekit"])
+logger = logging.getLogger(__name__)
+
+MAX_BULK_TOKENS = 1000
+
+
+# Field names match what the frontend already sends
+class LiveKitTokenRequest(BaseModel):
+    userId: Optional[str] = None
+    userName: str = "Guest"
+    room: str = DEFAULT_ROOM
+    canPublish: bool = True
+
+
+class LiveKitTokenResponse(BaseModel):
+    token: str
+    url: Optional[str] = None
+    room: str
+    identity: str
+    expires_at: int
+
+
+class BulkTokenRequest(BaseModel):
+    room: str
+    identities: List[str] = Field(default_factory=list, max_length=MAX_BULK_TOKENS)
+    count: int = Field(0, ge=0, le=MAX_BULK_TOKENS, description="Extra tokens for generated identities")
+    userName: str = "Guest"
+    canPublish: bool = True
+
+
+class BulkTokenResponse(BaseModel):
+    room: str
+    url: Optional[str] = None
+    tokens: List[LiveKitTokenResponse]
+
+
+def _require_configured():
+    if not livekit_tokens.configured:
+        raise HTTPException(status_code=500, detail="LiveKit not configured")
+
+
+@router.post("/token", response_model=LiveKitTokenResponse)
+async def create_livekit_token(request: LiveKitTokenRequest):
+    """Generate LiveKit access token for voice session"""
+    _require_configured()
+    try:
+        issued = livekit_tokens.issue(
+            request.userId or f"user-{uuid4()}",
+            request.userName,
+            request.room,
+            can_publish=request.canPublish
+        )
+    except Exception as e:
+        logger.error(f"Token generation error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {**issued, "url": os.getenv("LIVEKIT_URL")}
+
+
+@router.post("/tokens/bulk", response_model=BulkTokenResponse)
+async def create_livekit_tokens_bulk(request: BulkTokenRequest):
+    """Pre-issue tokens for a room, e.g. before an event opens"""
+    _require_configured()
+    total = len(request.identities) + request.count
+    if not total:
+        raise HTTPException(status_code=400, detail="Provide identities or a count")
+    if total > MAX_BULK_TOKENS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_TOKENS} tokens per request")
+    identities = request.identities + [f"user-{uuid4()}" for _ in range(request.count)]
+
+    # Signing is CPU-bound; keep a large batch off the event loop
+    issued = await asyncio.to_thread(
+        livekit_tokens.issue_bulk,
+        request.room,
+        identities,
+        request.userName,
+        request.canPublish
+    )
+    url = os.getenv("LIVEKIT_URL")
+    return {
+        "room": request.room,
+        "url": url,
+        "tokens": [{**token, "url": url} for token in issued]
+    }
@@ -2,20 +2,52 @@
 FastAPI Backend for Namma Guide - Simplified
 Provides REST API and LiveKit token generation
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
 from dotenv import load_dotenv
 
+from app.responses import FastJSONResponse
+from app.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, monitor_event_loop_lag, render_metrics
+from app.tracing import exporter as trace_exporter
+from app.tools.catalog_sync import catalog_sync
+from app.tools.payment_webhooks import payment_webhooks
+from app.tools.arrivals_hub import arrivals_hub
+from app.tools.gtfs_service import gtfs_service
+from app.tools import http_pool
+
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background tasks"""
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    trace_export = asyncio.create_task(trace_exporter.run())
+    catalog = asyncio.create_task(catalog_sync.run())
+    webhooks = asyncio.create_task(payment_webhooks.run())
+    arrivals = asyncio.create_task(arrivals_hub.run())
+    realtime = asyncio.create_task(gtfs_service.poll_realtime())
+    yield
+    lag_monitor.cancel()
+    trace_export.cancel()
+    catalog.cancel()
+    webhooks.cancel()
+    arrivals.cancel()
+    realtime.cancel()
+    await http_pool.aclose_all()
+
+
 # Initialize FastAPI
 app = FastAPI(
     title="Namma Guide API",
     description="AI-powered Bengaluru city companion",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -29,13 +61,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency covers CORS and routing too
+app.add_middleware(MetricsMiddleware)
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Import and register routes
 from app.routes import router as api_router
+from app.ondc_routes import router as ondc_router
+from app.webhook_routes import router as webhook_router
+from app.livekit_routes import router as livekit_router
+from app.arrivals_routes import router as arrivals_router
 app.include_router(api_router)
+app.include_router(ondc_router)
+app.include_router(webhook_router)
+app.include_router(livekit_router)
+app.include_router(arrivals_router)
 
 
 @app.get("/")
@@ -54,43 +97,7 @@ async def health_check():
     }
 
 
-@app.post("/livekit/token")
-async def create_livekit_token(request: dict):
-    """Generate LiveKit access token for voice session"""
-    try:
-        from livekit import api
-        from uuid import uuid4
-        
-        # Get credentials
-        api_key = os.getenv("LIVEKIT_API_KEY")
-        api_secret = os.getenv("LIVEKIT_API_SECRET")
-        
-        if not api_key or not api_secret:
-            raise HTTPException(status_code=500, detail="LiveKit not configured")
-        
-        # Get user identity from request or generate
-        user_id = request.get("userId", f"user-{uuid4()}")
-        room_name = request.get("room", "namma-guide")
-        
-        # Create token
-        token = api.AccessToken(api_key, api_secret)
-        token.with_identity(user_id)
-        token.with_name(request.get("userName", "Guest"))
-        token.with_grants(
-            api.VideoGrants(
-                room_join=True,
-                room=room_name,
-                can_publish=True,
-                can_subscribe=True,
-            )
-        )
-        
-        # Return token
-        return {
-            "token": token.to_jwt(),
-            "url": os.getenv("LIVEKIT_URL"),
-            "room": room_name
-        }
-    except Exception as e:
-        logger.error(f"Token generation error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
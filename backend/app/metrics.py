@@ -0,0 +1,241 @@
+"""
+Prometheus metrics for the API
+Per-route and per-upstream latency histograms, error and cache counters,
+GTFS feed gauges and event-loop lag, exposed at /metrics
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Buckets from 1 ms to 10 s cover local mocks up to slow upstream calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "namma_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_ERRORS = Counter(
+    "namma_http_request_errors_total",
+    "HTTP requests that failed with a 5xx or an unhandled exception",
+    ["method", "route"],
+)
+UPSTREAM_LATENCY = Histogram(
+    "namma_upstream_request_duration_seconds",
+    "Outbound integration latency",
+    ["upstream", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "namma_upstream_errors_total",
+    "Outbound integration calls that raised",
+    ["upstream", "operation"],
+)
+CACHE_EVENTS = Counter(
+    "namma_cache_events_total",
+    "Cache hits, misses and evictions",
+    ["cache", "event"],
+)
+EVENT_LOOP_LAG = Histogram(
+    "namma_event_loop_lag_seconds",
+    "Delay between a scheduled event-loop wakeup and when it actually ran",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+WEBHOOK_EVENTS = Counter(
+    "namma_webhook_events_total",
+    "Payment webhook events by outcome (queued, duplicate, rejected, applied, failed)",
+    ["outcome"],
+)
+WEBHOOK_LAG = Histogram(
+    "namma_webhook_apply_lag_seconds",
+    "Delay between acknowledging a payment webhook and applying it to the ledger",
+    buckets=LATENCY_BUCKETS,
+)
+WEBHOOK_BATCH_SIZE = Histogram(
+    "namma_webhook_batch_size",
+    "Events per ledger write batch",
+    buckets=(1, 5, 10, 25, 50, 100, 200, 500, 1000),
+)
+GTFS_REFRESH_FILES = Counter(
+    "namma_gtfs_refresh_files_total",
+    "GTFS file refreshes by outcome (not_modified, unchanged, changed, error)",
+    ["feed", "outcome"],
+)
+GTFS_BYTES_SAVED = Counter(
+    "namma_gtfs_refresh_bytes_saved_total",
+    "GTFS download bytes not transferred thanks to 304 Not Modified",
+    ["feed"],
+)
+GTFS_REBUILD_AVOIDED = Counter(
+    "namma_gtfs_rebuild_seconds_avoided_total",
+    "GTFS index build time skipped because the source files had not changed",
+)
+
+EVENT_LOOP_PROBE_INTERVAL = 0.5  # seconds
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request
+
+    Labels use the matched route template (e.g. /api/transport/search) rather
+    than the raw path, keeping label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            status = 500
+            raise
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method, path, str(status)).observe(time.perf_counter() - start)
+            if status >= 500:
+                REQUEST_ERRORS.labels(method, path).inc()
+
+
+@contextmanager
+def track_upstream(upstream: str, operation: str) -> Iterator[None]:
+    """Time one outbound call and count it as an error if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.labels(upstream, operation).inc()
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(upstream, operation).observe(time.perf_counter() - start)
+
+
+def record_cache(cache: str, event: str):
+    """Count a cache hit, miss or eviction"""
+    CACHE_EVENTS.labels(cache, event).inc()
+
+
+async def monitor_event_loop_lag(interval: float = EVENT_LOOP_PROBE_INTERVAL):
+    """Background task sampling how late the event loop wakes a sleeping task"""
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - scheduled - interval))
+
+
+class ServiceStateCollector:
+    """Scrape-time gauges and counters read from service singletons"""
+
+    def describe(self):
+        # Nothing to pre-declare; keeps register() from calling collect() at import
+        return []
+
+    def collect(self):
+        # Imported lazily so importing metrics never initializes the services
+        from app.coalescing import discovery_coalescer, transport_coalescer
+        from app.tools.gtfs_service import gtfs_service
+
+        age = GaugeMetricFamily(
+            "namma_gtfs_feed_age_seconds", "Seconds since the cached GTFS file was fetched", labels=["feed"]
+        )
+        rows = GaugeMetricFamily("namma_gtfs_feed_rows", "Rows in the cached GTFS file", labels=["feed"])
+        size = GaugeMetricFamily("namma_gtfs_feed_bytes", "Downloaded size of the cached GTFS file", labels=["feed"])
+        for feed in gtfs_service.feed_stats():
+            age.add_metric([feed["feed"]], feed["age_seconds"])
+            rows.add_metric([feed["feed"]], feed["rows"])
+            size.add_metric([feed["feed"]], feed["bytes"])
+        yield age
+        yield rows
+        yield size
+
+        rt_age = GaugeMetricFamily(
+            "namma_gtfs_rt_feed_age_seconds", "Age of the last applied GTFS-Realtime feed", labels=["operator"]
+        )
+        rt_delayed = GaugeMetricFamily(
+            "namma_gtfs_rt_trips_delayed", "Trips with real-time delays in the delay table", labels=["operator"]
+        )
+        for feed in gtfs_service.realtime.values():
+            stats = feed.table.stats()
+            if stats["feed_age_seconds"] is not None:
+                rt_age.add_metric([feed.operator], stats["feed_age_seconds"])
+            rt_delayed.add_metric([feed.operator], stats["trips_delayed"])
+        yield rt_age
+        yield rt_delayed
+
+        requests = CounterMetricFamily(
+            "namma_coalescer_requests", "Requests seen by the in-flight coalescer", labels=["handler"]
+        )
+        coalesced = CounterMetricFamily(
+            "namma_coalescer_coalesced", "Requests served by another request's computation", labels=["handler"]
+        )
+        for coalescer in (transport_coalescer, discovery_coalescer):
+            stats = coalescer.stats()
+            requests.add_metric([stats["name"]], stats["requests"])
+            coalesced.add_metric([stats["name"]], stats["coalesced"])
+        yield requests
+        yield coalesced
+
+        from app.tools.catalog_sync import catalog_sync
+
+        sync_age = GaugeMetricFamily(
+            "namma_catalog_sync_age_seconds", "Seconds since the catalog domain last synced", labels=["domain"]
+        )
+        for domain, stats in catalog_sync.stats().items():
+            sync_age.add_metric([domain], stats["last_sync_age_seconds"])
+        yield sync_age
+
+        from app.tools.payment_webhooks import payment_webhooks
+
+        webhooks = payment_webhooks.stats()
+        yield GaugeMetricFamily(
+            "namma_webhook_queue_depth", "Payment webhook events waiting to be applied", value=webhooks["queue_depth"]
+        )
+
+        from app.tools.arrivals_hub import arrivals_hub
+
+        arrivals = arrivals_hub.stats()
+        yield GaugeMetricFamily(
+            "namma_arrivals_watched_stops", "Stops with live-arrival subscribers", value=arrivals["stops"]
+        )
+        yield GaugeMetricFamily(
+            "namma_arrivals_subscribers", "Connected live-arrival clients", value=arrivals["subscribers"]
+        )
+        yield CounterMetricFamily(
+            "namma_arrivals_computations", "Per-stop arrival computations", value=arrivals["computations"]
+        )
+
+
+REGISTRY.register(ServiceStateCollector())
+
+
+def render_metrics() -> bytes:
+    """Prometheus text exposition of every registered metric"""
+    return generate_latest(REGISTRY)
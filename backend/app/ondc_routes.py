@@ -0,0 +1,30 @@
+"""
+ONDC (Beckn) callback endpoints
+Providers answer our searches asynchronously by POSTing here; each callback
+is acknowledged immediately and handed to the search waiting on it.
+"""
+from fastapi import APIRouter, Request
+import logging
+
+from app.tools.ondc_service import ondc_service
+
+router = APIRouter(prefix="/ondc", tags=["ondc"], include_in_schema=False)
+logger = logging.getLogger(__name__)
+
+ACK = {"message": {"ack": {"status": "ACK"}}}
+NACK = {"message": {"ack": {"status": "NACK"}}}
+
+
+@router.post("/on_search")
+async def on_search(request: Request):
+    """Catalog callback for a mobility search"""
+    try:
+        payload = await request.json()
+    except ValueError:
+        return {**NACK, "error": {"type": "JSON-SCHEMA-ERROR", "message": "Invalid JSON"}}
+    
+    if not ondc_service.deliver_on_search(payload):
+        # Late or unknown: still ACK so the provider does not retry
+        logger.debug(f"Dropped on_search for {payload.get('context', {}).get('transaction_id')}")
+    
+    return ACK
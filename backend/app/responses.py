@@ -0,0 +1,25 @@
+"""
+Fast JSON responses
+orjson for plain content, pydantic-core's compiled serializer for response models
+"""
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    Default response class for the API
+
+    Handlers that return an already-validated response model wrap it in this
+    class directly, so FastAPI neither re-validates it against response_model
+    nor walks it through jsonable_encoder. Unset optional fields are omitted.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(
+                content, by_alias=True, exclude_none=True
+            )
+        return super().render(content)
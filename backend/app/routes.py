@@ -2,15 +2,35 @@
 Transport and Discovery API endpoints
 """
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
 import os
+import time
 import logging
 
-router = APIRouter(prefix="/api", tags=["services"])
+import orjson
+
+from app.responses import FastJSONResponse
+from app.metrics import track_upstream
+from app.tracing import start_trace, span
+from app.coalescing import transport_coalescer, discovery_coalescer, canonical_text
+from app.transport_batch import stream_transport_batch
+from app.tools.gtfs_service import gtfs_service
+from app.tools.mappls_service import mappls_service
+from app.tools.mock_gtfs import mock_gtfs
+from app.tools.mock_mappls import mock_mappls
+from app.tools.mock_ondc import mock_ondc
+from app.tools.ondc_service import ondc_service, SearchWindow
+from app.tools.catalog_sync import catalog_sync
+
+router = APIRouter(prefix="/api", tags=["services"], default_response_class=FastJSONResponse)
 logger = logging.getLogger(__name__)
 
 
+MAX_MOBILITY_WINDOW = 10.0  # seconds
+
+
 # Request/Response Models
 class TransportRequest(BaseModel):
     from_location: str
@@ -18,99 +38,281 @@ class TransportRequest(BaseModel):
     mode: Optional[str] = "all"
 
 
+class BatchTransportRequest(BaseModel):
+    requests: List[TransportRequest]
+
+
+class MobilitySearchRequest(BaseModel):
+    pickup: str
+    dropoff: str
+    time: Optional[str] = None
+    window_seconds: Optional[float] = Field(None, gt=0, le=MAX_MOBILITY_WINDOW)
+    max_quotes: Optional[int] = Field(None, gt=0)
+
+
 class PlaceSearchRequest(BaseModel):
     query: str
     location: Optional[str] = None
     category: Optional[str] = None
 
 
+class FoodSearchRequest(BaseModel):
+    location: Optional[str] = None
+    query: Optional[str] = None
+    cuisine: Optional[str] = None
+    open_now: bool = False
+    radius_km: Optional[float] = Field(None, gt=0)
+    limit: int = Field(10, gt=0, le=50)
+
+
+class CatalogPlacesRequest(BaseModel):
+    location: Optional[str] = None
+    category: str = "all"
+
+
 class Route(BaseModel):
     mode: str
     duration: str
     distance: str
     cost: str
     steps: List[str]
+    line: Optional[str] = None
+    stations: Optional[int] = None
+    bus_numbers: Optional[List[str]] = None
+    providers: Optional[List[str]] = None
+
+
+class TransportResponse(BaseModel):
+    from_location: str = Field(alias="from")
+    to_location: str = Field(alias="to")
+    routes: List[Route]
+    traffic: str
+    best_option: str
+    explain: Optional[Dict[str, Any]] = None
 
 
 class Place(BaseModel):
     name: str
-    address: str
-    rating: float
-    distance: str
-    category: str
+    address: Optional[str] = None
+    rating: Optional[float] = None
+    distance: Optional[str] = None
+    category: Optional[str] = None
+    specialty: Optional[str] = None
+    price_range: Optional[str] = None
+    snippet: Optional[str] = None
+    link: Optional[str] = None
+    source: Optional[str] = None
+
+
+class PlaceSearchResponse(BaseModel):
+    query: str
+    location: str
+    places: List[Place]
+    count: int
+    source: str
+
+
+MAX_BATCH_SIZE = 1000
+
+
+def _maps_service():
+    """Real Mappls when credentials are configured, otherwise the mock"""
+    return mappls_service if os.getenv("MAPPLS_API_KEY") else mock_mappls
+
+
+def _transit_service():
+    """Real GTFS feeds when a feed URL is configured, otherwise the mock"""
+    return gtfs_service if os.getenv("BMTC_GTFS_URL") else mock_gtfs
+
+
+def _mobility_service():
+    """ONDC gateway when configured, otherwise the mock"""
+    return ondc_service if os.getenv("ONDC_GATEWAY_URL") else mock_ondc
 
 
 # TODO: Replace with actual API integrations
 # For now, returning intelligent mock data based on actual Bengaluru locations
 
-@router.post("/transport/search")
-async def search_transport(request: TransportRequest):
-    """Search for transport routes between two locations"""
+def _transport_key(request: TransportRequest) -> tuple:
+    """Canonical coalescing key for a transport search"""
+    return (
+        canonical_text(request.from_location),
+        canonical_text(request.to_location),
+        request.mode or "all",
+    )
+
+
+def _discovery_key(request: PlaceSearchRequest) -> tuple:
+    """Canonical coalescing key for a place search"""
+    return (
+        canonical_text(request.query),
+        canonical_text(request.location or "Bengaluru"),
+        canonical_text(request.category or ""),
+    )
+
+
+@router.post("/transport/search", response_model=TransportResponse)
+async def search_transport(request: TransportRequest, explain: bool = False):
+    """
+    Search for transport routes between two locations
+    
+    With ?explain=1 the search runs uncoalesced and the response carries the
+    request's span tree with per-phase timings. Routes here are still canned
+    (see _search_transport), so the tree only shows transport.build_routes,
+    transport.validate and serialize; upstream GTFS and Mappls spans appear
+    in /transport/batch traces, which call the services.
+    """
+    with start_trace("POST /api/transport/search", explain=explain) as trace:
+        if explain:
+            result = await _search_transport(request)
+        else:
+            with span("coalesce.wait"):
+                result = await transport_coalescer.run(
+                    _transport_key(request),
+                    lambda: _search_transport(request)
+                )
+        with span("serialize"):
+            response = FastJSONResponse(result)
+    
+    if explain:
+        return FastJSONResponse(result.model_copy(update={"explain": trace.to_tree()}))
+    return response
+
+
+async def _search_transport(request: TransportRequest) -> TransportResponse:
+    """Run a transport search (shared by all coalesced waiters); routes are mock data, no upstream calls"""
     try:
         logger.info(f"Transport search: {request.from_location} → {request.to_location}")
         
-        # Mock data - Replace with Mappls API or BMTC/BMRCL integration
-        routes = []
-        
-        if request.mode in ["metro", "all"]:
-            routes.append({
-                "mode": "Metro",
-                "duration": "25 mins",
-                "distance": "12 km",
-                "cost": "₹40-50",
-                "steps": [
-                    f"Walk to nearest metro station from {request.from_location}",
-                    "Board Purple Line",
-                    f"Alight at {request.to_location} station",
-                    "5 min walk to destination"
-                ],
-                "line": "Purple Line",
-                "stations": 8
-            })
-        
-        if request.mode in ["bus", "all"]:
-            routes.append({
-                "mode": "Bus",
-                "duration": "35 mins",
-                "distance": "14 km",
-                "cost": "₹20-30",
-                "steps": [
-                    f"Board BMTC 500K from {request.from_location}",
-                    "30 stops",
-                    f"Alight near {request.to_location}"
-                ],
-                "bus_numbers": ["500K", "G4"]
-            })
+        with span("transport.build_routes", mode=request.mode):
+            # Mock data - Replace with Mappls API or BMTC/BMRCL integration
+            routes = []
+            
+            if request.mode in ["metro", "all"]:
+                routes.append({
+                    "mode": "Metro",
+                    "duration": "25 mins",
+                    "distance": "12 km",
+                    "cost": "₹40-50",
+                    "steps": [
+                        f"Walk to nearest metro station from {request.from_location}",
+                        "Board Purple Line",
+                        f"Alight at {request.to_location} station",
+                        "5 min walk to destination"
+                    ],
+                    "line": "Purple Line",
+                    "stations": 8
+                })
+            
+            if request.mode in ["bus", "all"]:
+                routes.append({
+                    "mode": "Bus",
+                    "duration": "35 mins",
+                    "distance": "14 km",
+                    "cost": "₹20-30",
+                    "steps": [
+                        f"Board BMTC 500K from {request.from_location}",
+                        "30 stops",
+                        f"Alight near {request.to_location}"
+                    ],
+                    "bus_numbers": ["500K", "G4"]
+                })
+            
+            if request.mode in ["cab", "all"]:
+                routes.append({
+                    "mode": "Cab",
+                    "duration": "20 mins",
+                    "distance": "12 km",
+                    "cost": "₹250-300",
+                    "steps": [
+                        "Book via Namma Yatri or Uber",
+                        "Direct route via ORR"
+                    ],
+                    "providers": ["Namma Yatri", "Uber", "Ola"]
+                })
         
-        if request.mode in ["cab", "all"]:
-            routes.append({
-                "mode": "Cab",
-                "duration": "20 mins",
-                "distance": "12 km",
-                "cost": "₹250-300",
-                "steps": [
-                    "Book via Namma Yatri or Uber",
-                    "Direct route via ORR"
-                ],
-                "providers": ["Namma Yatri", "Uber", "Ola"]
+        with span("transport.validate"):
+            return TransportResponse.model_validate({
+                "from": request.from_location,
+                "to": request.to_location,
+                "routes": routes,
+                "traffic": "Moderate",
+                "best_option": "Metro" if "metro" in [r["mode"].lower() for r in routes] else "Cab"
             })
         
-        return {
-            "from": request.from_location,
-            "to": request.to_location,
-            "routes": routes,
-            "traffic": "Moderate",
-            "best_option": "Metro" if "metro" in [r["mode"].lower() for r in routes] else "Cab"
-        }
-        
     except Exception as e:
         logger.error(f"Transport search error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/discovery/search")
+@router.post("/transport/batch")
+async def search_transport_batch(request: BatchTransportRequest):
+    """Plan many origin/destination pairs at once, streaming NDJSON results"""
+    if not request.requests:
+        raise HTTPException(status_code=400, detail="No requests given")
+    if len(request.requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} requests per batch")
+    
+    logger.info(f"Transport batch: {len(request.requests)} requests")
+    
+    return StreamingResponse(
+        stream_transport_batch(
+            [(r.from_location, r.to_location, r.mode) for r in request.requests],
+            maps=_maps_service(),
+            transit=_transit_service()
+        ),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.post("/mobility/search")
+async def search_mobility(request: MobilitySearchRequest):
+    """
+    Ride quotes from ONDC mobility providers, streamed as NDJSON as they arrive
+    
+    The last line is a summary with the number of quotes and elapsed time.
+    """
+    logger.info(f"Mobility search: {request.pickup} → {request.dropoff}")
+    
+    window = SearchWindow(timeout=request.window_seconds or ondc_service.window.timeout)
+    if request.max_quotes:
+        window.max_quotes = request.max_quotes
+    
+    async def lines():
+        with start_trace("POST /api/mobility/search"):
+            started = time.perf_counter()
+            count = 0
+            try:
+                async for quote in _mobility_service().stream_mobility(
+                    request.pickup, request.dropoff, request.time, window
+                ):
+                    count += 1
+                    yield orjson.dumps(quote) + b"\n"
+            except Exception as e:
+                logger.error(f"Mobility search error: {e}")
+                yield orjson.dumps({"error": str(e)}) + b"\n"
+            
+            yield orjson.dumps({
+                "done": True,
+                "quotes": count,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+            }) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/discovery/search", response_model=PlaceSearchResponse)
 async def search_places(request: PlaceSearchRequest):
     """Search for places using Google Custom Search API"""
+    result = await discovery_coalescer.run(
+        _discovery_key(request),
+        lambda: _search_places(request)
+    )
+    return FastJSONResponse(result)
+
+
+async def _search_places(request: PlaceSearchRequest) -> PlaceSearchResponse:
+    """Run a place search (shared by all coalesced waiters)"""
     try:
         logger.info(f"Place search: {request.query} in {request.location or 'Bengaluru'}")
         
@@ -125,7 +327,7 @@ async def search_places(request: PlaceSearchRequest):
             search_query = f"{request.query} in {request.location or 'Bengaluru'}"
             
             # Call Google Custom Search API
-            url = "https://www.googleapis.com/customsearch/v1"
+            url = os.getenv("GOOGLE_CSE_URL", "https://www.googleapis.com/customsearch/v1")
             params = {
                 "key": google_api_key,
                 "cx": google_cse_id,
@@ -133,7 +335,8 @@ async def search_places(request: PlaceSearchRequest):
                 "num": 5
             }
             
-            response = requests.get(url, params=params)
+            with track_upstream("google", "custom_search"):
+                response = requests.get(url, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -147,13 +350,13 @@ async def search_places(request: PlaceSearchRequest):
                         "source": "Google Search"
                     })
                 
-                return {
-                    "query": request.query,
-                    "location": request.location or "Bengaluru",
-                    "places": places,
-                    "count": len(places),
-                    "source": "Google Custom Search"
-                }
+                return PlaceSearchResponse(
+                    query=request.query,
+                    location=request.location or "Bengaluru",
+                    places=places,
+                    count=len(places),
+                    source="Google Custom Search"
+                )
         
         # Fallback to curated Bengaluru data
         query_lower = request.query.lower()
@@ -236,15 +439,45 @@ async def search_places(request: PlaceSearchRequest):
                 }
             ]
         
-        return {
-            "query": request.query,
-            "location": request.location or "Bengaluru",
-            "places": places,
-            "count": len(places),
-            "source": "Curated data (Google API not configured)"
-        }
+        return PlaceSearchResponse(
+            query=request.query,
+            location=request.location or "Bengaluru",
+            places=places,
+            count=len(places),
+            source="Curated data (Google API not configured)"
+        )
         
     except Exception as e:
         logger.error(f"Place search error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.post("/discovery/food")
+async def search_food(request: FoodSearchRequest):
+    """Restaurants from the locally synced ONDC catalog, each with its freshness"""
+    with start_trace("POST /api/discovery/food"):
+        restaurants = await catalog_sync.search_food(
+            request.location,
+            query=request.query,
+            cuisine=request.cuisine,
+            open_now=request.open_now,
+            radius_km=request.radius_km,
+            limit=request.limit
+        )
+    return {"restaurants": restaurants, "count": len(restaurants), "source": "ONDC catalog (local)"}
+
+
+@router.post("/discovery/places")
+async def search_catalog_places(request: CatalogPlacesRequest):
+    """PGs, gyms and events from the locally synced ONDC catalog"""
+    places = await catalog_sync.search_places(request.location, request.category)
+    return {"places": places, "count": len(places), "source": "ONDC catalog (local)"}
+
+
+@router.get("/stats/coalescing")
+async def coalescing_stats():
+    """In-flight request coalescing metrics for the search handlers"""
+    return {
+        "transport": transport_coalescer.stats(),
+        "discovery": discovery_coalescer.stats()
+    }
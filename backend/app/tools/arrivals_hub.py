@@ -0,0 +1,205 @@
+"""
+Live arrivals fan-out
+Each subscribed stop's next departures are computed once per tick and the
+changes pushed to every subscriber; stops nobody watches are not computed.
+"""
+import asyncio
+import os
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import orjson
+
+from app.coalescing import canonical_text
+from app.tools.gtfs_service import gtfs_service
+from app.tools.mock_gtfs import mock_gtfs
+
+SUBSCRIBER_QUEUE_SIZE = 32  # Messages a slow client may fall behind before it is resynced
+
+
+def keyed_arrivals(arrivals: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Give each arrival a stable id, "<route>#<n>" for the route's n-th next departure
+
+    arrival_mins changes every minute, so rows are matched by route and
+    position instead of by content.
+    """
+    keyed, seen = {}, {}
+    for arrival in sorted(arrivals, key=lambda a: a["arrival_mins"]):
+        n = seen.get(arrival["route_id"], 0)
+        seen[arrival["route_id"]] = n + 1
+        arrival_id = f"{arrival['route_id']}#{n}"
+        keyed[arrival_id] = {"id": arrival_id, **arrival}
+    return keyed
+
+
+def diff_arrivals(
+    old: Dict[str, Dict[str, Any]],
+    new: Dict[str, Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Rows added or changed, and ids removed"""
+    upsert = [row for arrival_id, row in new.items() if old.get(arrival_id) != row]
+    remove = [arrival_id for arrival_id in old if arrival_id not in new]
+    return upsert, remove
+
+
+class ArrivalSubscriber:
+    """One client connection; the hub queues pre-encoded messages for it"""
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.stops: Set[str] = set()  # Keys of subscribed stops
+        self.synced: Set[str] = set()  # Stops whose snapshot this client has
+        self.resyncs = 0
+
+    def send(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too slow to keep up with diffs: drop the backlog, start over from snapshots
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.synced.clear()
+            self.resyncs += 1
+
+
+class StopFeed:
+    """Shared state of one watched stop"""
+
+    def __init__(self, key: str, stop: str):
+        self.key = key
+        self.stop = stop  # Name as the first subscriber spelled it
+        self.subscribers: Set[ArrivalSubscriber] = set()
+        self.arrivals: Optional[Dict[str, Dict[str, Any]]] = None
+        self.seq = 0
+        self.task: Optional[asyncio.Future] = None
+
+    def snapshot(self) -> str:
+        return orjson.dumps({
+            "type": "snapshot",
+            "stop": self.stop,
+            "seq": self.seq,
+            "arrivals": list(self.arrivals.values()),
+        }).decode()
+
+
+class ArrivalsHub:
+    """Per-stop arrival computation shared by every subscriber of the stop"""
+
+    def __init__(self, transit=None):
+        self.tick = float(os.getenv("ARRIVALS_TICK", "15"))  # Seconds between recomputations
+        self.max_concurrency = int(os.getenv("ARRIVALS_CONCURRENCY", "16"))
+        self._transit = transit
+        self._feeds: Dict[str, StopFeed] = {}
+        self.computations = 0
+        self.messages = 0
+
+    @property
+    def transit(self):
+        # Same choice as the API routes; read per call since .env loads after import
+        if self._transit is not None:
+            return self._transit
+        return gtfs_service if os.getenv("BMTC_GTFS_URL") else mock_gtfs
+
+    async def subscribe(self, subscriber: ArrivalSubscriber, stop: str):
+        """Start watching a stop; its current arrivals are sent as a snapshot"""
+        key = canonical_text(stop)
+        feed = self._feeds.get(key)
+        if feed is None:
+            feed = self._feeds[key] = StopFeed(key, stop.strip())
+        feed.subscribers.add(subscriber)
+        subscriber.stops.add(key)
+
+        if feed.arrivals is None:
+            await self._refresh(feed)
+        if feed.arrivals is not None and key not in subscriber.synced:
+            subscriber.send(feed.snapshot())
+            subscriber.synced.add(key)
+
+    def unsubscribe(self, subscriber: ArrivalSubscriber, stop: str):
+        key = canonical_text(stop)
+        subscriber.stops.discard(key)
+        subscriber.synced.discard(key)
+        feed = self._feeds.get(key)
+        if feed is None:
+            return
+        feed.subscribers.discard(subscriber)
+        if not feed.subscribers:
+            # Nobody is watching: stop computing it
+            del self._feeds[key]
+
+    def disconnect(self, subscriber: ArrivalSubscriber):
+        for key in list(subscriber.stops):
+            self.unsubscribe(subscriber, key)
+
+    async def _refresh(self, feed: StopFeed):
+        # One computation per stop at a time, shared by the tick and new subscribers
+        if feed.task is None or feed.task.done():
+            feed.task = asyncio.ensure_future(self._update(feed))
+        await asyncio.shield(feed.task)
+
+    async def _update(self, feed: StopFeed):
+        try:
+            arrivals = keyed_arrivals(await self.transit.get_live_arrivals(feed.stop))
+        except Exception as e:
+            print(f"Arrivals error for {feed.stop}: {e}")
+            return
+        self.computations += 1
+        if self._feeds.get(feed.key) is not feed:
+            return  # Last subscriber left while computing
+
+        previous, feed.arrivals = feed.arrivals, arrivals
+        feed.seq += 1
+        diff = None
+        if previous is not None:
+            upsert, remove = diff_arrivals(previous, arrivals)
+            if upsert or remove:
+                diff = orjson.dumps({
+                    "type": "diff",
+                    "stop": feed.stop,
+                    "seq": feed.seq,
+                    "upsert": upsert,
+                    "remove": remove,
+                }).decode()
+
+        # Encoded once, whatever the number of subscribers
+        snapshot = None
+        for subscriber in list(feed.subscribers):
+            if feed.key in subscriber.synced:
+                if diff is not None:
+                    subscriber.send(diff)
+                    self.messages += 1
+                continue
+            snapshot = snapshot or feed.snapshot()
+            subscriber.send(snapshot)
+            subscriber.synced.add(feed.key)
+            self.messages += 1
+
+    async def run(self):
+        """Background task: recompute every watched stop each tick"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def refresh(feed: StopFeed):
+            async with semaphore:
+                await self._refresh(feed)
+
+        while True:
+            await asyncio.sleep(self.tick)
+            feeds = list(self._feeds.values())
+            if feeds:
+                await asyncio.gather(*(refresh(feed) for feed in feeds), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        subscribers = set()
+        for feed in self._feeds.values():
+            subscribers |= feed.subscribers
+        return {
+            "stops": len(self._feeds),
+            "subscribers": len(subscribers),
+            "subscriptions": sum(len(feed.subscribers) for feed in self._feeds.values()),
+            "computations": self.computations,
+            "messages": self.messages,
+        }
+
+
+# Singleton instance
+arrivals_hub = ArrivalsHub()
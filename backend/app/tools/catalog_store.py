@@ -0,0 +1,196 @@
+"""
+Local ONDC catalog store
+SQLite (WAL) table of provider catalog items keyed by content hash, so a sync
+writes only what changed and discovery never waits on the network.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_items (
+    domain TEXT NOT NULL,
+    provider_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (domain, provider_id, item_id)
+);
+CREATE TABLE IF NOT EXISTS provider_sync (
+    domain TEXT NOT NULL,
+    provider_id TEXT NOT NULL,
+    last_synced_at REAL NOT NULL,
+    cursor TEXT,
+    PRIMARY KEY (domain, provider_id)
+);
+"""
+
+
+def content_hash(data: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+class CatalogStore:
+    """
+    Persistent catalog items per (domain, provider)
+
+    updated_at is when an item's content last changed; synced_at is when its
+    provider last confirmed it, which is what freshness is measured from.
+    Methods block; call them through asyncio.to_thread from async code.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("CATALOG_DB_PATH", "catalog.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def apply_snapshot(
+        self,
+        domain: str,
+        provider_id: str,
+        items: Dict[str, Dict[str, Any]],
+        synced_at: float = None,
+        cursor: str = None
+    ) -> Dict[str, int]:
+        """
+        Replace a provider's catalog with a full snapshot, writing only the differences
+
+        Returns:
+            Counts of added, changed, removed and unchanged items
+        """
+        synced_at = synced_at or time.time()
+        with self._lock:
+            existing = self._hashes(domain, provider_id)
+            removed = [item_id for item_id in existing if item_id not in items]
+            counts = self._write(domain, provider_id, items, removed, existing, synced_at, cursor)
+        return counts
+
+    def apply_delta(
+        self,
+        domain: str,
+        provider_id: str,
+        upserts: Dict[str, Dict[str, Any]],
+        deletes: List[str],
+        synced_at: float = None,
+        cursor: str = None
+    ) -> Dict[str, int]:
+        """Apply an incremental update (items added/changed and removed since `cursor`)"""
+        synced_at = synced_at or time.time()
+        with self._lock:
+            existing = self._hashes(domain, provider_id)
+            removed = [item_id for item_id in deletes if item_id in existing]
+            counts = self._write(domain, provider_id, upserts, removed, existing, synced_at, cursor)
+        return counts
+
+    def _hashes(self, domain: str, provider_id: str) -> Dict[str, str]:
+        rows = self._conn.execute(
+            "SELECT item_id, content_hash FROM catalog_items WHERE domain = ? AND provider_id = ?",
+            (domain, provider_id)
+        )
+        return dict(rows)
+
+    def _write(
+        self,
+        domain: str,
+        provider_id: str,
+        items: Dict[str, Dict[str, Any]],
+        removed: List[str],
+        existing: Dict[str, str],
+        synced_at: float,
+        cursor: Optional[str]
+    ) -> Dict[str, int]:
+        counts = {"added": 0, "changed": 0, "removed": len(removed), "unchanged": 0}
+        writes, confirmed = [], []
+        for item_id, data in items.items():
+            digest = content_hash(data)
+            previous = existing.get(item_id)
+            if previous == digest:
+                counts["unchanged"] += 1
+                confirmed.append((synced_at, domain, provider_id, item_id))
+                continue
+            counts["added" if previous is None else "changed"] += 1
+            writes.append((
+                domain, provider_id, item_id,
+                json.dumps(data, separators=(",", ":")), digest, synced_at, synced_at
+            ))
+
+        # One transaction per provider update
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO catalog_items VALUES (?, ?, ?, ?, ?, ?, ?)", writes
+            )
+            self._conn.executemany(
+                "UPDATE catalog_items SET synced_at = ? WHERE domain = ? AND provider_id = ? AND item_id = ?",
+                confirmed
+            )
+            self._conn.executemany(
+                "DELETE FROM catalog_items WHERE domain = ? AND provider_id = ? AND item_id = ?",
+                [(domain, provider_id, item_id) for item_id in removed]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO provider_sync VALUES (?, ?, ?, ?)",
+                (domain, provider_id, synced_at, cursor)
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return counts
+
+    def load(self, domain: str) -> List[Dict[str, Any]]:
+        """Every item of a domain, with its provider and timestamps"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT provider_id, item_id, data, updated_at, synced_at FROM catalog_items "
+                "WHERE domain = ? ORDER BY provider_id, item_id",
+                (domain,)
+            ).fetchall()
+        return [
+            {
+                "provider_id": provider_id,
+                "item_id": item_id,
+                "data": json.loads(data),
+                "updated_at": updated_at,
+                "synced_at": synced_at
+            }
+            for provider_id, item_id, data, updated_at, synced_at in rows
+        ]
+
+    def cursors(self, domain: str) -> Dict[str, Optional[str]]:
+        """Last incremental-sync cursor per provider"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT provider_id, cursor FROM provider_sync WHERE domain = ?", (domain,)
+            )
+            return dict(rows)
+
+    def last_synced(self) -> Dict[str, float]:
+        """Latest provider confirmation per domain (moves forward whenever any process syncs)"""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT domain, MAX(last_synced_at) FROM provider_sync GROUP BY domain"
+            ))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Item counts and oldest provider confirmation per domain"""
+        with self._lock:
+            items = dict(self._conn.execute(
+                "SELECT domain, COUNT(*) FROM catalog_items GROUP BY domain"
+            ))
+            synced = self._conn.execute(
+                "SELECT domain, MIN(last_synced_at), COUNT(*) FROM provider_sync GROUP BY domain"
+            ).fetchall()
+        return {
+            domain: {"items": items.get(domain, 0), "oldest_sync": oldest, "providers": providers}
+            for domain, oldest, providers in synced
+        }
@@ -0,0 +1,245 @@
+"""
+Periodic ONDC catalog sync and store-backed discovery
+Pulls provider catalogs on an interval, applies them incrementally to the
+local CatalogStore and serves food and place discovery from in-memory
+snapshots of that store, tagging every result with its freshness.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.tracing import span
+from app.tools.catalog_store import CatalogStore
+from app.tools.food_catalog import FoodCatalogIndex
+from app.tools.mock_ondc import mock_ondc
+
+FOOD_FIELDS = ("name", "cuisine", "latitude", "longitude")
+
+
+@dataclass
+class ProviderUpdate:
+    """One provider's catalog as returned by a source"""
+    provider_id: str
+    items: Dict[str, Dict[str, Any]]  # item_id -> item; a full snapshot unless full=False
+    deleted: List[str] = field(default_factory=list)  # Only read for deltas
+    full: bool = True
+    cursor: Optional[str] = None  # Passed back on the next fetch for incremental pulls
+
+
+class MockCatalogSource:
+    """Catalogs from MockONDCService, as one provider sending full snapshots"""
+
+    provider_id = "mock_ondc"
+
+    def __init__(self, domain: str):
+        self.domain = domain
+
+    async def fetch(self, cursors: Dict[str, Optional[str]]) -> List[ProviderUpdate]:
+        if self.domain == "food":
+            items = {r["restaurant_id"]: r for r in mock_ondc.restaurants}
+        else:
+            items = {}
+            for category in ("pg", "gym", "event"):
+                for place in await mock_ondc.search_places(None, category):
+                    items[place["place_id"]] = {**place, "category_key": category}
+        return [ProviderUpdate(self.provider_id, items)]
+
+
+class CatalogSync:
+    """Keeps the local catalog current and answers discovery from it"""
+
+    def __init__(self, sources: List[Any], store: CatalogStore = None):
+        self.sources = sources
+        self.interval = float(os.getenv("CATALOG_SYNC_INTERVAL", "300"))
+        self.stale_after = float(os.getenv("CATALOG_STALE_AFTER", str(self.interval * 3)))
+        # How often a process that does not sync itself (the agent worker) checks the store
+        self.recheck = float(os.getenv("CATALOG_RECHECK_INTERVAL", "30"))
+        self._store = store
+        self.last_sync: Dict[str, float] = {}
+        self.last_counts: Dict[str, Dict[str, int]] = {}
+        self._food = FoodCatalogIndex()
+        self._food_synced = np.empty(0)
+        self._places: List[Dict[str, Any]] = []
+        self._loaded = False
+        self._loaded_sync: Dict[str, float] = {}  # Store's last_synced_at per domain when last loaded
+        self._checked_at = 0.0
+
+    @property
+    def store(self) -> CatalogStore:
+        # Opened on first use so importing this module does no I/O
+        if self._store is None:
+            self._store = CatalogStore()
+        return self._store
+
+    async def run(self):
+        """Serve what was persisted, then sync every interval (started from the app lifespan)"""
+        await self.load()
+        while True:
+            try:
+                await self.sync_once()
+            except Exception as e:
+                print(f"Catalog sync error: {e}")
+            await asyncio.sleep(self.interval)
+
+    @property
+    def food_count(self) -> int:
+        """Restaurants in the serving snapshot"""
+        return len(self._food.entries)
+
+    async def load(self):
+        """Rebuild the serving snapshots from the store"""
+        self._loaded_sync = await asyncio.to_thread(self.store.last_synced)
+        for domain in {source.domain for source in self.sources}:
+            rows = await asyncio.to_thread(self.store.load, domain)
+            self._rebuild(domain, rows)
+        self._loaded = True
+        self._checked_at = time.monotonic()
+
+    async def _current(self):
+        # Load on first use, then reload when another process (the API's sync
+        # loop) has written newer provider syncs since this one last read
+        if not self._loaded:
+            await self.load()
+            return
+        if time.monotonic() - self._checked_at < self.recheck:
+            return
+        self._checked_at = time.monotonic()
+        latest = await asyncio.to_thread(self.store.last_synced)
+        if any(synced_at > self._loaded_sync.get(domain, 0.0) for domain, synced_at in latest.items()):
+            await self.load()
+
+    async def sync_once(self) -> Dict[str, Dict[str, int]]:
+        """Pull every source once; returns added/changed/removed/unchanged per domain"""
+        totals: Dict[str, Dict[str, int]] = {}
+        for source in self.sources:
+            with span("catalog.sync", domain=source.domain) as sync_span:
+                cursors = await asyncio.to_thread(self.store.cursors, source.domain)
+                updates = await source.fetch(cursors)
+                synced_at = time.time()
+
+                counts = totals.setdefault(
+                    source.domain, {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+                )
+                for update in updates:
+                    if update.full:
+                        result = await asyncio.to_thread(
+                            self.store.apply_snapshot, source.domain, update.provider_id,
+                            update.items, synced_at, update.cursor
+                        )
+                    else:
+                        result = await asyncio.to_thread(
+                            self.store.apply_delta, source.domain, update.provider_id,
+                            update.items, update.deleted, synced_at, update.cursor
+                        )
+                    for key, value in result.items():
+                        counts[key] += value
+                if sync_span:
+                    sync_span.set(**counts)
+
+            # Reload every time: unchanged items still carry a newer synced_at
+            rows = await asyncio.to_thread(self.store.load, source.domain)
+            self._rebuild(source.domain, rows)
+            self._loaded_sync[source.domain] = max(synced_at, self._loaded_sync.get(source.domain, 0.0))
+            self.last_sync[source.domain] = synced_at
+            self.last_counts[source.domain] = counts
+        return totals
+
+    def _rebuild(self, domain: str, rows: List[Dict[str, Any]]):
+        if domain == "food":
+            usable = [r for r in rows if all(k in r["data"] for k in FOOD_FIELDS)]
+            if len(usable) < len(rows):
+                print(f"Catalog: skipped {len(rows) - len(usable)} food items missing {FOOD_FIELDS}")
+            # Swap in whole objects so concurrent searches see one consistent snapshot
+            index = FoodCatalogIndex([r["data"] for r in usable])
+            self._food, self._food_synced = index, np.array([r["synced_at"] for r in usable])
+        else:
+            self._places = [{**r["data"], "_synced_at": r["synced_at"]} for r in rows]
+
+    def _freshness(self, synced_at: float, now: float) -> Dict[str, Any]:
+        age = max(0.0, now - synced_at)
+        return {
+            "synced_at": datetime.fromtimestamp(synced_at, timezone.utc).isoformat(timespec="seconds"),
+            "age_seconds": int(age),
+            "stale": age > self.stale_after
+        }
+
+    async def search_food(
+        self,
+        location: str,
+        query: str = None,
+        cuisine: str = None,
+        open_now: bool = False,
+        radius_km: float = None,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Food discovery from the local catalog; an unknown location is not filtered on"""
+        await self._current()
+        # Only "lat,lng" or a known locality; a fuzzy geocode would rank by a guessed point
+        coords = mock_ondc.coordinates(location)
+        index, synced = self._food, self._food_synced
+        now = time.time()
+
+        results = []
+        for entry_id, score, distance_km in index.search(
+            query=query,
+            cuisine=cuisine,
+            location=coords,
+            radius_km=radius_km if coords else None,
+            open_now=open_now,
+            limit=limit
+        ):
+            restaurant = dict(index.entries[entry_id])
+            if distance_km is not None:
+                restaurant["distance_km"] = distance_km
+            restaurant["open_now"] = index.is_open(entry_id)
+            restaurant["score"] = score
+            restaurant["freshness"] = self._freshness(float(synced[entry_id]), now)
+            results.append(restaurant)
+        return results
+
+    async def search_places(self, location: str, category: str = "all") -> List[Dict[str, Any]]:
+        """
+        Place discovery (PGs, gyms, events) from the local catalog
+
+        Catalog places carry a locality in their name or location rather than
+        coordinates, so a known locality keeps the places that mention it; any
+        other location is not filtered on.
+        """
+        await self._current()
+        locality = _known_locality(location)
+        now = time.time()
+        results = []
+        for place in self._places:
+            if category != "all" and place.get("category_key") != category:
+                continue
+            if locality and locality not in f"{place.get('name', '')} {place.get('location', '')}".lower():
+                continue
+            result = {k: v for k, v in place.items() if k not in ("_synced_at", "category_key")}
+            result["freshness"] = self._freshness(place["_synced_at"], now)
+            results.append(result)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            domain: {
+                "last_sync_age_seconds": round(now - synced_at, 1),
+                **self.last_counts.get(domain, {})
+            }
+            for domain, synced_at in self.last_sync.items()
+        }
+
+
+def _known_locality(location: Optional[str]) -> Optional[str]:
+    """Lowercase locality name if location names one the catalog knows"""
+    key = (location or "").lower().strip().replace(" ", "_")
+    return key.replace("_", " ") if key in mock_ondc.bengaluru_locations else None
+
+
+# Singleton instance
+catalog_sync = CatalogSync([MockCatalogSource("food"), MockCatalogSource("places")])
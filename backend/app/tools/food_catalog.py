@@ -0,0 +1,214 @@
+"""
+In-memory restaurant catalog index
+Posting lists per name token, cuisine and specialty token, vectorized geo
+filtering and heap-based top-K ranking, so food discovery stays fast with
+thousands of catalog entries.
+"""
+import bisect
+import heapq
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import numpy as np
+
+from app.tools.distance_matrix import distance_engine
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Field weights for a matched query token
+NAME_WEIGHT = 3.0
+SPECIALTY_WEIGHT = 2.0
+CUISINE_WEIGHT = 1.0
+
+# Ranking blend: relevance, rating, proximity
+RANK_WEIGHTS = (0.5, 0.3, 0.2)
+PROXIMITY_HALF_KM = 2.0  # Distance at which the proximity score halves
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class _Postings:
+    """Token -> entry ids, with prefix lookup over a sorted vocabulary"""
+
+    def __init__(self):
+        self.lists: Dict[str, Any] = defaultdict(list)
+        self.vocab: List[str] = []
+
+    def add(self, token: str, entry_id: int):
+        self.lists[token].append(entry_id)
+
+    def freeze(self):
+        """Finish building: sort the vocabulary, turn posting lists into arrays"""
+        self.vocab = sorted(self.lists)
+        for token in self.vocab:
+            self.lists[token] = np.unique(np.asarray(self.lists[token], dtype=np.int64))
+
+    def prefix(self, prefix: str) -> np.ndarray:
+        """Ids of entries with any token starting with `prefix` (may repeat)"""
+        start = bisect.bisect_left(self.vocab, prefix)
+        arrays = []
+        for token in self.vocab[start:]:
+            if not token.startswith(prefix):
+                break
+            arrays.append(self.lists[token])
+        return np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64)
+
+
+class FoodCatalogIndex:
+    """Searchable snapshot of restaurant catalog entries"""
+
+    def __init__(self, entries: Iterable[Dict[str, Any]] = ()):
+        self.build(entries)
+
+    def build(self, entries: Iterable[Dict[str, Any]]):
+        """
+        Index entries
+
+        Each entry needs name, cuisine ("North Indian, Chinese"), rating,
+        latitude and longitude; specialties (list) and hours (list of
+        ["HH:MM", "HH:MM"], closing may pass midnight) are optional.
+        """
+        self.entries: List[Dict[str, Any]] = list(entries)
+        self._names = _Postings()
+        self._specialties = _Postings()
+        self._cuisines = _Postings()  # Keyed by whole cuisine ("south indian")
+        self._cuisine_tokens = _Postings()  # Keyed by cuisine word ("south")
+        self._hours: List[List[Tuple[int, int]]] = []
+
+        for i, entry in enumerate(self.entries):
+            for token in tokenize(entry["name"]):
+                self._names.add(token, i)
+            for specialty in entry.get("specialties", []):
+                for token in tokenize(specialty):
+                    self._specialties.add(token, i)
+            for cuisine in entry["cuisine"].split(","):
+                tokens = tokenize(cuisine)
+                self._cuisines.add(" ".join(tokens), i)
+                for token in tokens:
+                    self._cuisine_tokens.add(token, i)
+            self._hours.append([(_minutes(a), _minutes(b)) for a, b in entry.get("hours", [])])
+
+        for postings in (self._names, self._specialties, self._cuisines, self._cuisine_tokens):
+            postings.freeze()
+
+        self._coords = np.array(
+            [[e["latitude"], e["longitude"]] for e in self.entries], dtype=np.float64
+        ).reshape(-1, 2)
+        self._ratings = np.array([e.get("rating", 0.0) for e in self.entries], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def is_open(self, entry_id: int, now: datetime = None) -> bool:
+        """Whether an entry is open at `now` (IST); entries without hours count as open"""
+        hours = self._hours[entry_id]
+        if not hours:
+            return True
+        now = (now or datetime.now(IST)).astimezone(IST)
+        minute = now.hour * 60 + now.minute
+        for opens, closes in hours:
+            if opens <= closes:
+                if opens <= minute < closes:
+                    return True
+            elif minute >= opens or minute < closes:  # Past midnight
+                return True
+        return False
+
+    def search(
+        self,
+        query: str = None,
+        cuisine: str = None,
+        location: Tuple[float, float] = None,
+        radius_km: float = None,
+        open_now: bool = False,
+        limit: int = 10,
+        now: datetime = None
+    ) -> List[Tuple[int, float, Optional[float]]]:
+        """
+        Rank catalog entries
+
+        Args:
+            query: Every word must prefix-match a name, specialty or cuisine word
+            cuisine: Keep entries serving a cuisine containing this text
+            location: (lat, lng) for distances, the radius filter and proximity
+            radius_km: Drop entries farther than this from `location`
+            open_now: Drop entries closed at `now`
+            limit: Top-K to return
+
+        Returns:
+            (entry id, score, distance in km or None), best first
+        """
+        # Boolean masks over all entries keep the filters vectorized
+        keep = np.ones(len(self.entries), dtype=bool)
+
+        if cuisine:
+            wanted = " ".join(tokenize(cuisine))
+            served = np.zeros(len(self.entries), dtype=bool)
+            for name, ids in self._cuisines.lists.items():
+                if wanted in name:
+                    served[ids] = True
+            keep &= served
+
+        relevance = np.zeros(len(self.entries))
+        tokens = tokenize(query or "")
+        for token in tokens:
+            # Ascending weights: a later field overwrites with the higher score
+            token_score = np.zeros(len(self.entries))
+            token_score[self._cuisine_tokens.prefix(token)] = CUISINE_WEIGHT
+            token_score[self._specialties.prefix(token)] = SPECIALTY_WEIGHT
+            token_score[self._names.prefix(token)] = NAME_WEIGHT
+            keep &= token_score > 0
+            relevance += token_score
+
+        ids = np.flatnonzero(keep)
+
+        distances = None
+        if location is not None and len(ids):
+            distances = distance_engine.haversine_km([location], self._coords[ids])[0]
+            if radius_km is not None:
+                near = distances <= radius_km
+                ids, distances = ids[near], distances[near]
+
+        if open_now and len(ids):
+            is_open = np.array([self.is_open(int(i), now) for i in ids], dtype=bool)
+            ids = ids[is_open]
+            if distances is not None:
+                distances = distances[is_open]
+        if not len(ids):
+            return []
+
+        # Vectorized blend of the three ranking signals
+        w_relevance, w_rating, w_proximity = RANK_WEIGHTS
+        if tokens:
+            relevance_score = relevance[ids] / (NAME_WEIGHT * len(tokens))
+        else:
+            relevance_score = np.ones(len(ids))
+        proximity = (
+            PROXIMITY_HALF_KM / (PROXIMITY_HALF_KM + distances)
+            if distances is not None else np.full(len(ids), 0.5)
+        )
+        scores = (
+            w_relevance * relevance_score
+            + w_rating * self._ratings[ids] / 5
+            + w_proximity * proximity
+        )
+
+        # Top-K without sorting every candidate
+        best = heapq.nlargest(limit, range(len(ids)), key=scores.__getitem__)
+        return [
+            (
+                int(ids[k]),
+                round(float(scores[k]), 4),
+                round(float(distances[k]), 2) if distances is not None else None
+            )
+            for k in best
+        ]
@@ -0,0 +1,483 @@
+"""
+Compiled GTFS index
+Built from an operator's routes, trips, stop_times, stops, frequencies and
+calendar files: ordered stops per trip, arrivals per stop, a stop-name index,
+a spatial grid of stops and a headway table per line, stop and service day
+type. Each part is rebuilt only when its own source file changes.
+Pickled to a snapshot file so a new process loads it in milliseconds
+instead of downloading and parsing the feed.
+
+stop_times, millions of rows for a city feed, is held as parallel typed
+arrays: ids interned to small ints and times as seconds past midnight,
+about 10 bytes a row instead of a dict of strings.
+"""
+import copy
+import csv
+import io
+import math
+import os
+import pickle
+import sys
+import time
+from array import array
+from collections import defaultdict
+from operator import itemgetter
+from typing import List, Dict, Any, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.tools.distance_matrix import distance_engine
+
+SNAPSHOT_VERSION = 6  # Bump when the pickled layout changes
+GRID_DEGREES = 0.01  # Spatial cell size, about 1.1 km
+NAME_MATCH_CACHE = 4096
+NO_TIME = -1  # Arrival seconds for a stop time without an arrival_time
+HEADWAY_BINS = 24  # Hours of the day; service-day times past 24:00 count on the next morning
+HEADWAY_SOURCES = ("trips", "stop_times", "frequencies", "calendar")  # Parts the headway table is derived from
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+ALL_WEEK = (1 << len(WEEKDAYS)) - 1  # Weekday bitmask (bit 0 is Monday) of a service not in calendar.txt
+
+
+class Route(NamedTuple):
+    route_id: str
+    route_short_name: str
+    route_long_name: str
+    route_desc: str
+
+
+class Stop(NamedTuple):
+    stop_id: str
+    stop_name: str
+    stop_lat: Optional[float]
+    stop_lon: Optional[float]
+
+
+def _columns(text: str, *names: str) -> Iterator[Tuple[str, ...]]:
+    """Rows of a GTFS CSV file as tuples of the named columns ("" where absent)"""
+    reader = csv.reader(io.StringIO(text))
+    header = [name.lstrip("\ufeff").strip() for name in next(reader, [])]
+    width = len(header)
+    pick = itemgetter(*(header.index(name) if name in header else width for name in names))
+    for row in reader:
+        if not row:
+            continue
+        if len(row) <= width:
+            row.extend([""] * (width + 1 - len(row)))
+        yield pick(row)
+
+
+def seconds_of_day(hms: str) -> Optional[int]:
+    """GTFS "HH:MM:SS" (hours may exceed 23) as seconds past service-day midnight"""
+    try:
+        h, m, s = hms.split(":")
+        return int(h) * 3600 + int(m) * 60 + int(s)
+    except ValueError:
+        return None
+
+
+def _sequence(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+
+def _id_dtype(count: int):
+    return np.uint16 if count <= np.iinfo(np.uint16).max else np.int32
+
+
+def _offsets(keys: np.ndarray, count: int) -> np.ndarray:
+    # keys sorted ascending: rows of key k are [offsets[k], offsets[k + 1])
+    return np.concatenate(([0], np.cumsum(np.bincount(keys, minlength=count)))).astype(np.int64)
+
+
+class GTFSIndex:
+    """Lookup structures for one operator's static feed"""
+
+    def __init__(
+        self, routes: str, trips: str, stop_times: str, stops: str, frequencies: str = "", calendar: str = ""
+    ):
+        """Build every part from the files' CSV text (frequencies.txt and calendar.txt are optional)"""
+        self.built_at = time.time()
+        # Per source file: validators and content hash for conditional refresh
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.build_seconds: Dict[str, float] = {}  # Per source file, for rebuild-avoided metrics
+        self.rows: Dict[str, int] = {}
+        for feed, text in (
+            ("routes", routes), ("trips", trips), ("stop_times", stop_times), ("stops", stops),
+            ("frequencies", frequencies), ("calendar", calendar)
+        ):
+            self._build_part(feed, text)
+        self._build_headways()
+
+    def _build_part(self, feed: str, text: str):
+        # Each source file feeds its own structures, so parts rebuild independently
+        started = time.perf_counter()
+        self.rows[feed] = getattr(self, f"_build_{feed}")(text)
+        if feed in ("trips", "stop_times"):
+            self._share_trip_ids()
+        self.build_seconds[feed] = time.perf_counter() - started
+
+    def _build_routes(self, text: str) -> int:
+        self.routes: Dict[str, Route] = {}
+        for row in _columns(text, "route_id", "route_short_name", "route_long_name", "route_desc"):
+            self.routes[row[0]] = Route(*row)
+        return len(self.routes)
+
+    def _build_trips(self, text: str) -> int:
+        # Trip ids are interned so the stop_times part shares the same strings
+        self.trip_order: List[str] = []
+        self.line_trips: Dict[Tuple[str, str], str] = {}  # One representative trip per line and direction
+        self._trip_position: Dict[str, int] = {}
+        route_ids: Dict[str, int] = {}
+        lines: Dict[Tuple[str, str], int] = {}
+        service_ids: Dict[str, int] = {}
+        trip_route, trip_line, trip_service = array("i"), array("i"), array("i")
+        for trip_id, route_id, direction, service_id in _columns(
+            text, "trip_id", "route_id", "direction_id", "service_id"
+        ):
+            trip_id = sys.intern(trip_id)
+            self._trip_position[trip_id] = len(self.trip_order)
+            self.trip_order.append(trip_id)
+            trip_route.append(route_ids.setdefault(route_id, len(route_ids)))
+            line = (route_id, direction or "0")
+            trip_line.append(lines.setdefault(line, len(lines)))
+            trip_service.append(service_ids.setdefault(service_id, len(service_ids)))
+            self.line_trips.setdefault(line, trip_id)
+        self._route_ids: List[str] = list(route_ids)
+        self._service_ids: List[str] = list(service_ids)
+        self._trip_route = np.frombuffer(trip_route, dtype=np.int32).astype(_id_dtype(len(route_ids)))
+        self._trip_line = np.frombuffer(trip_line, dtype=np.int32).astype(_id_dtype(len(lines)))
+        self._trip_service = np.frombuffer(trip_service, dtype=np.int32).astype(_id_dtype(len(service_ids)))
+        return len(self.trip_order)
+
+    def _build_stop_times(self, text: str) -> int:
+        trip_ids: Dict[str, int] = {}
+        stop_ids: Dict[str, int] = {}
+        times: Dict[str, int] = {}  # A timetable repeats the same few thousand times
+        trips, stops, sequences, seconds = array("i"), array("i"), array("i"), array("i")
+        for trip_id, stop_id, sequence, arrival in _columns(
+            text, "trip_id", "stop_id", "stop_sequence", "arrival_time"
+        ):
+            trip = trip_ids.get(trip_id)
+            if trip is None:
+                trip = trip_ids[sys.intern(trip_id)] = len(trip_ids)
+            stop = stop_ids.get(stop_id)
+            if stop is None:
+                stop = stop_ids[sys.intern(stop_id)] = len(stop_ids)
+            at = times.get(arrival)
+            if at is None:
+                parsed = seconds_of_day(arrival)
+                at = times[arrival] = NO_TIME if parsed is None else parsed
+            trips.append(trip)
+            stops.append(stop)
+            sequences.append(_sequence(sequence))
+            seconds.append(at)
+
+        trip_col = np.frombuffer(trips, dtype=np.int32)
+        stop_col = np.frombuffer(stops, dtype=np.int32)
+        sequence_col = np.frombuffer(sequences, dtype=np.int32)
+        time_col = np.frombuffer(seconds, dtype=np.int32)
+        stop_dtype = _id_dtype(len(stop_ids))
+
+        # Per trip, in stop_sequence order (ties keep file order)
+        by_trip = np.lexsort((sequence_col, trip_col))
+        self._st_trip_ids: List[str] = list(trip_ids)
+        self._st_trip_position = trip_ids
+        self._trip_offsets = _offsets(trip_col[by_trip], len(trip_ids))
+        self._trip_stops = stop_col[by_trip].astype(stop_dtype)
+        self._trip_times = time_col[by_trip]
+        # Sequences are increasing but need not be contiguous or start at 1
+        small = len(sequence_col) and sequence_col.min() >= 0 and sequence_col.max() <= np.iinfo(np.uint16).max
+        self._trip_sequences = sequence_col[by_trip].astype(np.uint16 if small else np.int32)
+
+        # Per stop, in file order, only stop times with an arrival: positions
+        # into the per-trip arrays, which already hold the time and the trip
+        timed = np.flatnonzero(time_col != NO_TIME)
+        by_stop = timed[np.argsort(stop_col[timed], kind="stable")]
+        trip_row = np.empty(len(by_trip), dtype=np.int32)
+        trip_row[by_trip] = np.arange(len(by_trip), dtype=np.int32)
+        self._st_stop_ids: List[str] = list(stop_ids)
+        self._st_stop_position = stop_ids
+        self._stop_offsets = _offsets(stop_col[by_stop], len(stop_ids))
+        self._stop_arrival_rows = trip_row[by_stop]
+        return len(trip_col)
+
+    def _build_stops(self, text: str) -> int:
+        # Stop-name index: lowercased name -> stop (the last stop of a name wins,
+        # as in a name-keyed dict) plus file order for first-match lookups
+        self.stops: Dict[str, Stop] = {}
+        self.stop_by_name: Dict[str, Stop] = {}
+        self.names_in_order: List[Tuple[str, Stop]] = []
+        self._name_matches: Dict[str, List[Stop]] = {}
+        grid: Dict[Tuple[int, int], List[str]] = defaultdict(list)
+        count = 0
+        for stop_id, name, lat, lng in _columns(text, "stop_id", "stop_name", "stop_lat", "stop_lon"):
+            count += 1
+            try:
+                lat, lng = float(lat), float(lng)
+            except ValueError:
+                lat = lng = None
+            stop = Stop(sys.intern(stop_id), name, lat, lng)
+            self.stops[stop.stop_id] = stop
+            lowered = name.lower()
+            self.stop_by_name[lowered] = stop
+            self.names_in_order.append((lowered, stop))
+            if lat is not None:
+                grid[self._cell(lat, lng)].append(stop.stop_id)
+        self._grid: Dict[Tuple[int, int], List[str]] = dict(grid)
+        return count
+
+    def _build_frequencies(self, text: str) -> int:
+        # Frequency-based trips: their stop_times are a template run every
+        # headway_secs from start_time until end_time
+        self._frequency_trips: List[str] = []
+        windows = array("i")
+        for trip_id, start, end, headway in _columns(text, "trip_id", "start_time", "end_time", "headway_secs"):
+            start, end = seconds_of_day(start), seconds_of_day(end)
+            if start is None or end is None or not headway.isdigit() or int(headway) <= 0:
+                continue
+            self._frequency_trips.append(sys.intern(trip_id))
+            windows.extend((start, end, int(headway)))
+        self._frequency_windows = np.frombuffer(windows, dtype=np.int32).reshape(-1, 3).copy()
+        return len(self._frequency_trips)
+
+    def _build_calendar(self, text: str) -> int:
+        # Weekly pattern of each service; date ranges and calendar_dates.txt
+        # exceptions are not applied
+        self._service_weekdays: Dict[str, int] = {}
+        for row in _columns(text, "service_id", *WEEKDAYS):
+            self._service_weekdays[row[0]] = sum(1 << day for day, flag in enumerate(row[1:]) if flag.strip() == "1")
+        return len(self._service_weekdays)
+
+    def _build_headways(self):
+        """
+        Departures per hour of every line (route and direction) at every stop,
+        per service day type
+
+        Timetabled trips count their own stop times; frequency-based trips are
+        expanded from their template over each window. A trip counts on the
+        weekdays its service runs (every day if calendar.txt does not list
+        it), and its stop times past 24:00 on the following weekday. Weekdays
+        with the same services share one day type.
+        """
+        trip_count, stop_count = len(self._st_trip_ids), max(len(self._st_stop_ids), 1)
+        # Line and weekdays of each stop_times trip; line -1 when trips.txt does not list it
+        positions = np.array([self._trip_position.get(t, -1) for t in self._st_trip_ids], dtype=np.int64)
+        st_line = np.append(self._trip_line.astype(np.int64), -1)[positions]
+        service_days = [self._service_weekdays.get(s, ALL_WEEK) for s in self._service_ids]
+        st_days = np.array(service_days + [ALL_WEEK], dtype=np.int64)[
+            np.append(self._trip_service.astype(np.int64), len(service_days))[positions]
+        ]
+        templates = np.array([self._st_trip_position.get(t, -1) for t in self._frequency_trips], dtype=np.int64)
+        templated = np.zeros(trip_count + 1, dtype=bool)
+        templated[templates] = True  # -1 marks the spare last slot
+
+        row_trip = np.repeat(np.arange(trip_count), np.diff(self._trip_offsets))
+        timetabled = (self._trip_times != NO_TIME) & ~templated[row_trip] & (st_line[row_trip] >= 0)
+        lines = [st_line[row_trip[timetabled]]]
+        stops = [self._trip_stops[timetabled].astype(np.int64)]
+        times = [self._trip_times[timetabled].astype(np.int64)]
+        days = [st_days[row_trip[timetabled]]]
+
+        for trip, (start, end, headway) in zip(templates.tolist(), self._frequency_windows.tolist()):
+            if trip < 0 or st_line[trip] < 0:
+                continue
+            first, last = self._trip_offsets[trip], self._trip_offsets[trip + 1]
+            template = self._trip_times[first:last]
+            timed = template != NO_TIME
+            if not timed.any():
+                continue
+            offsets = template[timed].astype(np.int64) - template[timed][0]
+            departures = np.arange(start, end, headway, dtype=np.int64)
+            times.append((departures[:, None] + offsets[None, :]).ravel())
+            stops.append(np.tile(self._trip_stops[first:last][timed].astype(np.int64), len(departures)))
+            lines.append(np.full(len(departures) * len(offsets), st_line[trip], dtype=np.int64))
+            days.append(np.full(len(departures) * len(offsets), st_days[trip], dtype=np.int64))
+
+        # Day type of each weekday: weekdays whose own services and whose
+        # previous day's services (for times past 24:00) match share one
+        weekday = np.arange(len(WEEKDAYS))
+        patterns = np.unique(np.append(st_days, ALL_WEEK))
+        runs = (patterns[:, None] >> weekday) & 1
+        signatures = np.concatenate((runs, np.roll(runs, 1, axis=1))).T
+        _, first, self._day_types = np.unique(signatures, axis=0, return_index=True, return_inverse=True)
+
+        # One row per (line, stop) pair, sorted by line then stop
+        pairs, pair_of = np.unique(np.concatenate(lines) * stop_count + np.concatenate(stops), return_inverse=True)
+        times, days = np.concatenate(times), np.concatenate(days)
+        cells = pair_of * HEADWAY_BINS + times // 3600 % HEADWAY_BINS
+        next_day = times >= 24 * 3600
+        counts = np.stack([
+            np.bincount(
+                cells[((days >> np.where(next_day, (day - 1) % len(WEEKDAYS), day)) & 1).astype(bool)],
+                minlength=len(pairs) * HEADWAY_BINS
+            )
+            for day in first.tolist()
+        ])
+        self._departures = np.minimum(counts, 255).astype(np.uint8).reshape(len(first), -1, HEADWAY_BINS)
+        self._day_types = self._day_types.astype(np.uint8).reshape(-1)
+        self._line_offsets = _offsets(pairs // stop_count, len(self.line_trips))
+        self._line_stops = (pairs % stop_count).astype(_id_dtype(stop_count))
+
+    def updated(self, changed: Dict[str, str]) -> "GTFSIndex":
+        """
+        A new index with the parts built from `changed` files rebuilt
+
+        Unchanged parts are shared with this index, which stays valid for
+        readers still holding it.
+        """
+        index = copy.copy(self)
+        index.built_at = time.time()
+        index.sources = {feed: dict(source) for feed, source in self.sources.items()}
+        index.build_seconds = dict(self.build_seconds)
+        index.rows = dict(self.rows)
+        for feed, text in changed.items():
+            index._build_part(feed, text)
+        if any(feed in changed for feed in HEADWAY_SOURCES):
+            index._build_headways()
+        return index
+
+    def _share_trip_ids(self):
+        # stop_times usually lists trips in trips.txt order: keep one id list and map
+        if hasattr(self, "trip_order") and hasattr(self, "_st_trip_ids") and self._st_trip_ids == self.trip_order:
+            self._st_trip_ids, self._st_trip_position = self.trip_order, self._trip_position
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._name_matches = {}
+        # Position maps are the id lists inverted; rebuilt rather than pickled
+        self._trip_position = {trip_id: i for i, trip_id in enumerate(self.trip_order)}
+        self._st_trip_position = (
+            self._trip_position if self._st_trip_ids is self.trip_order
+            else {trip_id: i for i, trip_id in enumerate(self._st_trip_ids)}
+        )
+        self._st_stop_position = {stop_id: i for i, stop_id in enumerate(self._st_stop_ids)}
+
+    def __getstate__(self):
+        # Name matches are a per-process memo and position maps are derived
+        derived = ("_name_matches", "_trip_position", "_st_trip_position", "_st_stop_position")
+        return {name: value for name, value in self.__dict__.items() if name not in derived}
+
+    @staticmethod
+    def _cell(lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / GRID_DEGREES)), int(math.floor(lng / GRID_DEGREES))
+
+    def route_for_trip(self, trip_id: str) -> Optional[Route]:
+        """The route a trip runs on, if both are in the feed"""
+        position = self._trip_position.get(trip_id)
+        if position is None:
+            return None
+        return self.routes.get(self._route_ids[self._trip_route[position]])
+
+    def trip_stops(self, trip_id: str) -> List[str]:
+        """Stop ids of a trip in stop_sequence order (empty if unknown)"""
+        trip = self._st_trip_position.get(trip_id)
+        if trip is None:
+            return []
+        start, end = self._trip_offsets[trip], self._trip_offsets[trip + 1]
+        stop_ids = self._st_stop_ids
+        return [stop_ids[stop] for stop in self._trip_stops[start:end].tolist()]
+
+    def trip_schedule(self, trip_id: str) -> List[Tuple[str, Optional[int]]]:
+        """(stop_id, scheduled arrival seconds or None) for a trip in stop_sequence order"""
+        trip = self._st_trip_position.get(trip_id)
+        if trip is None:
+            return []
+        start, end = self._trip_offsets[trip], self._trip_offsets[trip + 1]
+        stop_ids = self._st_stop_ids
+        return [
+            (stop_ids[stop], None if seconds == NO_TIME else seconds)
+            for stop, seconds in zip(self._trip_stops[start:end].tolist(), self._trip_times[start:end].tolist())
+        ]
+
+    def trip_sequences(self, trip_id: str) -> List[int]:
+        """stop_sequence values of a trip's stop times, in the order of trip_stops()"""
+        trip = self._st_trip_position.get(trip_id)
+        if trip is None:
+            return []
+        return self._trip_sequences[self._trip_offsets[trip]:self._trip_offsets[trip + 1]].tolist()
+
+    def stop_arrivals(self, stop_id: str) -> List[Tuple[int, str]]:
+        """(scheduled arrival seconds, trip_id) at a stop, in feed order"""
+        stop = self._st_stop_position.get(stop_id)
+        if stop is None:
+            return []
+        rows = self._stop_arrival_rows[self._stop_offsets[stop]:self._stop_offsets[stop + 1]]
+        trips = np.searchsorted(self._trip_offsets, rows, side="right") - 1
+        trip_ids = self._st_trip_ids
+        return [(seconds, trip_ids[trip]) for seconds, trip in zip(self._trip_times[rows].tolist(), trips.tolist())]
+
+    def headway(self, trip_id: str, stop_id: str, seconds: int, weekday: int) -> Optional[int]:
+        """
+        Average seconds between departures of the trip's line (route and
+        direction) at a stop, in the hour of day containing `seconds` on
+        `weekday` (Monday is 0)
+
+        None when the line does not call there in that hour.
+        """
+        position = self._trip_position.get(trip_id)
+        stop = self._st_stop_position.get(stop_id)
+        if position is None or stop is None:
+            return None
+        line = self._trip_line[position]
+        start, end = self._line_offsets[line], self._line_offsets[line + 1]
+        row = start + int(np.searchsorted(self._line_stops[start:end], stop))
+        if row == end or self._line_stops[row] != stop:
+            return None
+        day_type = self._day_types[weekday % len(WEEKDAYS)]
+        departures = int(self._departures[day_type, row, seconds // 3600 % HEADWAY_BINS])
+        return 3600 // departures if departures else None
+
+    def match_stops(self, text: str) -> List[Stop]:
+        """Stops whose lowercased name contains `text` (one per distinct name)"""
+        needle = text.lower()
+        matches = self._name_matches.get(needle)
+        if matches is None:
+            matches = [s for name, s in self.stop_by_name.items() if needle in name]
+            if len(self._name_matches) >= NAME_MATCH_CACHE:
+                self._name_matches.clear()
+            self._name_matches[needle] = matches
+        return matches
+
+    def first_stop(self, text: str) -> Optional[Stop]:
+        """First stop in feed order whose name contains `text`"""
+        needle = text.lower()
+        return next((s for name, s in self.names_in_order if needle in name), None)
+
+    def nearby_stops(self, lat: float, lng: float, radius_km: float = 0.5, limit: int = 10) -> List[Tuple[Stop, float]]:
+        """Stops within `radius_km`, nearest first, as (stop, distance_km)"""
+        reach = int(math.ceil(radius_km / (GRID_DEGREES * 111.0))) + 1
+        row, col = self._cell(lat, lng)
+        candidates = [
+            self.stops[stop_id]
+            for r in range(row - reach, row + reach + 1)
+            for c in range(col - reach, col + reach + 1)
+            for stop_id in self._grid.get((r, c), ())
+        ]
+        if not candidates:
+            return []
+        distances = distance_engine.haversine_km([(lat, lng)], [(s.stop_lat, s.stop_lon) for s in candidates])[0]
+        near = sorted(
+            (float(d), stop.stop_id) for d, stop in zip(distances, candidates) if d <= radius_km
+        )[:limit]
+        return [(self.stops[stop_id], round(d, 3)) for d, stop_id in near]
+
+    def save(self, path: str):
+        """Write the snapshot atomically (readers never see a partial file)"""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((SNAPSHOT_VERSION, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path: str, max_age: float) -> Optional["GTFSIndex"]:
+        """Snapshot from `path` if it exists, matches this version and is younger than max_age"""
+        try:
+            if time.time() - os.path.getmtime(path) > max_age:
+                return None
+            with open(path, "rb") as f:
+                version, index = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError):
+            return None
+        return index if version == SNAPSHOT_VERSION else None
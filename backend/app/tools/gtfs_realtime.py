@@ -0,0 +1,290 @@
+"""
+GTFS-Realtime ingestion
+Polls TripUpdates and VehiclePositions feeds, decodes them off the event loop
+and keeps a delay table layered over the static index. Only trips whose
+update changed are re-applied; each delay carries down the trip's later stops.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Set, Tuple, NamedTuple
+
+from google.transit import gtfs_realtime_pb2
+
+from app.metrics import track_upstream
+from app.tools.gtfs_index import GTFSIndex
+from app.tools.http_pool import pooled_client
+
+Relationship = gtfs_realtime_pb2.TripDescriptor.ScheduleRelationship
+StopRelationship = gtfs_realtime_pb2.TripUpdate.StopTimeUpdate.ScheduleRelationship
+Occupancy = gtfs_realtime_pb2.VehiclePosition.OccupancyStatus
+
+# Occupancy status -> the "crowding" level arrivals report
+CROWDING = {
+    Occupancy.EMPTY: "low",
+    Occupancy.MANY_SEATS_AVAILABLE: "low",
+    Occupancy.FEW_SEATS_AVAILABLE: "medium",
+    Occupancy.STANDING_ROOM_ONLY: "high",
+    Occupancy.CRUSHED_STANDING_ROOM_ONLY: "high",
+    Occupancy.FULL: "high",
+}
+
+
+class StopUpdate(NamedTuple):
+    stop_id: Optional[str]
+    stop_sequence: Optional[int]
+    delay: Optional[int]  # Seconds
+    time: Optional[int]  # Absolute POSIX time, when the feed gives that instead of a delay
+    skipped: bool
+
+
+class TripUpdateRecord(NamedTuple):
+    trip_id: str
+    digest: str  # Of the encoded entity: equal digests mean nothing changed
+    cancelled: bool
+    stops: List[StopUpdate]
+    start_date: Optional[str] = None  # Service day (YYYYMMDD) the trip runs on, if the feed says
+
+
+def decode_trip_updates(content: bytes) -> Tuple[int, List[TripUpdateRecord]]:
+    """Parse a TripUpdates feed into plain records (CPU-bound; run in a thread)"""
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(content)
+    records = []
+    for entity in feed.entity:
+        if not entity.HasField("trip_update") or entity.is_deleted:
+            continue
+        update = entity.trip_update
+        stops = [
+            StopUpdate(
+                stop_id=stu.stop_id or None,
+                stop_sequence=stu.stop_sequence if stu.HasField("stop_sequence") else None,
+                delay=_event_field(stu, "delay"),
+                time=_event_field(stu, "time"),
+                skipped=stu.schedule_relationship == StopRelationship.SKIPPED,
+            )
+            for stu in update.stop_time_update
+        ]
+        records.append(TripUpdateRecord(
+            trip_id=update.trip.trip_id,
+            digest=hashlib.blake2b(update.SerializeToString(deterministic=True), digest_size=12).hexdigest(),
+            cancelled=update.trip.schedule_relationship == Relationship.CANCELED,
+            stops=stops,
+            start_date=update.trip.start_date or None,
+        ))
+    return feed.header.timestamp, records
+
+
+def _event_field(stop_time_update, name: str) -> Optional[int]:
+    # Arrival if given, else departure
+    for event in (stop_time_update.arrival, stop_time_update.departure):
+        if event.HasField(name):
+            return getattr(event, name)
+    return None
+
+
+def decode_vehicle_positions(content: bytes) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+    """Latest vehicle state per trip (CPU-bound; run in a thread)"""
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(content)
+    vehicles = {}
+    for entity in feed.entity:
+        if not entity.HasField("vehicle") or not entity.vehicle.trip.trip_id:
+            continue
+        vehicle = entity.vehicle
+        vehicles[vehicle.trip.trip_id] = {
+            "vehicle_id": vehicle.vehicle.id,
+            "lat": vehicle.position.latitude,
+            "lng": vehicle.position.longitude,
+            "crowding": CROWDING.get(vehicle.occupancy_status) if vehicle.HasField("occupancy_status") else None,
+            "timestamp": vehicle.timestamp,
+        }
+    return feed.header.timestamp, vehicles
+
+
+class DelayTable:
+    """
+    Real-time delays over one operator's static timetable
+
+    trips[trip_id][stop_id] is the delay in seconds at that stop, or None
+    when the stop is skipped. Stops before a trip's first update have no
+    entry and keep their scheduled time.
+    """
+
+    def __init__(self):
+        self.trips: Dict[str, Dict[str, Optional[int]]] = {}
+        self.cancelled: Set[str] = set()
+        self.vehicles: Dict[str, Dict[str, Any]] = {}
+        self._digests: Dict[str, str] = {}
+        self._index_built_at: Optional[float] = None
+        self.feed_timestamp = 0
+        self.applied = 0
+        self.unchanged = 0
+
+    def apply_trip_updates(self, records: List[TripUpdateRecord], index: GTFSIndex) -> int:
+        """Apply a full TripUpdates feed; returns how many trips changed"""
+        if index.built_at != self._index_built_at:
+            # New timetable: stop lists may differ, so re-apply everything
+            self._digests.clear()
+            self._index_built_at = index.built_at
+
+        changed = 0
+        seen = set()
+        for record in records:
+            seen.add(record.trip_id)
+            if self._digests.get(record.trip_id) == record.digest:
+                self.unchanged += 1
+                continue
+            self._digests[record.trip_id] = record.digest
+            self._apply(record, index)
+            changed += 1
+
+        # A full dataset no longer carrying a trip means it runs to schedule again
+        for trip_id in [t for t in self._digests if t not in seen]:
+            self._forget(trip_id)
+            changed += 1
+        self.applied += changed
+        return changed
+
+    def _forget(self, trip_id: str):
+        self._digests.pop(trip_id, None)
+        self.trips.pop(trip_id, None)
+        self.cancelled.discard(trip_id)
+
+    def _apply(self, record: TripUpdateRecord, index: GTFSIndex):
+        self.trips.pop(record.trip_id, None)
+        self.cancelled.discard(record.trip_id)
+        if record.cancelled:
+            self.cancelled.add(record.trip_id)
+            return
+
+        schedule = index.trip_schedule(record.trip_id)
+        if not schedule:
+            return  # Not in the static timetable (e.g. an added trip)
+        stop_ids = [stop_id for stop_id, _ in schedule]
+        positions = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+        # stop_sequence names a stop time even on loops that visit a stop twice
+        sequence_positions = {sequence: i for i, sequence in enumerate(index.trip_sequences(record.trip_id))}
+
+        # Each update's delay holds from its stop until the next update
+        at_position: Dict[int, Tuple[Optional[int], bool]] = {}
+        for update in record.stops:
+            position = sequence_positions.get(update.stop_sequence)
+            if position is None:
+                position = positions.get(update.stop_id)
+            if position is None:
+                continue
+            delay = update.delay
+            if delay is None and update.time is not None:
+                delay = self._delay_from_time(update.time, schedule[position][1], record.start_date)
+            at_position[position] = (delay, update.skipped)
+
+        if not at_position:
+            return
+        delays: Dict[str, Optional[int]] = {}
+        current = 0
+        for position in range(min(at_position), len(stop_ids)):
+            skipped = False
+            if position in at_position:
+                delay, skipped = at_position[position]
+                if delay is not None:
+                    current = delay
+            delays[stop_ids[position]] = None if skipped else current
+        self.trips[record.trip_id] = delays
+
+    @staticmethod
+    def _delay_from_time(when: int, scheduled: Optional[int], start_date: Optional[str] = None) -> Optional[int]:
+        """
+        Delay of an absolute time against a scheduled time of day
+
+        Scheduled times count from the midnight of the trip's service day,
+        which is the day before the calendar day for stops past 24:00. Without
+        a start_date the neighbouring service day giving the smallest delay
+        is used.
+        """
+        if scheduled is None:
+            return None
+        if start_date:
+            try:
+                return int(when - datetime.strptime(start_date, "%Y%m%d").timestamp()) - scheduled
+            except ValueError:
+                pass  # Malformed: fall back to the nearest service day
+        midnight = datetime.fromtimestamp(when).replace(hour=0, minute=0, second=0, microsecond=0)
+        delays = [
+            int(when - (midnight + timedelta(days=days)).timestamp()) - scheduled
+            for days in (-1, 0, 1)
+        ]
+        return min(delays, key=abs)
+
+    def stop_delay(self, trip_id: str, stop_id: str) -> Tuple[bool, Optional[int]]:
+        """(has real-time data, delay seconds or None if the stop is skipped/trip cancelled)"""
+        if trip_id in self.cancelled:
+            return True, None
+        delays = self.trips.get(trip_id)
+        if delays is None or stop_id not in delays:
+            return False, 0
+        return True, delays[stop_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "trips_delayed": len(self.trips),
+            "trips_cancelled": len(self.cancelled),
+            "vehicles": len(self.vehicles),
+            "feed_age_seconds": round(time.time() - self.feed_timestamp, 1) if self.feed_timestamp else None,
+            "applied": self.applied,
+            "unchanged": self.unchanged,
+        }
+
+
+class RealtimeFeed:
+    """One operator's GTFS-RT endpoints and the delay table they feed"""
+
+    def __init__(self, operator: str, trip_updates_url: Optional[str], vehicle_positions_url: Optional[str] = None):
+        self.operator = operator
+        self.trip_updates_url = trip_updates_url
+        self.vehicle_positions_url = vehicle_positions_url
+        self.table = DelayTable()
+
+    async def _download(self, url: str, feed_type: str) -> Optional[bytes]:
+        async with pooled_client("gtfs_rt") as client:
+            try:
+                with track_upstream("gtfs_rt", feed_type):
+                    response = await client.get(url)
+                    response.raise_for_status()
+                return response.content
+            except Exception as e:
+                print(f"Error fetching GTFS-RT {feed_type} for {self.operator}: {e}")
+                return None
+
+    async def poll_once(self, index: GTFSIndex) -> int:
+        """Fetch both feeds and apply what changed; returns changed trips"""
+        changed = 0
+        if self.trip_updates_url:
+            content = await self._download(self.trip_updates_url, "trip_updates")
+            if content:
+                timestamp, records = await asyncio.to_thread(decode_trip_updates, content)
+                changed = self.table.apply_trip_updates(records, index)
+                self.table.feed_timestamp = timestamp or int(time.time())
+        if self.vehicle_positions_url:
+            content = await self._download(self.vehicle_positions_url, "vehicle_positions")
+            if content:
+                _, self.table.vehicles = await asyncio.to_thread(decode_vehicle_positions, content)
+        return changed
+
+
+def realtime_feeds_from_env(static_urls: Dict[str, str]) -> Dict[str, RealtimeFeed]:
+    """
+    Configured real-time feeds keyed by static feed URL
+
+    static_urls maps operator prefix (BMTC, BMRCL) to its static GTFS URL;
+    <PREFIX>_GTFS_RT_URL and <PREFIX>_GTFS_RT_VEHICLES_URL enable polling.
+    """
+    feeds = {}
+    for prefix, static_url in static_urls.items():
+        trip_updates = os.getenv(f"{prefix}_GTFS_RT_URL")
+        vehicles = os.getenv(f"{prefix}_GTFS_RT_VEHICLES_URL")
+        if trip_updates or vehicles:
+            feeds[static_url] = RealtimeFeed(prefix, trip_updates, vehicles)
+    return feeds
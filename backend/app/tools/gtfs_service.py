@@ -2,12 +2,21 @@
 Real GTFS integration for BMTC and BMRCL (Namma Metro)
 Fetches live transit data from public APIs
 """
+import asyncio
+import hashlib
 import os
-import httpx
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-import csv
-import io
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+
+from app.metrics import GTFS_BYTES_SAVED, GTFS_REBUILD_AVOIDED, GTFS_REFRESH_FILES, track_upstream, record_cache
+from app.tracing import span
+from app.tools.gtfs_index import GTFSIndex, Stop
+from app.tools.gtfs_realtime import DelayTable, RealtimeFeed, realtime_feeds_from_env
+from app.tools.http_pool import pooled_client
+
+INDEX_FEEDS = ("routes", "trips", "stop_times", "stops", "frequencies", "calendar")
+OPTIONAL_FEEDS = ("frequencies", "calendar")  # GTFS files an operator may not publish
+INDEX_TTL = 3600  # Seconds before an in-memory index is revalidated against the feed
 
 
 class GTFSService:
@@ -17,40 +26,231 @@ class GTFSService:
         self.bmtc_url = os.getenv("BMTC_GTFS_URL", "https://iudx.org.in/bmtc")
         self.bmrcl_url = os.getenv("BMRCL_GTFS_URL", "https://opendata.bengaluru.gov.in/bmrcl")
         
-        # Cache GTFS data for 1 hour
-        self._cache = {}
-        self._cache_expiry = {}
+        # Last download of each GTFS file (for metrics)
+        self._cache_fetched_at = {}
+        self._cache_bytes = {}
+        self._cache_rows = {}
+        
+        # Compiled indexes per feed URL, with a snapshot on disk shared by processes
+        self.snapshot_dir = os.getenv("GTFS_SNAPSHOT_DIR", "gtfs_snapshots")
+        self.snapshot_max_age = float(os.getenv("GTFS_SNAPSHOT_MAX_AGE", "86400"))
+        self._indexes: Dict[str, GTFSIndex] = {}
+        self._index_builds: Dict[str, asyncio.Task] = {}
+        
+        # GTFS-Realtime delay tables per static feed URL (configured in poll_realtime)
+        self.realtime: Dict[str, RealtimeFeed] = {}
+        self.realtime_interval = float(os.getenv("GTFS_RT_POLL_INTERVAL", "15"))
     
-    async def _fetch_gtfs_feed(self, url: str, feed_type: str) -> Dict:
-        """Fetch and parse GTFS feed"""
-        cache_key = f"{url}_{feed_type}"
+    async def _fetch_gtfs_feed(
+        self,
+        url: str,
+        feed_type: str,
+        source: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Fetch a GTFS file unless it is unchanged since `source`
+        
+        Revalidates with If-None-Match / If-Modified-Since, and compares the
+        body's hash when the server sends the file anyway.
         
-        # Check cache
-        if cache_key in self._cache:
-            if datetime.now() < self._cache_expiry.get(cache_key, datetime.now()):
-                return self._cache[cache_key]
+        Returns:
+            (outcome, text, source): outcome is "not_modified", "unchanged",
+            "changed" or "error"; the CSV text only for "changed" (the index
+            parses it); source holds the validators and hash to send next time
+        """
+        cache_key = f"{url}_{feed_type}"
+        headers = {}
+        if source:
+            if source.get("etag"):
+                headers["If-None-Match"] = source["etag"]
+            if source.get("last_modified"):
+                headers["If-Modified-Since"] = source["last_modified"]
         
-        # Fetch fresh data
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with pooled_client("gtfs") as client:
             try:
-                response = await client.get(f"{url}/{feed_type}.txt")
-                response.raise_for_status()
-                
-                # Parse CSV
-                data = []
-                csv_reader = csv.DictReader(io.StringIO(response.text))
-                for row in csv_reader:
-                    data.append(row)
-                
-                # Cache for 1 hour
-                self._cache[cache_key] = data
-                self._cache_expiry[cache_key] = datetime.now() + timedelta(hours=1)
+                with span("gtfs.fetch_feed", feed=feed_type, conditional=bool(headers)):
+                    with span("gtfs.download"), track_upstream("gtfs", feed_type):
+                        response = await client.get(f"{url}/{feed_type}.txt", headers=headers)
+                        # An optional file the operator does not publish reads as empty
+                        missing = response.status_code == 404 and feed_type in OPTIONAL_FEEDS
+                        if response.status_code != 304 and not missing:
+                            response.raise_for_status()
+                    
+                    previous = source or {}
+                    text = None
+                    if response.status_code == 304:
+                        outcome = "not_modified"
+                        content_hash, size, row_count = previous["sha256"], previous.get("bytes", 0), previous.get("rows", 0)
+                        GTFS_BYTES_SAVED.labels(feed_type).inc(size)
+                    else:
+                        body = b"" if missing else response.content
+                        content_hash, size = hashlib.sha256(body).hexdigest(), len(body)
+                        if content_hash == previous.get("sha256"):
+                            # Re-sent but identical (no validators, or a new ETag for the same bytes)
+                            outcome, row_count = "unchanged", previous.get("rows", 0)
+                        else:
+                            # Rows are counted when the index parses the text
+                            outcome, text, row_count = "changed", "" if missing else response.text, None
                 
-                return data
+                self._cache_fetched_at[cache_key] = datetime.now()
+                self._cache_bytes[cache_key] = size
+                if row_count is not None:
+                    self._cache_rows[cache_key] = row_count
+                record_cache("gtfs_feed", "miss" if outcome == "changed" else "hit")
+                GTFS_REFRESH_FILES.labels(feed_type, outcome).inc()
+                return outcome, text, {
+                    "etag": response.headers.get("etag") or previous.get("etag"),
+                    "last_modified": response.headers.get("last-modified") or previous.get("last_modified"),
+                    "sha256": content_hash,
+                    "bytes": size,
+                    "rows": row_count,
+                }
             
             except Exception as e:
                 print(f"Error fetching GTFS feed {feed_type}: {e}")
-                return []
+                GTFS_REFRESH_FILES.labels(feed_type, "error").inc()
+                return "error", None, source
+    
+    def _snapshot_path(self, url: str) -> str:
+        name = hashlib.sha1(url.encode()).hexdigest()[:16]
+        return os.path.join(self.snapshot_dir, f"{name}.pickle")
+    
+    async def _build_index(self, url: str, previous: Optional[GTFSIndex] = None) -> GTFSIndex:
+        """
+        Build the index, or refresh `previous` rebuilding only the parts whose
+        source files changed
+        """
+        sources = previous.sources if previous else {}
+        results = await asyncio.gather(*(
+            self._fetch_gtfs_feed(url, name, sources.get(name)) for name in INDEX_FEEDS
+        ))
+        outcomes = {name: outcome for name, (outcome, _, _) in zip(INDEX_FEEDS, results)}
+        changed = {name: text for name, (outcome, text, _) in zip(INDEX_FEEDS, results) if outcome == "changed"}
+        
+        with span("gtfs.build_index", url=url, changed=",".join(changed) or "none"):
+            if previous is None:
+                index = await asyncio.to_thread(GTFSIndex, *(changed.get(name) or "" for name in INDEX_FEEDS))
+            elif changed:
+                index = await asyncio.to_thread(previous.updated, changed)
+            else:
+                index = previous.updated({})
+        if previous is not None:
+            GTFS_REBUILD_AVOIDED.inc(sum(
+                seconds for name, seconds in previous.build_seconds.items() if name not in changed
+            ))
+        for name, (outcome, _, source) in zip(INDEX_FEEDS, results):
+            if outcome == "changed":
+                source["rows"] = self._cache_rows[f"{url}_{name}"] = index.rows[name]
+            if outcome != "error":
+                index.sources[name] = source
+        
+        if "error" in outcomes.values() or (previous is None and len(changed) < len(INDEX_FEEDS)):
+            # Download failed: serve what we have but rebuild on the next call
+            index.built_at = 0
+        elif self.snapshot_dir:
+            try:
+                os.makedirs(self.snapshot_dir, exist_ok=True)
+                await asyncio.to_thread(index.save, self._snapshot_path(url))
+            except OSError as e:
+                print(f"Error writing GTFS snapshot: {e}")
+        return index
+    
+    def load_snapshot(self, url: str) -> Optional[GTFSIndex]:
+        """Adopt a compiled snapshot from disk if a fresh one exists (blocking)"""
+        if not self.snapshot_dir:
+            return None
+        index = GTFSIndex.load(self._snapshot_path(url), self.snapshot_max_age)
+        if index is not None:
+            self._indexes[url] = index
+        return index
+    
+    async def _index(self, url: str) -> GTFSIndex:
+        """
+        Compiled index for a feed
+        
+        Order of preference: in memory, snapshot on disk, fresh download. An
+        expired in-memory index keeps serving while a rebuild runs behind it.
+        """
+        index = self._indexes.get(url)
+        if self._fresh(index):
+            record_cache("gtfs_index", "hit")
+            return index
+        
+        build = self._index_builds.get(url)
+        if build is None:
+            # Another process may have rebuilt the snapshot already
+            snapshot = await asyncio.to_thread(self.load_snapshot, url)
+            index = snapshot or index
+            if self._fresh(index):
+                record_cache("gtfs_index", "hit")
+                return index
+            
+            record_cache("gtfs_index", "miss")
+            build = asyncio.create_task(self._build_index(url, index))
+            self._index_builds[url] = build
+            build.add_done_callback(lambda task: self._adopt_index(url, task))
+        
+        if index is not None:
+            return index  # Stale but usable
+        return await asyncio.shield(build)
+    
+    def _fresh(self, index: Optional[GTFSIndex]) -> bool:
+        return index is not None and datetime.now().timestamp() - index.built_at < INDEX_TTL
+    
+    def _adopt_index(self, url: str, task: asyncio.Task):
+        self._index_builds.pop(url, None)
+        if not task.cancelled() and task.exception() is None:
+            self._indexes[url] = task.result()
+    
+    async def poll_realtime(self):
+        """Background task: keep the delay tables current (returns if no RT feed is configured)"""
+        self.realtime = realtime_feeds_from_env({"BMTC": self.bmtc_url, "BMRCL": self.bmrcl_url})
+        if not self.realtime:
+            return
+        while True:
+            for url, feed in self.realtime.items():
+                try:
+                    index = await self._index(url)
+                    await feed.poll_once(index)
+                except Exception as e:
+                    print(f"Error polling GTFS-RT for {feed.operator}: {e}")
+            await asyncio.sleep(self.realtime_interval)
+    
+    def _delays(self, url: str) -> Optional[DelayTable]:
+        feed = self.realtime.get(url)
+        return feed.table if feed else None
+    
+    async def warm(self):
+        """Load or build both operators' indexes (called from process prewarm)"""
+        await asyncio.gather(self._index(self.bmtc_url), self._index(self.bmrcl_url))
+    
+    def place_names(self) -> List[str]:
+        """Stop and station names from the loaded indexes (empty before warm())"""
+        return sorted({
+            stop.stop_name
+            for index in self._indexes.values()
+            for stop in index.stops.values()
+        })
+    
+    async def nearby_stops(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float = 0.5,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Bus stops and metro stations near a point, nearest first"""
+        results = []
+        for url, operator in ((self.bmtc_url, "BMTC"), (self.bmrcl_url, "Namma Metro (BMRCL)")):
+            index = await self._index(url)
+            for stop, distance_km in index.nearby_stops(latitude, longitude, radius_km, limit):
+                results.append({
+                    "stop_id": stop.stop_id,
+                    "stop_name": stop.stop_name,
+                    "operator": operator,
+                    "distance_km": distance_km
+                })
+        return sorted(results, key=lambda r: r["distance_km"])[:limit]
     
     async def search_routes(
         self, 
@@ -70,134 +270,155 @@ class GTFSService:
         routes = []
         
         # Search BMTC routes
-        bmtc_routes = await self._search_bmtc_routes(origin, destination)
+        with span("gtfs.search_bmtc"):
+            bmtc_routes = await self._search_bmtc_routes(origin, destination)
         routes.extend(bmtc_routes)
         
         # Search Metro routes
-        metro_routes = await self._search_metro_routes(origin, destination)
+        with span("gtfs.search_metro"):
+            metro_routes = await self._search_metro_routes(origin, destination)
         routes.extend(metro_routes)
         
         return routes
     
     async def _search_bmtc_routes(self, origin: str, destination: str) -> List[Dict[str, Any]]:
         """Search BMTC bus routes"""
-        # Fetch routes and stops
-        routes_data = await self._fetch_gtfs_feed(self.bmtc_url, "routes")
-        trips_data = await self._fetch_gtfs_feed(self.bmtc_url, "trips")
-        stop_times_data = await self._fetch_gtfs_feed(self.bmtc_url, "stop_times")
-        stops_data = await self._fetch_gtfs_feed(self.bmtc_url, "stops")
-        
-        # Build stop name to ID mapping
-        stop_map = {stop["stop_name"].lower(): stop for stop in stops_data}
+        index = await self._index(self.bmtc_url)
         
-        # Find stops matching origin and destination
-        origin_stops = [s for name, s in stop_map.items() if origin.lower() in name]
-        dest_stops = [s for name, s in stop_map.items() if destination.lower() in name]
+        with span("gtfs.stop_matching", operator="BMTC"):
+            # Find stops matching origin and destination
+            origin_stops = index.match_stops(origin)
+            dest_stops = index.match_stops(destination)
         
         if not origin_stops or not dest_stops:
             return []
         
+        with span("gtfs.trip_scan", operator="BMTC"):
+            return self._scan_bmtc_trips(
+                origin, destination, origin_stops, dest_stops, index, self._now_seconds(), self._today()
+            )
+    
+    def _scan_bmtc_trips(
+        self,
+        origin: str,
+        destination: str,
+        origin_stops: List[Stop],
+        dest_stops: List[Stop],
+        index: GTFSIndex,
+        now_seconds: int,
+        weekday: int
+    ) -> List[Dict[str, Any]]:
+        """Find BMTC trips serving both origin and destination stops"""
         matching_routes = []
         
+        # stop_times.txt carries only stop ids; names come from stops.txt
+        stop_names = {s.stop_id: s.stop_name for s in origin_stops + dest_stops}
+        origin_ids = {s.stop_id for s in origin_stops}
+        dest_ids = {s.stop_id for s in dest_stops}
+        
         # Find routes that connect these stops
-        for trip in trips_data[:100]:  # Limit for performance
-            route_id = trip["route_id"]
-            trip_id = trip["trip_id"]
+        for trip_id in index.trip_order[:100]:  # Limit for performance
+            trip_stop_ids = index.trip_stops(trip_id)
             
-            # Get stops for this trip
-            trip_stops = [st for st in stop_times_data if st["trip_id"] == trip_id]
-            trip_stop_ids = [st["stop_id"] for st in trip_stops]
+            origin_idx = next((i for i, stop_id in enumerate(trip_stop_ids) if stop_id in origin_ids), None)
+            dest_idx = next((i for i, stop_id in enumerate(trip_stop_ids) if stop_id in dest_ids), None)
             
             # Check if both origin and destination are in this trip
-            origin_in_trip = any(s["stop_id"] in trip_stop_ids for s in origin_stops)
-            dest_in_trip = any(s["stop_id"] in trip_stop_ids for s in dest_stops)
+            if origin_idx is None or dest_idx is None:
+                continue
+            
+            # Find the route info
+            route_info = index.route_for_trip(trip_id)
             
-            if origin_in_trip and dest_in_trip:
-                # Find the route info
-                route_info = next((r for r in routes_data if r["route_id"] == route_id), None)
+            if route_info and origin_idx < dest_idx:
+                # Calculate journey details
+                stops_count = dest_idx - origin_idx + 1
+                duration_mins = stops_count * 5  # Avg 5 mins per stop
+                headway = index.headway(trip_id, trip_stop_ids[origin_idx], now_seconds, weekday)
                 
-                if route_info:
-                    # Calculate journey details
-                    origin_idx = next((i for i, st in enumerate(trip_stops) 
-                                     if any(s["stop_id"] == st["stop_id"] for s in origin_stops)), 0)
-                    dest_idx = next((i for i, st in enumerate(trip_stops) 
-                                   if any(s["stop_id"] == st["stop_id"] for s in dest_stops)), len(trip_stops)-1)
-                    
-                    if origin_idx < dest_idx:
-                        stops_count = dest_idx - origin_idx + 1
-                        duration_mins = stops_count * 5  # Avg 5 mins per stop
-                        
-                        matching_routes.append({
-                            "type": "direct_bus",
-                            "route_id": route_info["route_short_name"],
-                            "route_name": route_info["route_long_name"],
-                            "operator": "BMTC",
-                            "from_stop": trip_stops[origin_idx]["stop_name"] if origin_idx < len(trip_stops) else origin,
-                            "to_stop": trip_stops[dest_idx]["stop_name"] if dest_idx < len(trip_stops) else destination,
-                            "stops_count": stops_count,
-                            "duration_minutes": duration_mins,
-                            "fare": self._calculate_bmtc_fare(stops_count),
-                            "frequency_mins": 15,  # Default
-                            "ac": "Vayu Vajra" in route_info.get("route_long_name", ""),
-                            "next_arrival_mins": 5  # Mock real-time
-                        })
+                matching_routes.append({
+                    "type": "direct_bus",
+                    "route_id": route_info.route_short_name,
+                    "route_name": route_info.route_long_name,
+                    "operator": "BMTC",
+                    "from_stop": stop_names.get(trip_stop_ids[origin_idx], origin),
+                    "to_stop": stop_names.get(trip_stop_ids[dest_idx], destination),
+                    "stops_count": stops_count,
+                    "duration_minutes": duration_mins,
+                    "fare": self._calculate_bmtc_fare(stops_count),
+                    "frequency_mins": self._headway_mins(headway, 15),
+                    "ac": "Vayu Vajra" in route_info.route_long_name,
+                    "next_arrival_mins": self._expected_wait_mins(headway, 5)
+                })
         
         return matching_routes[:3]  # Return top 3
     
     async def _search_metro_routes(self, origin: str, destination: str) -> List[Dict[str, Any]]:
         """Search Namma Metro routes"""
-        # Fetch metro data
-        routes_data = await self._fetch_gtfs_feed(self.bmrcl_url, "routes")
-        stops_data = await self._fetch_gtfs_feed(self.bmrcl_url, "stops")
-        stop_times_data = await self._fetch_gtfs_feed(self.bmrcl_url, "stop_times")
+        index = await self._index(self.bmrcl_url)
         
-        # Build stop mapping
-        stop_map = {stop["stop_name"].lower(): stop for stop in stops_data}
-        
-        # Find matching stops
-        origin_stops = [s for name, s in stop_map.items() if origin.lower() in name]
-        dest_stops = [s for name, s in stop_map.items() if destination.lower() in name]
+        with span("gtfs.stop_matching", operator="BMRCL"):
+            # Find matching stops
+            origin_stops = index.match_stops(origin)
+            dest_stops = index.match_stops(destination)
         
         if not origin_stops or not dest_stops:
             return []
         
+        with span("gtfs.trip_scan", operator="BMRCL"):
+            return self._scan_metro_lines(
+                origin, destination, origin_stops, dest_stops, index, self._now_seconds(), self._today()
+            )
+    
+    def _scan_metro_lines(
+        self,
+        origin: str,
+        destination: str,
+        origin_stops: List[Stop],
+        dest_stops: List[Stop],
+        index: GTFSIndex,
+        now_seconds: int,
+        weekday: int
+    ) -> List[Dict[str, Any]]:
+        """Find metro lines serving both origin and destination stations"""
         matching_routes = []
+        stop_names = {s.stop_id: s.stop_name for s in origin_stops + dest_stops}
+        origin_ids = {s.stop_id for s in origin_stops}
+        dest_ids = {s.stop_id for s in dest_stops}
         
-        # Check each metro line
-        for route in routes_data:
+        # Check each metro line (in both directions)
+        for (route_id, _), trip_id in index.line_trips.items():
+            route = index.routes.get(route_id)
+            if route is None:
+                continue
+            
             # Get all stops on this line
-            line_stops = [st for st in stop_times_data if st["route_id"] == route["route_id"]]
-            line_stop_ids = [st["stop_id"] for st in line_stops]
+            line_stop_ids = index.trip_stops(trip_id)
             
             # Check if both stops are on this line
-            origin_on_line = any(s["stop_id"] in line_stop_ids for s in origin_stops)
-            dest_on_line = any(s["stop_id"] in line_stop_ids for s in dest_stops)
+            origin_idx = next((i for i, stop_id in enumerate(line_stop_ids) if stop_id in origin_ids), None)
+            dest_idx = next((i for i, stop_id in enumerate(line_stop_ids) if stop_id in dest_ids), None)
             
-            if origin_on_line and dest_on_line:
-                origin_idx = next((i for i, st in enumerate(line_stops) 
-                                 if any(s["stop_id"] == st["stop_id"] for s in origin_stops)), 0)
-                dest_idx = next((i for i, st in enumerate(line_stops) 
-                               if any(s["stop_id"] == st["stop_id"] for s in dest_stops)), len(line_stops)-1)
+            if origin_idx is not None and dest_idx is not None and origin_idx < dest_idx:
+                stations_count = dest_idx - origin_idx + 1
+                duration_mins = stations_count * 3  # 3 mins per station
+                distance_km = stations_count * 1.5  # 1.5 km per station avg
+                fare = 10 + int(distance_km * 2)  # ₹10 base + ₹2/km
+                headway = index.headway(trip_id, line_stop_ids[origin_idx], now_seconds, weekday)
                 
-                if origin_idx < dest_idx:
-                    stations_count = dest_idx - origin_idx + 1
-                    duration_mins = stations_count * 3  # 3 mins per station
-                    distance_km = stations_count * 1.5  # 1.5 km per station avg
-                    fare = 10 + int(distance_km * 2)  # ₹10 base + ₹2/km
-                    
-                    matching_routes.append({
-                        "type": "metro",
-                        "line_id": route["route_short_name"],
-                        "line_name": route["route_long_name"],
-                        "operator": "Namma Metro (BMRCL)",
-                        "from_station": line_stops[origin_idx]["stop_name"] if origin_idx < len(line_stops) else origin,
-                        "to_station": line_stops[dest_idx]["stop_name"] if dest_idx < len(line_stops) else destination,
-                        "stations_count": stations_count,
-                        "duration_minutes": duration_mins,
-                        "fare": fare,
-                        "frequency_mins": 10,
-                        "next_arrival_mins": 3
-                    })
+                matching_routes.append({
+                    "type": "metro",
+                    "line_id": route.route_short_name,
+                    "line_name": route.route_long_name,
+                    "operator": "Namma Metro (BMRCL)",
+                    "from_station": stop_names.get(line_stop_ids[origin_idx], origin),
+                    "to_station": stop_names.get(line_stop_ids[dest_idx], destination),
+                    "stations_count": stations_count,
+                    "duration_minutes": duration_mins,
+                    "fare": fare,
+                    "frequency_mins": self._headway_mins(headway, 10),
+                    "next_arrival_mins": self._expected_wait_mins(headway, 3)
+                })
         
         return matching_routes
     
@@ -212,47 +433,93 @@ class GTFSService:
         Note: Real-time data requires GTFS-Realtime feed or API
         This implementation uses schedule-based predictions
         """
-        # Fetch stop times
-        stop_times = await self._fetch_gtfs_feed(self.bmtc_url, "stop_times")
-        stops = await self._fetch_gtfs_feed(self.bmtc_url, "stops")
-        routes = await self._fetch_gtfs_feed(self.bmtc_url, "routes")
+        index = await self._index(self.bmtc_url)
         
         # Find the stop
-        matching_stops = [s for s in stops if stop_name.lower() in s["stop_name"].lower()]
+        with span("gtfs.stop_matching", operator="BMTC"):
+            stop = index.first_stop(stop_name)
         
-        if not matching_stops:
+        if stop is None:
             return []
         
-        stop_id = matching_stops[0]["stop_id"]
+        stop_id = stop.stop_id
         
         # Get upcoming arrivals (schedule-based)
-        now = datetime.now()
-        current_time = now.strftime("%H:%M:%S")
+        now_seconds = self._now_seconds()
         
-        arrivals = []
-        for st in stop_times:
-            if st["stop_id"] == stop_id:
-                # Calculate minutes until arrival
-                arrival_time = st.get("arrival_time", "")
-                if arrival_time:
-                    # Simple time diff calculation
-                    arrival_mins = self._time_diff_minutes(current_time, arrival_time)
-                    
-                    if 0 <= arrival_mins <= 60:  # Next hour only
-                        route_info = next((r for r in routes if r["route_id"] == st["route_id"]), None)
-                        
-                        if route_info:
-                            arrivals.append({
-                                "route_id": route_info["route_short_name"],
-                                "route_name": route_info["route_long_name"],
-                                "arrival_mins": arrival_mins,
-                                "destination": route_info.get("route_desc", ""),
-                                "crowding": "medium",  # Mock
-                                "ac": "Vayu Vajra" in route_info.get("route_long_name", "")
-                            })
+        with span("gtfs.arrival_scan", stop_id=stop_id):
+            arrivals = self._scan_arrivals(stop_id, now_seconds, index, self._delays(self.bmtc_url))
         
         return sorted(arrivals, key=lambda x: x["arrival_mins"])[:5]
     
+    def _scan_arrivals(
+        self,
+        stop_id: str,
+        now_seconds: int,
+        index: GTFSIndex,
+        delays: Optional[DelayTable] = None
+    ) -> List[Dict[str, Any]]:
+        """Arrivals at a stop within the next hour, with real-time delays where known"""
+        arrivals = []
+        for scheduled, trip_id in index.stop_arrivals(stop_id):
+            realtime, delay = delays.stop_delay(trip_id, stop_id) if delays else (False, 0)
+            if realtime and delay is None:
+                continue  # Trip cancelled or stop skipped
+            
+            arrival_mins = int((scheduled + delay - now_seconds) / 60)
+            
+            if 0 <= arrival_mins <= 60:  # Next hour only
+                route_info = index.route_for_trip(trip_id)
+                
+                if route_info:
+                    arrival = {
+                        "route_id": route_info.route_short_name,
+                        "route_name": route_info.route_long_name,
+                        "arrival_mins": arrival_mins,
+                        "destination": route_info.route_desc,
+                        "crowding": "medium",  # Mock
+                        "ac": "Vayu Vajra" in route_info.route_long_name
+                    }
+                    vehicle = delays.vehicles.get(trip_id) if delays else None
+                    if vehicle and vehicle["crowding"]:
+                        arrival["crowding"] = vehicle["crowding"]
+                    if realtime:
+                        arrival["delay_mins"] = round(delay / 60)
+                        arrival["realtime"] = True
+                    arrivals.append(arrival)
+        
+        return arrivals
+    
+    def feed_stats(self) -> List[Dict[str, Any]]:
+        """Age and size of every cached GTFS file (for metrics)"""
+        now = datetime.now()
+        return [
+            {
+                "feed": cache_key,
+                "age_seconds": (now - fetched_at).total_seconds(),
+                "rows": self._cache_rows.get(cache_key, 0),
+                "bytes": self._cache_bytes.get(cache_key, 0)
+            }
+            for cache_key, fetched_at in self._cache_fetched_at.items()
+        ]
+    
+    def _now_seconds(self) -> int:
+        """Seconds since local midnight"""
+        now = datetime.now()
+        return now.hour * 3600 + now.minute * 60 + now.second
+    
+    def _today(self) -> int:
+        """Local weekday (Monday is 0)"""
+        return datetime.now().weekday()
+    
+    def _headway_mins(self, headway: Optional[int], default: int) -> int:
+        """Scheduled minutes between departures (default if the line has no service this hour)"""
+        return max(1, round(headway / 60)) if headway else default
+    
+    def _expected_wait_mins(self, headway: Optional[int], default: int) -> int:
+        """Expected wait for a rider turning up at a random time: half a headway"""
+        return round(headway / 120) if headway else default
+    
     def _calculate_bmtc_fare(self, stops: int) -> int:
         """Calculate BMTC fare based on stops/distance"""
         if stops <= 5:
@@ -263,16 +530,6 @@ class GTFSService:
             return 20
         else:
             return 25
-    
-    def _time_diff_minutes(self, time1: str, time2: str) -> int:
-        """Calculate difference between two times in minutes"""
-        try:
-            t1 = datetime.strptime(time1, "%H:%M:%S")
-            t2 = datetime.strptime(time2, "%H:%M:%S")
-            diff = (t2 - t1).total_seconds() / 60
-            return int(diff)
-        except:
-            return 0
 
 
 # Singleton instance
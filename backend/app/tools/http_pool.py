@@ -0,0 +1,61 @@
+"""
+Shared httpx clients
+One keep-alive AsyncClient per upstream and event loop, instead of a new
+client (TLS context, connection pool) for every call.
+"""
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+import httpx
+
+# Default timeout per upstream, in seconds
+TIMEOUTS = {
+    "mappls": 5.0,
+    "gtfs": 30.0,
+    "gtfs_rt": 10.0,
+    "ondc": 5.0,
+}
+LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+# Connections belong to the loop that opened them, so clients are kept per loop
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _loop() -> asyncio.AbstractEventLoop:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        # Prewarm runs before the job's loop starts; it is already set as current
+        return asyncio.get_event_loop_policy().get_event_loop()
+
+
+def get_client(upstream: str) -> httpx.AsyncClient:
+    """The shared client for an upstream on the current event loop"""
+    clients = _clients.setdefault(_loop(), {})
+    client = clients.get(upstream)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=TIMEOUTS.get(upstream, 5.0), limits=LIMITS)
+        clients[upstream] = client
+    return client
+
+
+@asynccontextmanager
+async def pooled_client(upstream: str) -> AsyncIterator[httpx.AsyncClient]:
+    """Drop-in for `async with httpx.AsyncClient() as client` that keeps the client open"""
+    yield get_client(upstream)
+
+
+def prewarm():
+    """Create every upstream's client for the current loop ahead of the first call"""
+    for upstream in TIMEOUTS:
+        get_client(upstream)
+
+
+async def aclose_all():
+    """Close the clients of the running loop"""
+    for client in _clients.pop(asyncio.get_running_loop(), {}).values():
+        await client.aclose()
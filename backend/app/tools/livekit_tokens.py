@@ -0,0 +1,143 @@
+"""
+LiveKit access token issuance
+Signs join tokens from a per-grants claims template and reuses a still-valid
+token when the same identity rejoins the same room with the same grants.
+"""
+import dataclasses
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import jwt
+from livekit import api
+from livekit.api.access_token import Claims, snake_to_lower_camel
+
+from app.metrics import record_cache
+
+DEFAULT_ROOM = "namma-guide"
+
+# (room, can_publish, can_subscribe)
+GrantsKey = Tuple[str, bool, bool]
+
+
+class LiveKitTokenService:
+    """Issues room-join JWTs equivalent to livekit.api.AccessToken.to_jwt()"""
+
+    def __init__(self):
+        self.ttl = int(os.getenv("LIVEKIT_TOKEN_TTL", str(6 * 3600)))  # Seconds, LiveKit's default
+        # Only hand out a cached token with at least this long left
+        self.min_remaining = int(os.getenv("LIVEKIT_TOKEN_MIN_REMAINING", "3600"))
+        self.cache_size = int(os.getenv("LIVEKIT_TOKEN_CACHE_SIZE", "50000"))
+        self._cache: "OrderedDict[tuple, Tuple[str, int]]" = OrderedDict()
+        self._templates: Dict[GrantsKey, Dict[str, Any]] = {}
+        self._cache_credentials: Optional[Tuple[str, str]] = None  # API key and secret digest the cache was signed with
+        self._lock = threading.Lock()  # Bulk issuance runs in a worker thread
+
+    def credentials(self) -> Tuple[Optional[str], Optional[str]]:
+        # Read per call: main.py loads .env after some modules are imported
+        return os.getenv("LIVEKIT_API_KEY"), os.getenv("LIVEKIT_API_SECRET")
+
+    @property
+    def configured(self) -> bool:
+        return all(self.credentials())
+
+    def _template(self, grants: GrantsKey) -> Dict[str, Any]:
+        # AccessToken runs dataclasses.asdict() and camel-cases every key on each
+        # call; the claims only vary by identity, name and times, so do it once
+        template = self._templates.get(grants)
+        if template is None:
+            room, can_publish, can_subscribe = grants
+            video = api.VideoGrants(
+                room_join=True,
+                room=room,
+                can_publish=can_publish,
+                can_subscribe=can_subscribe,
+            )
+            template = dataclasses.asdict(
+                Claims(video=video),
+                dict_factory=lambda items: {snake_to_lower_camel(k): v for k, v in items},
+            )
+            self._templates[grants] = template
+        return template
+
+    def _sign(
+        self, identity: str, name: str, grants: GrantsKey, now: int, api_key: str, api_secret: str
+    ) -> Tuple[str, int]:
+        expires_at = now + self.ttl
+        claims = {
+            **self._template(grants),
+            "name": name,
+            "sub": identity,
+            "iss": api_key,
+            "nbf": now,
+            "exp": expires_at,
+        }
+        return jwt.encode(claims, api_secret, algorithm="HS256"), expires_at
+
+    def issue(
+        self,
+        identity: str,
+        name: str = "Guest",
+        room: str = DEFAULT_ROOM,
+        can_publish: bool = True,
+        can_subscribe: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Join token for one participant
+
+        Returns:
+            token, identity, room and expires_at (unix seconds)
+        """
+        api_key, api_secret = self.credentials()
+        if not api_key or not api_secret:
+            raise ValueError("LiveKit not configured")
+        signed_with = (api_key, hashlib.sha256(api_secret.encode()).hexdigest())
+        grants = (room, can_publish, can_subscribe)
+        key = (identity, name, grants)
+        now = int(time.time())
+
+        with self._lock:
+            if signed_with != self._cache_credentials:
+                # Rotated key or secret: tokens signed with the old one would be rejected
+                self._cache.clear()
+                self._cache_credentials = signed_with
+            cached = self._cache.get(key)
+            fresh = cached is not None and cached[1] - now >= self.min_remaining
+            if fresh:
+                self._cache.move_to_end(key)
+        if fresh:
+            record_cache("livekit_token", "hit")
+            token, expires_at = cached
+        else:
+            record_cache("livekit_token", "miss")
+            token, expires_at = self._sign(identity, name, grants, now, api_key, api_secret)
+            with self._lock:
+                evicted = False
+                if signed_with == self._cache_credentials:  # Not rotated while signing
+                    self._cache[key] = (token, expires_at)
+                    self._cache.move_to_end(key)
+                    evicted = len(self._cache) > self.cache_size
+                    if evicted:
+                        self._cache.popitem(last=False)
+            if evicted:
+                record_cache("livekit_token", "eviction")
+
+        return {"token": token, "identity": identity, "room": room, "expires_at": expires_at}
+
+    def issue_bulk(
+        self,
+        room: str,
+        identities: List[str],
+        name: str = "Guest",
+        can_publish: bool = True,
+        can_subscribe: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Pre-issue tokens for many participants of one room"""
+        return [self.issue(identity, name, room, can_publish, can_subscribe) for identity in identities]
+
+
+# Singleton instance
+livekit_tokens = LiveKitTokenService()
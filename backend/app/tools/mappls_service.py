@@ -8,6 +8,11 @@ from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import json
 
+from app.metrics import track_upstream, record_cache
+from app.tracing import span
+from app.tools.distance_matrix import distance_engine, parse_coordinates
+from app.tools.http_pool import pooled_client
+
 
 class MapplsService:
     """Real Mappls API integration"""
@@ -17,7 +22,7 @@ class MapplsService:
         self.client_secret = os.getenv("MAPPLS_CLIENT_SECRET")
         self.api_key = os.getenv("MAPPLS_API_KEY")
         
-        self.base_url = "https://apis.mappls.com"
+        self.base_url = os.getenv("MAPPLS_BASE_URL", "https://apis.mappls.com")
         self.access_token = None
         self.token_expiry = None
     
@@ -25,19 +30,22 @@ class MapplsService:
         """Get or refresh OAuth access token"""
         # Check if token is still valid
         if self.access_token and self.token_expiry and datetime.now() < self.token_expiry:
+            record_cache("mappls_token", "hit")
             return self.access_token
+        record_cache("mappls_token", "miss")
         
         # Request new token
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/advancedmaps/v1/auth/token",
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret
-                }
-            )
-            response.raise_for_status()
+        async with pooled_client("mappls") as client:
+            with span("mappls.auth_token"), track_upstream("mappls", "auth_token"):
+                response = await client.post(
+                    f"{self.base_url}/advancedmaps/v1/auth/token",
+                    data={
+                        "grant_type": "client_credentials",
+                        "client_id": self.client_id,
+                        "client_secret": self.client_secret
+                    }
+                )
+                response.raise_for_status()
             
             data = response.json()
             self.access_token = data["access_token"]
@@ -81,20 +89,21 @@ class MapplsService:
         }
         profile = profiles.get(mode, "driving")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/advancedmaps/v1/{self.api_key}/route",
-                params={
-                    "start": origin,
-                    "destination": destination,
-                    "profile": profile,
-                    "overview": "full",
-                    "steps": "true",
-                    "traffic": "true" if traffic else "false"
-                },
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
+        async with pooled_client("mappls") as client:
+            with span("mappls.route"), track_upstream("mappls", "route"):
+                response = await client.get(
+                    f"{self.base_url}/advancedmaps/v1/{self.api_key}/route",
+                    params={
+                        "start": origin,
+                        "destination": destination,
+                        "profile": profile,
+                        "overview": "full",
+                        "steps": "true",
+                        "traffic": "true" if traffic else "false"
+                    },
+                    headers={"Authorization": f"Bearer {token}"}
+                )
+                response.raise_for_status()
             
             data = response.json()
             
@@ -153,13 +162,14 @@ class MapplsService:
             params["location"] = f"{location[0]},{location[1]}"
             params["radius"] = radius
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/advancedmaps/v1/{self.api_key}/place_search",
-                params=params,
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
+        async with pooled_client("mappls") as client:
+            with span("mappls.place_search"), track_upstream("mappls", "place_search"):
+                response = await client.get(
+                    f"{self.base_url}/advancedmaps/v1/{self.api_key}/place_search",
+                    params=params,
+                    headers={"Authorization": f"Bearer {token}"}
+                )
+                response.raise_for_status()
             
             data = response.json()
             
@@ -209,17 +219,18 @@ class MapplsService:
         
         keyword = category_keywords.get(category, category.upper())
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/advancedmaps/v1/{self.api_key}/nearby",
-                params={
-                    "keywords": keyword,
-                    "refLocation": f"{lat},{lng}",
-                    "radius": radius
-                },
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
+        async with pooled_client("mappls") as client:
+            with span("mappls.nearby"), track_upstream("mappls", "nearby"):
+                response = await client.get(
+                    f"{self.base_url}/advancedmaps/v1/{self.api_key}/nearby",
+                    params={
+                        "keywords": keyword,
+                        "refLocation": f"{lat},{lng}",
+                        "radius": radius
+                    },
+                    headers={"Authorization": f"Bearer {token}"}
+                )
+                response.raise_for_status()
             
             data = response.json()
             
@@ -253,29 +264,47 @@ class MapplsService:
         Returns:
             Distance matrix with durations and distances
         """
-        token = await self._get_access_token()
+        origin_coords, dest_coords = list(origins), list(destinations)
         
-        # Geocode if needed
-        origin_coords = [await self._geocode(o) if not self._is_coordinates(o) else o for o in origins]
-        dest_coords = [await self._geocode(d) if not self._is_coordinates(d) else d for d in destinations]
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/advancedmaps/v1/{self.api_key}/distance_matrix/driving",
-                json={
-                    "origins": origin_coords,
-                    "destinations": dest_coords
-                },
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            response.raise_for_status()
+        try:
+            token = await self._get_access_token()
             
-            data = response.json()
+            # Geocode if needed
+            origin_coords = [await self._geocode(o) if not self._is_coordinates(o) else o for o in origins]
+            dest_coords = [await self._geocode(d) if not self._is_coordinates(d) else d for d in destinations]
             
+            async with pooled_client("mappls") as client:
+                with span("mappls.distance_matrix"), track_upstream("mappls", "distance_matrix"):
+                    response = await client.post(
+                        f"{self.base_url}/advancedmaps/v1/{self.api_key}/distance_matrix/driving",
+                        json={
+                            "origins": origin_coords,
+                            "destinations": dest_coords
+                        },
+                        headers={"Authorization": f"Bearer {token}"}
+                    )
+                    response.raise_for_status()
+                
+                data = response.json()
+                
+                return {
+                    "origin_addresses": origins,
+                    "destination_addresses": destinations,
+                    "rows": data.get("results", {}).get("rows", [])
+                }
+        except httpx.HTTPError as e:
+            # Offline fallback: straight-line estimates for whatever is already coordinates
+            print(f"Mappls distance matrix unavailable, using local estimates: {e}")
+            with span("mappls.distance_matrix_offline"):
+                rows = distance_engine.matrix(
+                    [parse_coordinates(c) for c in origin_coords],
+                    [parse_coordinates(c) for c in dest_coords]
+                )
             return {
                 "origin_addresses": origins,
                 "destination_addresses": destinations,
-                "rows": data.get("results", {}).get("rows", [])
+                "rows": rows,
+                "source": "offline_estimate"
             }
     
     # Helper methods
@@ -296,9 +325,23 @@ class MapplsService:
         except:
             return False
     
+    async def geocode(self, place: str) -> Optional[Tuple[float, float]]:
+        """Coordinates for a place name or "lat,lng" string; None if nothing matches"""
+        coords = parse_coordinates(place)
+        if coords:
+            return coords
+        try:
+            with span("mappls.geocode", place=place):
+                results = await self.place_search(place)
+        except Exception as e:
+            print(f"Mappls geocode error for {place}: {e}")
+            return None
+        return (results[0]["latitude"], results[0]["longitude"]) if results else None
+    
     async def _geocode(self, place_name: str) -> str:
         """Convert place name to coordinates"""
-        results = await self.place_search(place_name)
+        with span("mappls.geocode", place=place_name):
+            results = await self.place_search(place_name)
         if results:
             return f"{results[0]['latitude']},{results[0]['longitude']}"
         else:
@@ -2,9 +2,38 @@
 Mock GTFS (BMTC + BMRCL) for rapid development
 Simulates bus and metro schedules
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
+import heapq
 import random
+import re
+
+# (kind, line id), e.g. ("bus", "335E") or ("metro", "purple")
+LineKey = Tuple[str, str]
+
+BUS_MINS_PER_STOP = 8
+METRO_MINS_PER_STATION = 3
+METRO_KM_PER_STATION = 1.5
+INTERCHANGE_PENALTY_MINS = 5  # Walk between platforms/bays, before waiting
+
+# Different names for one interchange; stops with identical names merge anyway
+STATION_ALIASES = {
+    "majestic": [
+        "Majestic",
+        "Kempegowda Bus Station",
+        "Kempegowda",
+        "KSR Majestic",
+        "Krantiveera Sangolli Rayanna (Majestic)",
+    ],
+    "kengeri": ["Kengeri", "Kengeri Bus Station"],
+    "kr market": ["KR Market", "Krishna Rajendra Market"],
+    "rv road": ["RV Road", "Rashtriya Vidyalaya Road"],
+}
+
+
+def _normalize(name: str) -> str:
+    """Lowercase, drop punctuation and collapse spaces"""
+    return " ".join(re.sub(r"[^a-z0-9 ]", " ", name.lower()).split())
 
 
 class MockGTFSService:
@@ -12,6 +41,7 @@ class MockGTFSService:
     
     def __init__(self):
         self._initialize_routes()
+        self._build_station_index()
     
     def _initialize_routes(self):
         """Initialize mock BMTC and Metro routes"""
@@ -145,78 +175,218 @@ class MockGTFSService:
             }
         }
     
+    def _build_station_index(self):
+        """
+        Map every stop name to a place and every place to its (line, index) stops
+        
+        Stops sharing a normalized name or an alias group are one place, so
+        interchanges between lines fall out of the index.
+        """
+        alias_place = {
+            _normalize(name): place
+            for place, names in STATION_ALIASES.items()
+            for name in names
+        }
+        
+        # Place lookup by any searchable name
+        self._place_by_name: Dict[str, str] = dict(alias_place)
+        # place -> [(line_key, index)]
+        self._stops_at: Dict[str, List[Tuple[LineKey, int]]] = {}
+        # line_key -> place per stop, in line order
+        self._line_places: Dict[LineKey, List[str]] = {}
+        
+        lines = [(("bus", rid), r["stops"]) for rid, r in self.bmtc_routes.items()]
+        lines += [(("metro", lid), l["stations"]) for lid, l in self.metro_lines.items()]
+        
+        for line_key, stops in lines:
+            places = []
+            for idx, name in enumerate(stops):
+                normalized = _normalize(name)
+                place = alias_place.get(normalized, normalized)
+                self._place_by_name.setdefault(normalized, place)
+                
+                # "Krantiveera Sangolli Rayanna (Majestic)" is also found as "Majestic"
+                short = re.search(r"\(([^)]+)\)", name)
+                if short:
+                    self._place_by_name.setdefault(_normalize(short.group(1)), place)
+                
+                self._stops_at.setdefault(place, []).append((line_key, idx))
+                places.append(place)
+            self._line_places[line_key] = places
+    
+    def place_names(self) -> List[str]:
+        """Every stop, station and alias name a rider might say"""
+        names = {name for names in STATION_ALIASES.values() for name in names}
+        for route in self.bmtc_routes.values():
+            names.update(route["stops"])
+        for line in self.metro_lines.values():
+            names.update(line["stations"])
+        return sorted(names)
+    
+    def _match_places(self, query: str) -> List[str]:
+        """Places for a query: the exact name or alias if known, else every partial match"""
+        normalized = _normalize(query)
+        if not normalized:
+            return []
+        if normalized in self._place_by_name:
+            return [self._place_by_name[normalized]]
+        return sorted({
+            place for name, place in self._place_by_name.items()
+            if normalized in name
+        })
+    
+    def _line_frequency(self, line_key: LineKey) -> int:
+        kind, line_id = line_key
+        data = self.bmtc_routes[line_id] if kind == "bus" else self.metro_lines[line_id]
+        return data["frequency_mins"]
+    
+    def _leg(self, line_key: LineKey, origin_idx: int, dest_idx: int) -> Dict[str, Any]:
+        """Single-line journey, in the same shape GTFSService returns"""
+        kind, line_id = line_key
+        hops = abs(dest_idx - origin_idx)
+        
+        if kind == "bus":
+            route_data = self.bmtc_routes[line_id]
+            return {
+                "type": "direct_bus",
+                "route_id": line_id,
+                "route_name": route_data["route_name"],
+                "operator": route_data["operator"],
+                "from_stop": route_data["stops"][origin_idx],
+                "to_stop": route_data["stops"][dest_idx],
+                "stops_count": hops + 1,
+                "duration_minutes": hops * BUS_MINS_PER_STOP,
+                "fare": route_data["fare"],
+                "frequency_mins": route_data["frequency_mins"],
+                "ac": route_data["ac"],
+                "next_arrival_mins": random.randint(2, route_data["frequency_mins"])
+            }
+        
+        line_data = self.metro_lines[line_id]
+        distance_km = hops * METRO_KM_PER_STATION
+        return {
+            "type": "metro",
+            "line_id": line_id,
+            "line_name": line_data["line_name"],
+            "operator": line_data["operator"],
+            "from_station": line_data["stations"][origin_idx],
+            "to_station": line_data["stations"][dest_idx],
+            "stations_count": hops + 1,
+            "duration_minutes": hops * METRO_MINS_PER_STATION,
+            "fare": line_data["fare_base"] + int(distance_km * line_data["fare_per_km"]),
+            "frequency_mins": line_data["frequency_mins"],
+            "next_arrival_mins": random.randint(1, line_data["frequency_mins"])
+        }
+    
+    def _shortest_journey(self, origins: List[str], destinations: List[str]) -> List[Tuple[LineKey, int, int]]:
+        """
+        Dijkstra over (line, stop index) states
+        
+        Riding costs the per-stop time; changing lines at a shared place costs
+        INTERCHANGE_PENALTY_MINS plus half the new line's headway.
+        
+        Returns:
+            Legs as (line_key, from_index, to_index), empty when unreachable
+        """
+        targets = {state for place in destinations for state in self._stops_at[place]}
+        best: Dict[Tuple[LineKey, int], float] = {}
+        previous: Dict[Tuple[LineKey, int], Optional[Tuple[LineKey, int]]] = {}
+        heap = []
+        for place in origins:
+            for state in self._stops_at[place]:
+                best[state] = 0
+                previous[state] = None
+                heap.append((0, state))
+        heapq.heapify(heap)
+        
+        reached = None
+        while heap:
+            cost, state = heapq.heappop(heap)
+            if cost > best[state]:
+                continue
+            if state in targets:
+                reached = state
+                break
+            
+            line_key, idx = state
+            places = self._line_places[line_key]
+            ride = BUS_MINS_PER_STOP if line_key[0] == "bus" else METRO_MINS_PER_STATION
+            moves = [((line_key, i), ride) for i in (idx - 1, idx + 1) if 0 <= i < len(places)]
+            moves += [
+                (other, INTERCHANGE_PENALTY_MINS + self._line_frequency(other[0]) / 2)
+                for other in self._stops_at[places[idx]] if other[0] != line_key
+            ]
+            
+            for next_state, step in moves:
+                next_cost = cost + step
+                if next_cost < best.get(next_state, float("inf")):
+                    best[next_state] = next_cost
+                    previous[next_state] = state
+                    heapq.heappush(heap, (next_cost, next_state))
+        
+        if reached is None:
+            return []
+        
+        # Walk back, collapsing consecutive stops on one line into a leg
+        legs = []
+        state = reached
+        leg_end = reached
+        while state is not None:
+            prior = previous[state]
+            if prior is None or prior[0] != state[0]:
+                legs.append((state[0], state[1], leg_end[1]))
+                leg_end = prior
+            state = prior
+        return legs[::-1]
+    
     async def search_routes(
         self, 
         origin: str,
         destination: str
     ) -> List[Dict[str, Any]]:
-        """Find bus/metro routes between origin and destination"""
+        """
+        Find bus/metro routes between origin and destination
         
-        origin_lower = origin.lower()
-        dest_lower = destination.lower()
+        Returns every single-line journey (direct_bus/metro, as GTFSService
+        does) plus the fastest journey with interchanges when that beats them.
+        """
+        origin_places = self._match_places(origin)
+        dest_places = [p for p in self._match_places(destination) if p not in origin_places]
+        if not origin_places or not dest_places:
+            return []
         
         routes = []
         
-        # Search BMTC routes
-        for route_id, route_data in self.bmtc_routes.items():
-            stops_lower = [s.lower() for s in route_data["stops"]]
-            
-            origin_match = any(origin_lower in stop for stop in stops_lower)
-            dest_match = any(dest_lower in stop for stop in stops_lower)
-            
-            if origin_match and dest_match:
-                # Find indices
-                origin_idx = next((i for i, s in enumerate(stops_lower) if origin_lower in s), 0)
-                dest_idx = next((i for i, s in enumerate(stops_lower) if dest_lower in s), len(stops_lower) - 1)
-                
-                if origin_idx < dest_idx:
-                    duration_mins = (dest_idx - origin_idx) * 8  # 8 mins per stop
-                    
-                    routes.append({
-                        "type": "direct_bus",
-                        "route_id": route_id,
-                        "route_name": route_data["route_name"],
-                        "operator": route_data["operator"],
-                        "from_stop": route_data["stops"][origin_idx],
-                        "to_stop": route_data["stops"][dest_idx],
-                        "stops_count": dest_idx - origin_idx + 1,
-                        "duration_minutes": duration_mins,
-                        "fare": route_data["fare"],
-                        "frequency_mins": route_data["frequency_mins"],
-                        "ac": route_data["ac"],
-                        "next_arrival_mins": random.randint(2, route_data["frequency_mins"])
-                    })
-        
-        # Search Metro routes
-        for line_id, line_data in self.metro_lines.items():
-            stations_lower = [s.lower() for s in line_data["stations"]]
-            
-            origin_match = any(origin_lower in station for station in stations_lower)
-            dest_match = any(dest_lower in station for station in stations_lower)
-            
-            if origin_match and dest_match:
-                origin_idx = next((i for i, s in enumerate(stations_lower) if origin_lower in s), 0)
-                dest_idx = next((i for i, s in enumerate(stations_lower) if dest_lower in s), len(stations_lower) - 1)
-                
-                if origin_idx < dest_idx:
-                    stops = dest_idx - origin_idx
-                    duration_mins = stops * 3  # 3 mins per station
-                    distance_km = stops * 1.5  # avg 1.5 km per station
-                    fare = line_data["fare_base"] + int(distance_km * line_data["fare_per_km"])
-                    
-                    routes.append({
-                        "type": "metro",
-                        "line_id": line_id,
-                        "line_name": line_data["line_name"],
-                        "operator": line_data["operator"],
-                        "from_station": line_data["stations"][origin_idx],
-                        "to_station": line_data["stations"][dest_idx],
-                        "stations_count": stops + 1,
-                        "duration_minutes": duration_mins,
-                        "fare": fare,
-                        "frequency_mins": line_data["frequency_mins"],
-                        "next_arrival_mins": random.randint(1, line_data["frequency_mins"])
-                    })
+        # Single-line journeys, buses first to keep the original ordering
+        for kind in ("bus", "metro"):
+            for line_key, places in self._line_places.items():
+                if line_key[0] != kind:
+                    continue
+                origin_idx = next((i for i, p in enumerate(places) if p in origin_places), None)
+                dest_idx = next((i for i, p in enumerate(places) if p in dest_places), None)
+                if origin_idx is not None and dest_idx is not None:
+                    routes.append(self._leg(line_key, origin_idx, dest_idx))
+        
+        # Fastest journey overall, reported when it needs an interchange
+        journey = self._shortest_journey(origin_places, dest_places)
+        if len(journey) > 1:
+            legs = [self._leg(*leg) for leg in journey]
+            interchanges = [leg.get("to_stop") or leg.get("to_station") for leg in legs[:-1]]
+            transfer_mins = sum(
+                INTERCHANGE_PENALTY_MINS + self._line_frequency(line_key) / 2
+                for line_key, _, _ in journey[1:]
+            )
+            routes.append({
+                "type": "transfer",
+                "from_stop": legs[0].get("from_stop") or legs[0].get("from_station"),
+                "to_stop": legs[-1].get("to_stop") or legs[-1].get("to_station"),
+                "legs": legs,
+                "transfers": len(legs) - 1,
+                "interchanges": interchanges,
+                "duration_minutes": sum(leg["duration_minutes"] for leg in legs) + round(transfer_mins),
+                "fare": sum(leg["fare"] for leg in legs),
+                "next_arrival_mins": legs[0]["next_arrival_mins"]
+            })
         
         return routes
     
@@ -2,10 +2,12 @@
 Mock Mappls API for rapid development
 Simulates routing, place search, and distance matrix
 """
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 import random
 from datetime import datetime, timedelta
 
+from app.tools.distance_matrix import distance_engine, parse_coordinates
+
 
 class MockMapplsService:
     """Mock Mappls (MapmyIndia) API for development"""
@@ -25,9 +27,8 @@ class MockMapplsService:
         }
     
     def _calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-        """Mock distance calculation (straight line)"""
-        # Simplified distance in km
-        return ((lat2 - lat1)**2 + (lng2 - lng1)**2)**0.5 * 111  # 111 km per degree
+        """Straight-line (great-circle) distance in km"""
+        return float(distance_engine.haversine_km([lat1, lng1], [lat2, lng2])[0, 0])
     
     async def route(
         self, 
@@ -93,6 +94,17 @@ class MockMapplsService:
         
         return route
     
+    async def geocode(self, place: str) -> Optional[Tuple[float, float]]:
+        """Coordinates for a "lat,lng" string or known POI; None otherwise"""
+        coords = parse_coordinates(place)
+        if coords:
+            return coords
+        place_lower = place.lower().strip()
+        for key, (lat, lng, name) in self.bengaluru_pois.items():
+            if place_lower.replace(" ", "_") == key or place_lower == name.split(",")[0].lower():
+                return (lat, lng)
+        return None
+    
     async def place_search(
         self, 
         query: str,
@@ -171,33 +183,24 @@ class MockMapplsService:
         origins: List[str],
         destinations: List[str]
     ) -> Dict[str, Any]:
-        """Mock distance matrix"""
+        """Mock distance matrix (haversine distances, speed-profile durations)"""
         
-        matrix = {
+        return {
             "origin_addresses": origins,
             "destination_addresses": destinations,
-            "rows": []
+            "rows": distance_engine.matrix(
+                [self._resolve(o) for o in origins],
+                [self._resolve(d) for d in destinations]
+            )
         }
-        
-        for origin in origins:
-            row = {"elements": []}
-            for dest in destinations:
-                if origin == dest:
-                    element = {
-                        "distance": {"value": 0, "text": "0 km"},
-                        "duration": {"value": 0, "text": "0 mins"}
-                    }
-                else:
-                    distance = random.uniform(5, 30)
-                    duration = (distance / 25) * 60  # 25 km/h average
-                    element = {
-                        "distance": {"value": int(distance * 1000), "text": f"{distance:.1f} km"},
-                        "duration": {"value": int(duration * 60), "text": f"{int(duration)} mins"}
-                    }
-                row["elements"].append(element)
-            matrix["rows"].append(row)
-        
-        return matrix
+    
+    def _resolve(self, location: str) -> Optional[Tuple[float, float]]:
+        """Coordinates for a "lat,lng" string or known POI name"""
+        coords = parse_coordinates(location)
+        if coords:
+            return coords
+        poi = self.bengaluru_pois.get(location.lower().strip().replace(" ", "_"))
+        return poi[:2] if poi else None
 
 
 # Singleton instance
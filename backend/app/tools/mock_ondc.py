@@ -2,10 +2,13 @@
 Mock ONDC API for rapid development
 Simulates ONDC mobility and discovery services
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 from datetime import datetime, timedelta
 import random
 
+from app.tools.distance_matrix import parse_coordinates
+from app.tools.food_catalog import FoodCatalogIndex
+
 
 class MockONDCService:
     """Mock ONDC Network API for development"""
@@ -20,6 +23,72 @@ class MockONDCService:
             "mg_road": {"lat": 12.9716, "lng": 77.5946},
             "electronic_city": {"lat": 12.8456, "lng": 77.6603},
         }
+        self._initialize_restaurants()
+    
+    def _initialize_restaurants(self):
+        """Initialize the mock restaurant catalog and its search index"""
+        
+        # hours are IST opening intervals; closing may pass midnight
+        self.restaurants = [
+            {
+                "restaurant_id": "vidyarthi_bhavan_mock",
+                "name": "Vidyarthi Bhavan",
+                "cuisine": "South Indian",
+                "rating": 4.6,
+                "price_for_two": 200,
+                "distance_km": 1.2,
+                "delivery_time_minutes": 25,
+                "specialties": ["Masala Dosa", "Filter Coffee"],
+                "address": "Gandhi Bazaar, Basavanagudi",
+                "latitude": 12.9455,
+                "longitude": 77.5690,
+                "hours": [["06:30", "11:30"], ["14:00", "20:00"]]
+            },
+            {
+                "restaurant_id": "empire_mock",
+                "name": "Empire Restaurant",
+                "cuisine": "North Indian, Chinese",
+                "rating": 4.4,
+                "price_for_two": 400,
+                "distance_km": 0.8,
+                "delivery_time_minutes": 30,
+                "specialties": ["Chicken Biryani", "Butter Chicken"],
+                "address": "Residency Road",
+                "latitude": 12.9667,
+                "longitude": 77.6081,
+                "hours": [["11:00", "01:00"]]
+            },
+            {
+                "restaurant_id": "mtrs_mock",
+                "name": "MTR (Mavalli Tiffin Room)",
+                "cuisine": "South Indian",
+                "rating": 4.7,
+                "price_for_two": 300,
+                "distance_km": 2.1,
+                "delivery_time_minutes": 35,
+                "specialties": ["Rava Idli", "Bisi Bele Bath"],
+                "address": "Lalbagh Road",
+                "latitude": 12.9553,
+                "longitude": 77.5856,
+                "hours": [["06:30", "11:00"], ["12:30", "21:00"]]
+            },
+            {
+                "restaurant_id": "taaza_thindi_mock",
+                "name": "Taaza Thindi",
+                "cuisine": "Street Food",
+                "rating": 4.2,
+                "price_for_two": 150,
+                "distance_km": 0.5,
+                "delivery_time_minutes": 15,
+                "specialties": ["Gobi Manchurian", "Pani Puri"],
+                "address": "VV Puram Food Street",
+                "latitude": 12.9496,
+                "longitude": 77.5746,
+                "hours": [["17:00", "23:00"]]
+            }
+        ]
+        
+        self.food_index = FoodCatalogIndex(self.restaurants)
     
     async def search_mobility(
         self, 
@@ -71,74 +140,56 @@ class MockONDCService:
         
         return providers
     
+    async def stream_mobility(
+        self, 
+        pickup: str, 
+        dropoff: str, 
+        time: str = None,
+        window: Any = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Mock quote stream (every provider answers at once)"""
+        for provider in await self.search_mobility(pickup, dropoff, time):
+            yield provider
+    
     async def search_food(
         self, 
         location: str, 
         query: str = None, 
-        cuisine: str = None
+        cuisine: str = None,
+        open_now: bool = False,
+        radius_km: float = None,
+        limit: int = 10
     ) -> List[Dict[str, Any]]:
-        """Mock food discovery"""
-        
-        restaurants = [
-            {
-                "restaurant_id": "vidyarthi_bhavan_mock",
-                "name": "Vidyarthi Bhavan",
-                "cuisine": "South Indian",
-                "rating": 4.6,
-                "price_for_two": 200,
-                "distance_km": 1.2,
-                "delivery_time_minutes": 25,
-                "specialties": ["Masala Dosa", "Filter Coffee"],
-                "open_now": True,
-                "address": "Gandhi Bazaar, Basavanagudi"
-            },
-            {
-                "restaurant_id": "empire_mock",
-                "name": "Empire Restaurant",
-                "cuisine": "North Indian, Chinese",
-                "rating": 4.4,
-                "price_for_two": 400,
-                "distance_km": 0.8,
-                "delivery_time_minutes": 30,
-                "specialties": ["Chicken Biryani", "Butter Chicken"],
-                "open_now": True,
-                "address": "Residency Road"
-            },
-            {
-                "restaurant_id": "mtrs_mock",
-                "name": "MTR (Mavalli Tiffin Room)",
-                "cuisine": "South Indian",
-                "rating": 4.7,
-                "price_for_two": 300,
-                "distance_km": 2.1,
-                "delivery_time_minutes": 35,
-                "specialties": ["Rava Idli", "Bisi Bele Bath"],
-                "open_now": True,
-                "address": "Lalbagh Road"
-            },
-            {
-                "restaurant_id": "taaza_thindi_mock",
-                "name": "Taaza Thindi",
-                "cuisine": "Street Food",
-                "rating": 4.2,
-                "price_for_two": 150,
-                "distance_km": 0.5,
-                "delivery_time_minutes": 15,
-                "specialties": ["Gobi Manchurian", "Pani Puri"],
-                "open_now": True,
-                "address": "VV Puram Food Street"
-            }
-        ]
+        """Mock food discovery, ranked by relevance, rating and distance"""
         
-        # Filter by query if provided
-        if query:
-            query = query.lower()
-            restaurants = [
-                r for r in restaurants 
-                if query in r["name"].lower() or query in r["cuisine"].lower()
-            ]
+        coords = self.coordinates(location)
+        results = []
+        for entry_id, score, distance_km in self.food_index.search(
+            query=query,
+            cuisine=cuisine,
+            location=coords,
+            radius_km=radius_km if coords else None,
+            open_now=open_now,
+            limit=limit
+        ):
+            restaurant = dict(self.food_index.entries[entry_id])
+            if distance_km is not None:
+                restaurant["distance_km"] = distance_km
+            restaurant["open_now"] = self.food_index.is_open(entry_id)
+            restaurant["score"] = score
+            results.append(restaurant)
         
-        return restaurants
+        return results
+    
+    def coordinates(self, location: str) -> Optional[Tuple[float, float]]:
+        """(lat, lng) for a "lat,lng" string or known locality"""
+        if not location:
+            return None
+        coords = parse_coordinates(location)
+        if coords:
+            return coords
+        known = self.bengaluru_locations.get(location.lower().strip().replace(" ", "_"))
+        return (known["lat"], known["lng"]) if known else None
     
     async def search_places(
         self, 
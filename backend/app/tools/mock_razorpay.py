@@ -4,16 +4,25 @@ Simulates payment order creation and verification
 """
 from typing import Dict, Any
 from datetime import datetime
+import asyncio
 import random
 import string
 
+from app.tools.payment_ledger import PaymentLedger, IdempotencyConflict, create_ledger, request_hash
+
 
 class MockRazorpayService:
     """Mock Razorpay Payment API for development"""
     
-    def __init__(self):
-        self.orders = {}
-        self.payments = {}
+    def __init__(self, ledger: PaymentLedger = None):
+        self._ledger = ledger
+    
+    @property
+    def ledger(self) -> PaymentLedger:
+        # Opened on first use so importing this module does no I/O
+        if self._ledger is None:
+            self._ledger = create_ledger()
+        return self._ledger
     
     def _generate_id(self, prefix: str) -> str:
         """Generate fake Razorpay-style IDs"""
@@ -25,9 +34,15 @@ class MockRazorpayService:
         amount: int,  # in paise (₹1 = 100 paise)
         currency: str = "INR",
         receipt: str = None,
-        notes: Dict[str, str] = None
+        notes: Dict[str, str] = None,
+        idempotency_key: str = None
     ) -> Dict[str, Any]:
-        """Mock order creation"""
+        """
+        Mock order creation
+        
+        A retry with the same idempotency_key returns the original order instead
+        of creating another; reusing the key with different parameters is an error.
+        """
         
         order_id = self._generate_id("order")
         
@@ -45,8 +60,17 @@ class MockRazorpayService:
             "created_at": int(datetime.now().timestamp())
         }
         
-        self.orders[order_id] = order
-        return order
+        params = {"amount": amount, "currency": currency, "receipt": receipt, "notes": notes or {}}
+        try:
+            stored, _ = await asyncio.to_thread(
+                self.ledger.create_order, order, idempotency_key, request_hash(params)
+            )
+        except IdempotencyConflict:
+            return {
+                "error": "Idempotency key reused with different parameters",
+                "status": "failed"
+            }
+        return stored
     
     async def create_payment_link(
         self, 
@@ -81,11 +105,13 @@ class MockRazorpayService:
     ) -> Dict[str, Any]:
         """Mock payment verification"""
         
+        order = await asyncio.to_thread(self.ledger.get_order, order_id) if order_id else None
+        
         # In mock mode, all payments are successful
         payment = {
             "id": payment_id,
             "entity": "payment",
-            "amount": self.orders.get(order_id, {}).get("amount", 10000),
+            "amount": (order or {}).get("amount", 10000),
             "currency": "INR",
             "status": "captured",
             "order_id": order_id,
@@ -97,12 +123,8 @@ class MockRazorpayService:
             "tax": 0
         }
         
-        self.payments[payment_id] = payment
-        
-        if order_id and order_id in self.orders:
-            self.orders[order_id]["status"] = "paid"
-            self.orders[order_id]["amount_paid"] = payment["amount"]
-            self.orders[order_id]["amount_due"] = 0
+        # Marks the order paid in the same transaction; a repeated verify returns the stored payment
+        payment = await asyncio.to_thread(self.ledger.record_payment, payment)
         
         return {
             "verified": True,
@@ -111,10 +133,15 @@ class MockRazorpayService:
     
     async def get_order(self, order_id: str) -> Dict[str, Any]:
         """Mock get order by ID"""
-        return self.orders.get(order_id, {
+        order = await asyncio.to_thread(self.ledger.get_order, order_id)
+        return order or {
             "error": "Order not found",
             "status": "failed"
-        })
+        }
+    
+    async def get_orders_by_receipt(self, receipt: str) -> list:
+        """Orders created with a receipt, oldest first"""
+        return await asyncio.to_thread(self.ledger.find_orders_by_receipt, receipt)
     
     async def refund_payment(
         self, 
@@ -125,7 +152,7 @@ class MockRazorpayService:
         
         refund_id = self._generate_id("rfnd")
         
-        payment = self.payments.get(payment_id, {})
+        payment = await asyncio.to_thread(self.ledger.get_payment, payment_id) or {}
         refund_amount = amount or payment.get("amount", 10000)
         
         refund = {
@@ -139,7 +166,7 @@ class MockRazorpayService:
             "speed_processed": "instant"
         }
         
-        return refund
+        return await asyncio.to_thread(self.ledger.record_refund, refund)
 
 
 # Singleton instance
@@ -0,0 +1,343 @@
+"""
+ONDC mobility search (Beckn TRV10) through a gateway
+Sends one search per request and aggregates the on_search callbacks that
+providers send back over the following seconds, streaming quotes as they
+arrive.
+
+Callbacks are matched to searches in process memory, so the callback route
+and the search must be served by the same worker (single worker or sticky
+routing on transaction id).
+
+Searches are signed with the subscriber's ed25519 key when
+ONDC_SIGNING_PRIVATE_KEY is set; without it they go out unsigned, which only
+staging and mock gateways accept.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import re
+import time as clock
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from uuid import uuid4
+
+from app.metrics import track_upstream
+from app.tracing import current_span, span
+from app.tools.distance_matrix import distance_engine
+from app.tools.http_pool import pooled_client
+from app.tools.mappls_service import mappls_service
+from app.tools.mock_mappls import mock_mappls
+
+# Beckn fulfillment vehicle categories -> display names used by the mock
+VEHICLE_TYPES = {
+    "AUTO_RICKSHAW": "Auto",
+    "CAB": "Cab",
+    "TWO_WHEELER": "Bike Taxi",
+    "BUS": "Bus",
+    "METRO": "Metro",
+}
+
+
+@dataclass
+class SearchWindow:
+    """When to stop waiting for more on_search callbacks"""
+    timeout: float = 3.0  # Hard deadline once collection starts (seconds)
+    max_quotes: int = 50  # Cut as soon as this many quotes arrived
+    min_quotes: int = 3  # Idle cut only applies once this many arrived
+    idle_after: float = 0.75  # ...and no new quote came for this long (seconds)
+
+
+class BecknSigner:
+    """Beckn Authorization header (ed25519 over a BLAKE2b-512 body digest)"""
+
+    def __init__(self, subscriber_id: str, unique_key_id: str, private_key: str, ttl: int = 60):
+        from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+        seed = base64.b64decode(private_key)[:32]  # Registry keys may hold seed + public key
+        self._key = Ed25519PrivateKey.from_private_bytes(seed)
+        self.key_id = f"{subscriber_id}|{unique_key_id}|ed25519"
+        self.ttl = ttl
+
+    def authorization(self, body: bytes) -> str:
+        created = int(clock.time())
+        expires = created + self.ttl
+        digest = base64.b64encode(hashlib.blake2b(body, digest_size=64).digest()).decode()
+        signing_string = f"(created): {created}\n(expires): {expires}\ndigest: BLAKE-512={digest}"
+        signature = base64.b64encode(self._key.sign(signing_string.encode())).decode()
+        return (
+            f'Signature keyId="{self.key_id}",algorithm="ed25519",created="{created}",'
+            f'expires="{expires}",headers="(created) (expires) digest",signature="{signature}"'
+        )
+
+
+class SearchAggregator:
+    """Collects the quotes of one search transaction"""
+
+    def __init__(self, transaction_id: str, window: SearchWindow):
+        self.transaction_id = transaction_id
+        self.window = window
+        self.distance_km: Optional[float] = None
+        self.providers = set()
+        self.quotes_received = 0
+        self.cut_reason: Optional[str] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._seen = set()
+        self._started = asyncio.get_running_loop().time()
+
+    @property
+    def closed(self) -> bool:
+        return self.cut_reason is not None
+
+    def add_on_search(self, payload: Dict[str, Any]) -> int:
+        """Queue the quotes in one on_search callback, returns how many were new"""
+        if self.closed:
+            return 0
+
+        context = payload.get("context", {})
+        catalog = payload.get("message", {}).get("catalog", {})
+        received_ms = round((asyncio.get_running_loop().time() - self._started) * 1000)
+        added = 0
+
+        for provider in catalog.get("providers", []):
+            fulfillments = {f.get("id"): f for f in provider.get("fulfillments", [])}
+            for item in provider.get("items", []):
+                key = (context.get("bpp_id"), provider.get("id"), item.get("id"))
+                if key in self._seen:
+                    continue
+                try:
+                    quote = self._quote(context, provider, item, fulfillments, received_ms)
+                except (KeyError, TypeError, ValueError) as e:
+                    print(f"Skipping malformed ONDC item from {context.get('bpp_id')}: {e}")
+                    continue
+                self._seen.add(key)
+                self.providers.add(provider["id"])
+                self._queue.put_nowait(quote)
+                added += 1
+
+        self.quotes_received += added
+        return added
+
+    def _quote(
+        self,
+        context: Dict,
+        provider: Dict,
+        item: Dict,
+        fulfillments: Dict[str, Dict],
+        received_ms: int
+    ) -> Dict[str, Any]:
+        fulfillment = fulfillments.get((item.get("fulfillment_ids") or [None])[0], {})
+        category = fulfillment.get("vehicle", {}).get("category", "")
+        return {
+            "provider_id": provider["id"],
+            "provider_name": provider.get("descriptor", {}).get("name", provider["id"]),
+            "vehicle_type": VEHICLE_TYPES.get(category, category.title() or "Ride"),
+            "estimated_fare": round(float(item["price"]["value"])),
+            "estimated_time_minutes": _iso_minutes(item.get("time", {}).get("duration")),
+            "distance_km": self.distance_km,
+            "available": True,
+            "bpp_id": context.get("bpp_id"),
+            "item_id": item["id"],
+            "received_ms": received_ms
+        }
+
+    async def stream(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield quotes until the window's timeout, idle or max-quotes rule cuts"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window.timeout
+        emitted = 0
+        last_quote_at = None
+
+        while True:
+            now = loop.time()
+            wait = deadline - now
+            reason = "timeout"
+            if emitted >= self.window.min_quotes and last_quote_at is not None:
+                idle_wait = last_quote_at + self.window.idle_after - now
+                if idle_wait < wait:
+                    wait, reason = idle_wait, "idle"
+            if wait <= 0:
+                self.cut_reason = reason
+                break
+
+            try:
+                quote = await asyncio.wait_for(self._queue.get(), wait)
+            except asyncio.TimeoutError:
+                self.cut_reason = reason
+                break
+
+            yield quote
+            emitted += 1
+            last_quote_at = loop.time()
+            if emitted >= self.window.max_quotes:
+                self.cut_reason = "max_quotes"
+                break
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "transaction_id": self.transaction_id,
+            "providers": len(self.providers),
+            "quotes": self.quotes_received,
+            "cut": self.cut_reason,
+        }
+
+
+def _iso_minutes(duration: Optional[str]) -> Optional[int]:
+    """Minutes in an ISO 8601 duration such as PT1H5M"""
+    match = re.fullmatch(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?", duration or "")
+    if not match or not any(match.groups()):
+        return None
+    hours, minutes, seconds = (int(g or 0) for g in match.groups())
+    return hours * 60 + minutes + round(seconds / 60)
+
+
+class ONDCService:
+    """ONDC gateway client acting as a BAP (buyer app) for mobility search"""
+
+    def __init__(self):
+        self.gateway_url = os.getenv("ONDC_GATEWAY_URL", "https://staging.gateway.proteantech.in")
+        self.bap_id = os.getenv("ONDC_BAP_ID", "namma-guide.local")
+        # Public base URL of our callback routes (app/ondc_routes.py)
+        self.bap_uri = os.getenv("ONDC_BAP_URI", "http://127.0.0.1:8000/ondc")
+        self.city_code = os.getenv("ONDC_CITY_CODE", "std:080")  # Bengaluru
+        self.window = SearchWindow(timeout=float(os.getenv("ONDC_SEARCH_WINDOW", "3.0")))
+        signing_key = os.getenv("ONDC_SIGNING_PRIVATE_KEY")
+        self.signer = BecknSigner(
+            self.bap_id, os.getenv("ONDC_UNIQUE_KEY_ID", ""), signing_key
+        ) if signing_key else None
+        self._aggregators: Dict[str, SearchAggregator] = {}
+        self.late_callbacks = 0
+
+    def deliver_on_search(self, payload: Dict[str, Any]) -> bool:
+        """
+        Route an on_search callback to its search
+
+        Returns:
+            False when the transaction is unknown or its window already closed
+        """
+        transaction_id = payload.get("context", {}).get("transaction_id")
+        aggregator = self._aggregators.get(transaction_id)
+        if aggregator is None or aggregator.closed:
+            self.late_callbacks += 1
+            return False
+        aggregator.add_on_search(payload)
+        return True
+
+    async def stream_mobility(
+        self,
+        pickup: str,
+        dropoff: str,
+        time: str = None,
+        window: SearchWindow = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Search all mobility providers and yield quotes as their callbacks arrive
+
+        Args:
+            pickup: Place name or "lat,lng"
+            dropoff: Place name or "lat,lng"
+            time: Optional ISO 8601 pickup time (now when omitted)
+            window: Overrides the default SearchWindow
+        """
+        transaction_id = str(uuid4())
+        aggregator = SearchAggregator(transaction_id, window or self.window)
+        # Registered before sending: callbacks can beat the gateway's ACK
+        self._aggregators[transaction_id] = aggregator
+        try:
+            with span("ondc.geocode"):
+                start, end = await asyncio.gather(self.geocode(pickup), self.geocode(dropoff))
+            if start and end:
+                km = distance_engine.compute([start], [end])[0][0, 0] / 1000
+                aggregator.distance_km = round(float(km), 1)
+
+            await self._send_search(transaction_id, start, end, pickup, dropoff, time)
+
+            # No span around the yields: it would stay open in the consumer's context
+            async for quote in aggregator.stream():
+                yield quote
+            
+            trace = current_span()
+            if trace:
+                trace.set(**{f"ondc.{k}": v for k, v in aggregator.summary().items()})
+        finally:
+            if not aggregator.closed:
+                aggregator.cut_reason = "cancelled"
+            self._aggregators.pop(transaction_id, None)
+
+    async def search_mobility(
+        self,
+        pickup: str,
+        dropoff: str,
+        time: str = None
+    ) -> List[Dict[str, Any]]:
+        """All quotes within the search window, cheapest first"""
+        quotes = [q async for q in self.stream_mobility(pickup, dropoff, time)]
+        return sorted(quotes, key=lambda q: q["estimated_fare"])
+
+    async def _send_search(
+        self,
+        transaction_id: str,
+        start: Optional[Tuple[float, float]],
+        end: Optional[Tuple[float, float]],
+        pickup: str,
+        dropoff: str,
+        time: Optional[str]
+    ):
+        now = datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+        payload = {
+            "context": {
+                "location": {"country": {"code": "IND"}, "city": {"code": self.city_code}},
+                "domain": "ONDC:TRV10",
+                "action": "search",
+                "version": "2.0.1",
+                "bap_id": self.bap_id,
+                "bap_uri": self.bap_uri,
+                "transaction_id": transaction_id,
+                "message_id": str(uuid4()),
+                "timestamp": now,
+                "ttl": "PT30S"
+            },
+            "message": {
+                "intent": {
+                    "fulfillment": {
+                        "stops": [
+                            {"type": "START", "location": _location(start, pickup)},
+                            {"type": "END", "location": _location(end, dropoff)}
+                        ],
+                        **({"time": {"timestamp": time}} if time else {})
+                    }
+                }
+            }
+        }
+
+        # The signature covers these exact bytes, so serialize once and send them as is
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.signer:
+            headers["Authorization"] = self.signer.authorization(body)
+
+        async with pooled_client("ondc") as client:
+            with span("ondc.search"), track_upstream("ondc", "search"):
+                response = await client.post(f"{self.gateway_url}/search", content=body, headers=headers)
+                response.raise_for_status()
+
+        ack = response.json().get("message", {}).get("ack", {}).get("status")
+        if ack != "ACK":
+            raise Exception(f"ONDC gateway did not acknowledge search: {response.text}")
+
+    async def geocode(self, location: str) -> Optional[Tuple[float, float]]:
+        """Coordinates for a place name or "lat,lng" string; None sends the name as an address"""
+        maps = mappls_service if os.getenv("MAPPLS_API_KEY") else mock_mappls
+        return await maps.geocode(location)
+
+
+def _location(coords: Optional[Tuple[float, float]], name: str) -> Dict[str, Any]:
+    if coords:
+        return {"gps": f"{coords[0]:.6f}, {coords[1]:.6f}"}
+    return {"address": name}
+
+
+# Singleton instance
+ondc_service = ONDCService()
@@ -0,0 +1,437 @@
+"""
+Payment ledger backends for MockRazorpayService
+Orders, payments and refunds with idempotency-key dedupe. SQLiteLedger (WAL)
+persists across restarts and is safe for concurrent writers in several
+uvicorn workers; InMemoryLedger keeps the old single-process behaviour.
+
+Ledger methods block; async callers use asyncio.to_thread.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Tuple
+
+IDEMPOTENCY_TTL = 24 * 3600  # Seconds a key keeps deduping retries
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    receipt TEXT NOT NULL,
+    status TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    amount_paid INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_receipt ON orders (receipt);
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    request_hash TEXT NOT NULL,
+    order_id TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payments (
+    id TEXT PRIMARY KEY,
+    order_id TEXT,
+    status TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS payments_order ON payments (order_id);
+CREATE TABLE IF NOT EXISTS refunds (
+    id TEXT PRIMARY KEY,
+    payment_id TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS refunds_payment ON refunds (payment_id);
+CREATE TABLE IF NOT EXISTS webhook_events (
+    id TEXT PRIMARY KEY,
+    event TEXT NOT NULL,
+    order_id TEXT,
+    applied_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS webhook_dead_letters (
+    id TEXT PRIMARY KEY,
+    event TEXT NOT NULL,
+    error TEXT NOT NULL,
+    failed_at INTEGER NOT NULL
+);
+"""
+
+# Webhooks may arrive out of order; a payment never moves to a lower rank
+PAYMENT_STATUS_RANK = {"created": 0, "failed": 1, "authorized": 1, "captured": 2, "refunded": 3}
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused with different request parameters"""
+
+
+def request_hash(params: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def event_order_id(event: Dict[str, Any]) -> Optional[str]:
+    """Order a Razorpay webhook event belongs to, if any"""
+    payload = event.get("payload", {})
+    payment = payload.get("payment", {}).get("entity", {})
+    order = payload.get("order", {}).get("entity", {})
+    return payment.get("order_id") or order.get("id")
+
+
+def apply_event(
+    event: Dict[str, Any],
+    order: Optional[Dict[str, Any]],
+    payment: Optional[Dict[str, Any]]
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Fold one Razorpay webhook event into the stored order and payment
+
+    Returns:
+        (order, payment, refund) to write; None for anything unchanged
+    """
+    kind = event.get("event", "")
+    payload = event.get("payload", {})
+    new_order = new_payment = refund = None
+
+    incoming = payload.get("payment", {}).get("entity")
+    if incoming and kind.startswith("payment."):
+        current = PAYMENT_STATUS_RANK.get((payment or {}).get("status"), -1)
+        if PAYMENT_STATUS_RANK.get(incoming.get("status"), 0) >= current:
+            new_payment = {**(payment or {}), **incoming}
+        if order and order["status"] != "paid":
+            new_order = dict(order)
+            if kind == "payment.captured":
+                new_order.update(status="paid", amount_paid=incoming["amount"], amount_due=0)
+            elif payment is None:  # First event for this payment is a new attempt
+                new_order.update(status="attempted", attempts=order["attempts"] + 1)
+            else:
+                new_order = None
+    elif kind == "order.paid" and order and order["status"] != "paid":
+        paid = payload.get("order", {}).get("entity", {})
+        new_order = {**order, "status": "paid", "amount_paid": paid.get("amount_paid", order["amount"]), "amount_due": 0}
+
+    if kind.startswith("refund."):
+        refund = payload.get("refund", {}).get("entity")
+    return new_order, new_payment, refund
+
+
+class PaymentLedger(ABC):
+    """Storage interface used by MockRazorpayService"""
+
+    @abstractmethod
+    def create_order(
+        self,
+        order: Dict[str, Any],
+        idempotency_key: str = None,
+        params_hash: str = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Store a new order, unless the idempotency key was already used
+
+        Returns:
+            (order, created); on a replayed key the original order and False
+
+        Raises:
+            IdempotencyConflict: The key was used for a different request
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_orders_by_receipt(self, receipt: str) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def record_payment(self, payment: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a captured payment and mark its order paid; replays return the stored payment"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_payment(self, payment_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def record_refund(self, refund: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def apply_events(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply a batch of webhook events in arrival order, skipping event ids already applied
+
+        Each event carries its id under "event_id". An event that cannot be
+        applied is set aside as a dead letter without affecting the rest of
+        the batch, and is not recorded as applied, so a redelivery is tried
+        again. Returns {"applied": int, "duplicate": int, "failed": [event ids]}.
+        """
+        raise NotImplementedError
+
+
+class InMemoryLedger(PaymentLedger):
+    """Process-local dicts; lost on restart and not shared between workers"""
+
+    def __init__(self):
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.payments: Dict[str, Dict[str, Any]] = {}
+        self.refunds: Dict[str, Dict[str, Any]] = {}
+        self._keys: Dict[str, Tuple[str, str, float]] = {}
+        self._applied: set = set()
+        self.dead_letters: Dict[str, Tuple[Dict[str, Any], str]] = {}  # Event id -> (event, error)
+        self._lock = threading.Lock()
+
+    def create_order(self, order, idempotency_key=None, params_hash=None):
+        with self._lock:
+            if idempotency_key:
+                known = self._keys.get(idempotency_key)
+                if known and known[2] > time.time() - IDEMPOTENCY_TTL:
+                    if known[0] != params_hash:
+                        raise IdempotencyConflict(idempotency_key)
+                    return self.orders[known[1]], False
+                self._keys[idempotency_key] = (params_hash, order["id"], time.time())
+            self.orders[order["id"]] = order
+            return order, True
+
+    def get_order(self, order_id):
+        return self.orders.get(order_id)
+
+    def find_orders_by_receipt(self, receipt):
+        return [o for o in self.orders.values() if o["receipt"] == receipt]
+
+    def record_payment(self, payment):
+        with self._lock:
+            if payment["id"] in self.payments:
+                return self.payments[payment["id"]]
+            self.payments[payment["id"]] = payment
+            order = self.orders.get(payment.get("order_id"))
+            if order:
+                order.update(status="paid", amount_paid=payment["amount"], amount_due=0)
+            return payment
+
+    def get_payment(self, payment_id):
+        return self.payments.get(payment_id)
+
+    def record_refund(self, refund):
+        self.refunds[refund["id"]] = refund
+        return refund
+
+    def apply_events(self, events):
+        counts = {"applied": 0, "duplicate": 0, "failed": []}
+        with self._lock:
+            for event in events:
+                if event["event_id"] in self._applied:
+                    counts["duplicate"] += 1
+                    continue
+                try:
+                    incoming = event.get("payload", {}).get("payment", {}).get("entity", {})
+                    order = self.orders.get(event_order_id(event))
+                    order, payment, refund = apply_event(event, order, self.payments.get(incoming.get("id")))
+                    # Resolve every key before writing, so a bad event leaves nothing half-applied
+                    writes = [
+                        (table, record["id"], record)
+                        for table, record in ((self.orders, order), (self.payments, payment), (self.refunds, refund))
+                        if record
+                    ]
+                except Exception as e:
+                    self.dead_letters[event["event_id"]] = (event, repr(e))
+                    counts["failed"].append(event["event_id"])
+                    continue
+                self._applied.add(event["event_id"])
+                for table, key, record in writes:
+                    table[key] = record
+                counts["applied"] += 1
+        return counts
+
+
+class SQLiteLedger(PaymentLedger):
+    """
+    Embedded SQLite ledger in WAL mode
+
+    Each thread gets its own connection. Writes run in BEGIN IMMEDIATE
+    transactions, which take SQLite's single write lock up front, so the
+    idempotency check and the insert are atomic across threads and processes.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("PAYMENT_DB_PATH", "payments.db")
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; fine for WAL
+            conn.execute("PRAGMA busy_timeout=30000")
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def _write(self, work):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def create_order(self, order, idempotency_key=None, params_hash=None):
+        def work(conn):
+            if idempotency_key:
+                row = conn.execute(
+                    "SELECT request_hash, order_id FROM idempotency_keys WHERE key = ? AND created_at > ?",
+                    (idempotency_key, int(time.time()) - IDEMPOTENCY_TTL)
+                ).fetchone()
+                if row:
+                    if row[0] != params_hash:
+                        raise IdempotencyConflict(idempotency_key)
+                    data = conn.execute("SELECT data FROM orders WHERE id = ?", (row[1],)).fetchone()
+                    return json.loads(data[0]), False
+                conn.execute(
+                    "INSERT OR REPLACE INTO idempotency_keys VALUES (?, ?, ?, ?)",
+                    (idempotency_key, params_hash, order["id"], int(time.time()))
+                )
+            conn.execute(
+                "INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (order["id"], order["receipt"], order["status"], order["amount"],
+                 order["amount_paid"], json.dumps(order), order["created_at"])
+            )
+            return order, True
+
+        return self._write(work)
+
+    def get_order(self, order_id):
+        row = self._conn().execute("SELECT data FROM orders WHERE id = ?", (order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_orders_by_receipt(self, receipt):
+        rows = self._conn().execute(
+            "SELECT data FROM orders WHERE receipt = ? ORDER BY created_at", (receipt,)
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def record_payment(self, payment):
+        def work(conn):
+            existing = conn.execute("SELECT data FROM payments WHERE id = ?", (payment["id"],)).fetchone()
+            if existing:
+                return json.loads(existing[0])
+            conn.execute(
+                "INSERT INTO payments VALUES (?, ?, ?, ?, ?, ?)",
+                (payment["id"], payment.get("order_id"), payment["status"], payment["amount"],
+                 json.dumps(payment), payment["created_at"])
+            )
+            row = conn.execute("SELECT data FROM orders WHERE id = ?", (payment.get("order_id"),)).fetchone()
+            if row:
+                order = json.loads(row[0])
+                order.update(status="paid", amount_paid=payment["amount"], amount_due=0)
+                conn.execute(
+                    "UPDATE orders SET status = ?, amount_paid = ?, data = ? WHERE id = ?",
+                    ("paid", payment["amount"], json.dumps(order), order["id"])
+                )
+            return payment
+
+        return self._write(work)
+
+    def get_payment(self, payment_id):
+        row = self._conn().execute("SELECT data FROM payments WHERE id = ?", (payment_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record_refund(self, refund):
+        def work(conn):
+            conn.execute(
+                "INSERT INTO refunds VALUES (?, ?, ?, ?, ?)",
+                (refund["id"], refund["payment_id"], refund["amount"], json.dumps(refund), refund["created_at"])
+            )
+            return refund
+
+        return self._write(work)
+
+    def apply_events(self, events):
+        # One write transaction per batch rather than per event, with a
+        # savepoint per event so a bad event rolls back alone
+        def work(conn):
+            counts = {"applied": 0, "duplicate": 0, "failed": []}
+            for event in events:
+                conn.execute("SAVEPOINT event")
+                try:
+                    applied = self._apply_event(conn, event)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO event")
+                    conn.execute("RELEASE event")
+                    conn.execute(
+                        "INSERT OR REPLACE INTO webhook_dead_letters VALUES (?, ?, ?, ?)",
+                        (event["event_id"], json.dumps(event), repr(e), int(time.time()))
+                    )
+                    counts["failed"].append(event["event_id"])
+                    continue
+                conn.execute("RELEASE event")
+                counts["applied" if applied else "duplicate"] += 1
+            return counts
+
+        return self._write(work)
+
+    def _apply_event(self, conn: sqlite3.Connection, event: Dict[str, Any]) -> bool:
+        """Apply one event inside the batch transaction; False if its id was already applied"""
+        order_id = event_order_id(event)
+        seen = conn.execute(
+            "INSERT OR IGNORE INTO webhook_events VALUES (?, ?, ?, ?)",
+            (event["event_id"], event.get("event", ""), order_id, int(time.time()))
+        )
+        if not seen.rowcount:
+            return False
+
+        incoming = event.get("payload", {}).get("payment", {}).get("entity", {})
+        row = conn.execute("SELECT data FROM orders WHERE id = ?", (order_id,)).fetchone()
+        stored = conn.execute("SELECT data FROM payments WHERE id = ?", (incoming.get("id"),)).fetchone()
+        order, payment, refund = apply_event(
+            event, json.loads(row[0]) if row else None, json.loads(stored[0]) if stored else None
+        )
+        if order:
+            conn.execute(
+                "UPDATE orders SET status = ?, amount_paid = ?, data = ? WHERE id = ?",
+                (order["status"], order["amount_paid"], json.dumps(order), order["id"])
+            )
+        if payment:
+            conn.execute(
+                "INSERT OR REPLACE INTO payments VALUES (?, ?, ?, ?, ?, ?)",
+                (payment["id"], payment.get("order_id"), payment["status"], payment.get("amount", 0),
+                 json.dumps(payment), payment.get("created_at", int(time.time())))
+            )
+        if refund:
+            conn.execute(
+                "INSERT OR REPLACE INTO refunds VALUES (?, ?, ?, ?, ?)",
+                (refund["id"], refund["payment_id"], refund.get("amount", 0), json.dumps(refund),
+                 refund.get("created_at", int(time.time())))
+            )
+        return True
+
+    def purge_idempotency_keys(self) -> int:
+        """Drop keys past their TTL; returns how many were removed"""
+        return self._write(lambda conn: conn.execute(
+            "DELETE FROM idempotency_keys WHERE created_at <= ?", (int(time.time()) - IDEMPOTENCY_TTL,)
+        ).rowcount)
+
+
+def create_ledger() -> PaymentLedger:
+    """Backend named by PAYMENT_LEDGER: "sqlite" (default) or "memory" """
+    backend = os.getenv("PAYMENT_LEDGER", "sqlite")
+    if backend == "memory":
+        return InMemoryLedger()
+    if backend == "sqlite":
+        return SQLiteLedger()
+    raise ValueError(f"Unknown PAYMENT_LEDGER backend: {backend}")
@@ -0,0 +1,145 @@
+"""
+Razorpay webhook ingestion
+Verified events go onto a bounded queue and are acknowledged at once; a
+background consumer applies them to the payment ledger in batches.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+from app.metrics import WEBHOOK_BATCH_SIZE, WEBHOOK_EVENTS, WEBHOOK_LAG
+from app.tools.mock_razorpay import mock_razorpay
+
+RECENT_EVENT_IDS = 50000  # Ids remembered in memory to drop redeliveries before queueing
+APPLY_RETRIES = 3
+
+
+def verify_signature(body: bytes, signature: str, secret: str) -> bool:
+    """Razorpay signs the raw body with HMAC-SHA256 of the webhook secret, hex encoded"""
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or "")
+
+
+class WebhookPipeline:
+    """
+    Bounded queue plus batching consumer for payment webhooks
+
+    A single consumer applies batches in arrival order, so events for one
+    order are applied in the order they were received. The ledger dedupes
+    by event id durably; the in-memory id cache only saves queue space and
+    forgets any event that was not applied, so its redelivery is accepted.
+    """
+
+    def __init__(self, ledger=None):
+        self.secret = os.getenv("RAZORPAY_WEBHOOK_SECRET")
+        self.batch_size = int(os.getenv("WEBHOOK_BATCH_SIZE", "200"))
+        self.batch_wait = float(os.getenv("WEBHOOK_BATCH_WAIT", "0.05"))  # Seconds to fill a batch
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=int(os.getenv("WEBHOOK_QUEUE_SIZE", "10000")))
+        self._ledger = ledger
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self.applied = 0
+        self.last_applied_at: Optional[float] = None
+
+    @property
+    def ledger(self):
+        return self._ledger or mock_razorpay.ledger
+
+    def submit(self, event_id: str, event: Dict[str, Any]) -> str:
+        """
+        Queue a verified event without waiting
+
+        Returns:
+            "queued", "duplicate", or "full" when the queue is at capacity
+            (the caller answers 503 so Razorpay redelivers later)
+        """
+        if event_id in self._recent:
+            WEBHOOK_EVENTS.labels("duplicate").inc()
+            return "duplicate"
+        try:
+            self.queue.put_nowait({**event, "event_id": event_id, "_received_at": time.time()})
+        except asyncio.QueueFull:
+            WEBHOOK_EVENTS.labels("rejected").inc()
+            return "full"
+
+        self._recent[event_id] = None
+        if len(self._recent) > RECENT_EVENT_IDS:
+            self._recent.popitem(last=False)
+        WEBHOOK_EVENTS.labels("queued").inc()
+        return "queued"
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            # Drain what is already queued, then wait briefly for stragglers
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        """Consume the queue forever (started from the app lifespan)"""
+        while True:
+            batch = await self._next_batch()
+            await self.apply(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    async def apply(self, batch: List[Dict[str, Any]]) -> Dict[str, int]:
+        events = [{k: v for k, v in e.items() if k != "_received_at"} for e in batch]
+        for attempt in range(APPLY_RETRIES):
+            try:
+                # Events the ledger cannot apply come back as dead letters
+                counts = await asyncio.to_thread(self.ledger.apply_events, events)
+                break
+            except Exception as e:
+                print(f"Webhook batch error (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        else:
+            # The ledger itself is failing: nothing was recorded
+            self._forget(e["event_id"] for e in events)
+            WEBHOOK_EVENTS.labels("failed").inc(len(batch))
+            return {"applied": 0, "duplicate": 0, "failed": len(batch)}
+
+        self._forget(counts["failed"])
+        if counts["failed"]:
+            print(f"Webhook events dead-lettered: {', '.join(counts['failed'])}")
+        now = time.time()
+        WEBHOOK_BATCH_SIZE.observe(len(batch))
+        WEBHOOK_EVENTS.labels("applied").inc(counts["applied"])
+        WEBHOOK_EVENTS.labels("duplicate").inc(counts["duplicate"])
+        WEBHOOK_EVENTS.labels("failed").inc(len(counts["failed"]))
+        for event in batch:
+            WEBHOOK_LAG.observe(now - event["_received_at"])
+        self.applied += counts["applied"]
+        self.last_applied_at = now
+        return {**counts, "failed": len(counts["failed"])}
+
+    def _forget(self, event_ids):
+        # Only the ledger's applied-event table decides what is a duplicate
+        for event_id in event_ids:
+            self._recent.pop(event_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "applied": self.applied,
+        }
+
+
+# Singleton instance
+payment_webhooks = WebhookPipeline()
@@ -0,0 +1,230 @@
+"""
+Lightweight in-process tracing
+Spans nest through a context variable, so async code needs no span plumbing.
+Finished traces can be returned inline (explain mode) and exported as
+OTLP/JSON to a local file (TRACE_EXPORT_FILE) and/or an OpenTelemetry
+collector (OTEL_EXPORTER_OTLP_ENDPOINT).
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+import orjson
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "namma-guide-api"
+EXPORT_BATCH_SIZE = 256
+EXPORT_INTERVAL = 2.0  # seconds
+EXPORT_QUEUE_LIMIT = 10_000  # traces; oldest are dropped beyond this
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed phase of a request"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "attributes",
+        "children", "start_unix_ns", "_start_perf_ns", "duration_ns", "error",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.children: List["Span"] = []
+        self.start_unix_ns = time.time_ns()
+        self._start_perf_ns = time.perf_counter_ns()
+        self.duration_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        """Attach attributes discovered while the span is running"""
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.duration_ns = time.perf_counter_ns() - self._start_perf_ns
+
+    def to_tree(self) -> Dict[str, Any]:
+        """Nested span timings for explain output"""
+        tree = {
+            "name": self.name,
+            "duration_ms": round((self.duration_ns or 0) / 1e6, 3),
+            "start_offset_ms": 0.0,
+        }
+        if self.attributes:
+            tree["attributes"] = self.attributes
+        if self.error:
+            tree["error"] = self.error
+        if self.children:
+            tree["children"] = [c._subtree(self.start_unix_ns) for c in self.children]
+        return tree
+
+    def _subtree(self, root_start_ns: int) -> Dict[str, Any]:
+        tree = self.to_tree()
+        tree["start_offset_ms"] = round((self.start_unix_ns - root_start_ns) / 1e6, 3)
+        return tree
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def _reset(token):
+    # An async generator closed from another context (e.g. during garbage
+    # collection) cannot reset its token; its context is discarded anyway
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        pass
+
+
+@contextmanager
+def start_trace(name: str, **attributes) -> Iterator[Span]:
+    """Open a root span for one request and export the trace when it ends"""
+    root = Span(name, f"{random.getrandbits(128):032x}", None, attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.error = repr(e)
+        raise
+    finally:
+        root.finish()
+        _reset(token)
+        exporter.submit(root)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time a phase as a child of the current span
+
+    Outside a trace this is a no-op yielding None, so service code can be
+    instrumented unconditionally.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, parent.trace_id, parent.span_id, attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = repr(e)
+        raise
+    finally:
+        child.finish()
+        _reset(token)
+
+
+def current_span() -> Optional[Span]:
+    """The innermost open span, if any"""
+    return _current_span.get()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(roots: List[Span]) -> Dict[str, Any]:
+    """Encode finished traces as an OTLP/JSON ExportTraceServiceRequest"""
+    spans = []
+    for root in roots:
+        for s in root.walk():
+            otlp_span = {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 2 if s.parent_id is None else 1,  # SERVER for roots, INTERNAL otherwise
+                "startTimeUnixNano": str(s.start_unix_ns),
+                "endTimeUnixNano": str(s.start_unix_ns + (s.duration_ns or 0)),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            }
+            if s.parent_id:
+                otlp_span["parentSpanId"] = s.parent_id
+            spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class TraceExporter:
+    """Batches finished traces and ships them from a background task"""
+
+    def __init__(self):
+        self.file_path = os.getenv("TRACE_EXPORT_FILE")
+        endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+        self.collector_url = f"{endpoint.rstrip('/')}/v1/traces" if endpoint else None
+        self._queue: deque = deque(maxlen=EXPORT_QUEUE_LIMIT)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.file_path or self.collector_url)
+
+    def submit(self, root: Span):
+        if self.enabled:
+            self._queue.append(root)
+
+    async def run(self, interval: float = EXPORT_INTERVAL):
+        """Flush loop, started from the app lifespan"""
+        if not self.enabled:
+            return
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            try:
+                while True:
+                    await asyncio.sleep(interval)
+                    await self.flush(client)
+            finally:
+                await self.flush(client)
+
+    async def flush(self, client: httpx.AsyncClient):
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(EXPORT_BATCH_SIZE, len(self._queue)))]
+            payload = orjson.dumps(to_otlp(batch))
+            if self.file_path:
+                await asyncio.to_thread(self._append_file, payload)
+            if self.collector_url:
+                try:
+                    response = await client.post(
+                        self.collector_url,
+                        content=payload,
+                        headers={"Content-Type": "application/json"}
+                    )
+                    response.raise_for_status()
+                except Exception as e:
+                    logger.warning(f"Trace export to collector failed: {e}")
+
+    def _append_file(self, payload: bytes):
+        # One OTLP/JSON document per line (otlpjsonfile receiver format)
+        with open(self.file_path, "ab") as f:
+            f.write(payload + b"\n")
+
+
+# Singleton instance
+exporter = TraceExporter()
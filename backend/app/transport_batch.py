@@ -0,0 +1,191 @@
+"""
+Batch transport search for B2B partners
+Dedupes origin/destination pairs, geocodes every place once, runs transit
+searches concurrently against the shared service indexes and fetches road
+legs through chunked distance matrices. Results stream back as NDJSON.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.coalescing import canonical_text
+from app.tracing import start_trace, span
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_CONCURRENCY = 16
+TRANSIT_CONCURRENCY = 32
+MATRIX_CHUNK = 10  # Max origins (and destinations) per distance matrix call
+
+# Transit result types served for each requested mode
+TRANSIT_TYPES = {
+    "bus": {"direct_bus"},
+    "metro": {"metro"},
+}
+
+PairKey = Tuple[str, str, str]
+
+
+async def stream_transport_batch(
+    requests: List[Tuple[str, str, str]],
+    maps: Any,
+    transit: Any
+) -> AsyncIterator[bytes]:
+    """
+    Plan many transport requests and stream one NDJSON line per request
+
+    Args:
+        requests: (from_location, to_location, mode) per request, in input order
+        maps: Service exposing place_search() and distance_matrix()
+        transit: Service exposing search_routes()
+
+    Yields:
+        NDJSON lines, in completion order, each tagged with the request index,
+        followed by a final summary line
+    """
+    with start_trace("POST /api/transport/batch", requests=len(requests)):
+        started = time.perf_counter()
+
+        # Dedupe identical requests; every input index still gets its own line
+        indexes: Dict[PairKey, List[int]] = {}
+        for i, (origin, destination, mode) in enumerate(requests):
+            key = (canonical_text(origin), canonical_text(destination), mode or "all")
+            indexes.setdefault(key, []).append(i)
+        pairs = list(indexes)
+
+        # One geocode pass over every distinct place name
+        places = sorted({p[0] for p in pairs} | {p[1] for p in pairs})
+        with span("batch.geocode", places=len(places)):
+            coords = await _geocode_all(maps, places)
+
+        # Road legs resolve per pair as their matrix chunk completes
+        loop = asyncio.get_running_loop()
+        road_futures = {p: loop.create_future() for p in pairs if p[2] in ("cab", "all")}
+        matrix_task = asyncio.create_task(_road_legs(maps, road_futures, coords))
+
+        transit_limit = asyncio.Semaphore(TRANSIT_CONCURRENCY)
+
+        async def plan(pair: PairKey) -> Tuple[PairKey, Dict[str, Any]]:
+            origin, destination, mode = pair
+            result: Dict[str, Any] = {"from": origin, "to": destination, "mode": mode}
+
+            if mode in ("bus", "metro", "all"):
+                try:
+                    async with transit_limit:
+                        with span("batch.transit_search"):
+                            routes = await transit.search_routes(origin, destination)
+                    if mode in TRANSIT_TYPES:
+                        routes = [r for r in routes if _serves_mode(r, mode)]
+                    result["transit"] = routes
+                except Exception as e:
+                    logger.error(f"Batch transit search error: {e}")
+                    result["transit_error"] = str(e)
+
+            if pair in road_futures:
+                result["road"] = await road_futures[pair]
+
+            return pair, result
+
+        tasks = [asyncio.ensure_future(plan(p)) for p in pairs]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                pair, result = await next_done
+                for i in indexes[pair]:
+                    yield orjson.dumps({"index": i, **result}) + b"\n"
+        finally:
+            # Client went away or we finished: stop any leftover work
+            matrix_task.cancel()
+            for task in tasks:
+                task.cancel()
+
+        yield orjson.dumps({
+            "done": True,
+            "requested": len(requests),
+            "unique": len(pairs),
+            "places_geocoded": sum(1 for c in coords.values() if c),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }) + b"\n"
+
+
+def _serves_mode(route: Dict[str, Any], mode: str) -> bool:
+    """Whether a transit result uses only the requested mode (every leg, for transfers)"""
+    legs = route.get("legs") or [route]
+    return all(leg.get("type") in TRANSIT_TYPES[mode] for leg in legs)
+
+
+async def _geocode_all(maps: Any, places: List[str]) -> Dict[str, Optional[str]]:
+    """Resolve each distinct place name to "lat,lng" (None when not found)"""
+    limit = asyncio.Semaphore(GEOCODE_CONCURRENCY)
+
+    async def geocode(name: str) -> Optional[str]:
+        try:
+            async with limit:
+                results = await maps.place_search(name)
+            if results:
+                return f"{results[0]['latitude']},{results[0]['longitude']}"
+        except Exception as e:
+            logger.error(f"Batch geocode error for {name}: {e}")
+        return None
+
+    resolved = await asyncio.gather(*(geocode(p) for p in places))
+    return dict(zip(places, resolved))
+
+
+async def _road_legs(
+    maps: Any,
+    futures: Dict[PairKey, asyncio.Future],
+    coords: Dict[str, Optional[str]]
+):
+    """Fill road leg futures using distance matrices over chunks of origins x destinations"""
+    by_origin: Dict[str, List[PairKey]] = {}
+    for pair in futures:
+        if coords.get(pair[0]) and coords.get(pair[1]):
+            by_origin.setdefault(pair[0], []).append(pair)
+        else:
+            futures[pair].set_result({"error": "Could not geocode origin or destination"})
+
+    origins = sorted(by_origin)
+    chunks = []
+    for o in range(0, len(origins), MATRIX_CHUNK):
+        origin_chunk = origins[o:o + MATRIX_CHUNK]
+        chunk_pairs = [p for origin in origin_chunk for p in by_origin[origin]]
+        destinations = sorted({p[1] for p in chunk_pairs})
+        for d in range(0, len(destinations), MATRIX_CHUNK):
+            dest_chunk = destinations[d:d + MATRIX_CHUNK]
+            wanted = [p for p in chunk_pairs if p[1] in dest_chunk]
+            chunks.append(_matrix_chunk(maps, origin_chunk, dest_chunk, wanted, futures, coords))
+
+    await asyncio.gather(*chunks)
+
+
+async def _matrix_chunk(
+    maps: Any,
+    origins: List[str],
+    destinations: List[str],
+    wanted: List[PairKey],
+    futures: Dict[PairKey, asyncio.Future],
+    coords: Dict[str, Optional[str]]
+):
+    """Fetch one distance matrix chunk and resolve the pairs it covers"""
+    try:
+        with span("batch.distance_matrix", origins=len(origins), destinations=len(destinations)):
+            matrix = await maps.distance_matrix(
+                [coords[o] for o in origins],
+                [coords[d] for d in destinations]
+            )
+        rows = matrix.get("rows", [])
+        for pair in wanted:
+            i, j = origins.index(pair[0]), destinations.index(pair[1])
+            try:
+                element = rows[i]["elements"][j]
+            except (IndexError, KeyError):
+                element = {"error": "No road route found"}
+            futures[pair].set_result(element)
+    except Exception as e:
+        logger.error(f"Batch distance matrix error: {e}")
+        for pair in wanted:
+            if not futures[pair].done():
+                futures[pair].set_result({"error": str(e)})
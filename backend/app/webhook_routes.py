@@ -0,0 +1,45 @@
+"""
+Payment webhook endpoint
+Verifies the Razorpay signature, queues the event and answers at once;
+the ledger is updated by the background consumer in payment_webhooks.
+"""
+from fastapi import APIRouter, HTTPException, Request
+import hashlib
+import json
+import logging
+
+from app.tools.payment_webhooks import payment_webhooks, verify_signature
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"], include_in_schema=False)
+logger = logging.getLogger(__name__)
+
+RETRY_AFTER_SECONDS = 5
+
+
+@router.post("/razorpay")
+async def razorpay_webhook(request: Request):
+    """Razorpay payment, order and refund events"""
+    if not payment_webhooks.secret:
+        raise HTTPException(status_code=503, detail="Webhook secret not configured")
+
+    body = await request.body()
+    if not verify_signature(body, request.headers.get("x-razorpay-signature"), payment_webhooks.secret):
+        raise HTTPException(status_code=400, detail="Invalid signature")
+
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    # Redeliveries keep the same event id header; fall back to the body hash
+    event_id = request.headers.get("x-razorpay-event-id") or hashlib.sha256(body).hexdigest()
+    status = payment_webhooks.submit(event_id, event)
+    if status == "full":
+        logger.warning("Webhook queue full, asking Razorpay to retry")
+        raise HTTPException(
+            status_code=503,
+            detail="Webhook queue full",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
+    return {"status": status}
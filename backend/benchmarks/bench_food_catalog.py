@@ -0,0 +1,118 @@
+"""
+Food catalog search benchmark
+Compares FoodCatalogIndex against a full scan + sort over a synthetic
+catalog of Bengaluru restaurants.
+
+Usage (from backend/):
+    python -m benchmarks.bench_food_catalog --entries 20000 --queries 500
+"""
+import argparse
+import json
+import math
+import random
+import statistics
+import time
+from typing import Any, Dict, List
+
+from app.tools.food_catalog import FoodCatalogIndex, tokenize
+
+CUISINES = [
+    "South Indian", "North Indian", "Chinese", "Andhra", "Chettinad", "Mangalorean",
+    "Kerala", "Street Food", "Biryani", "Cafe", "Bakery", "Italian", "Continental",
+]
+DISHES = [
+    "Masala Dosa", "Rava Idli", "Filter Coffee", "Bisi Bele Bath", "Chicken Biryani",
+    "Ghee Roast", "Neer Dosa", "Paneer Tikka", "Hakka Noodles", "Gobi Manchurian",
+    "Pani Puri", "Butter Chicken", "Appam", "Kothu Parotta", "Benne Dosa",
+]
+WORDS = ["Sri", "New", "Royal", "Udupi", "Namma", "Darshini", "Bhavan", "Kitchen", "Grand", "Corner"]
+QUERIES = ["dosa", "biryani", "coffee", "chicken", "idli", "noodles", "ghee roast", "paneer"]
+
+
+def synthetic_catalog(entries: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    catalog = []
+    for i in range(entries):
+        opens = rng.choice(["06:00", "07:00", "11:00", "12:00", "17:00"])
+        catalog.append({
+            "restaurant_id": f"R{i}",
+            "name": f"{' '.join(rng.sample(WORDS, 2))} {i}",
+            "cuisine": ", ".join(rng.sample(CUISINES, rng.randint(1, 3))),
+            "rating": round(rng.uniform(3.0, 4.9), 1),
+            "specialties": rng.sample(DISHES, 3),
+            "latitude": rng.uniform(12.80, 13.15),
+            "longitude": rng.uniform(77.45, 77.80),
+            "hours": [[opens, rng.choice(["22:00", "23:30", "01:00"])]],
+        })
+    return catalog
+
+
+def _haversine_km(a, b) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0088 * math.asin(math.sqrt(h))
+
+
+def naive_search(catalog: List[Dict[str, Any]], query: str, location, radius_km: float, limit: int):
+    """Full scan, per-entry distance and a complete sort (the old approach)"""
+    words = tokenize(query)
+    hits = []
+    for entry in catalog:
+        text = " ".join([entry["name"], entry["cuisine"], *entry["specialties"]]).lower()
+        if not all(w in text for w in words):
+            continue
+        km = _haversine_km(location, (entry["latitude"], entry["longitude"]))
+        if km <= radius_km:
+            hits.append((entry["rating"] / 5 + 2 / (2 + km), entry["restaurant_id"]))
+    hits.sort(reverse=True)
+    return hits[:limit]
+
+
+def timed(fn, runs: List[tuple]) -> Dict[str, float]:
+    samples = []
+    for args in runs:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--radius-km", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    catalog = synthetic_catalog(args.entries, args.seed)
+    started = time.perf_counter()
+    index = FoodCatalogIndex(catalog)
+    build_secs = time.perf_counter() - started
+
+    rng = random.Random(args.seed)
+    runs = [
+        (rng.choice(QUERIES), (rng.uniform(12.85, 13.1), rng.uniform(77.5, 77.75)))
+        for _ in range(args.queries)
+    ]
+
+    results = {
+        "entries": args.entries,
+        "index_build_ms": round(build_secs * 1000, 1),
+        "indexed": timed(
+            lambda q, loc: index.search(query=q, location=loc, radius_km=args.radius_km, limit=10), runs
+        ),
+        # The scan is slow; a tenth of the queries is enough for a stable median
+        "full_scan": timed(
+            lambda q, loc: naive_search(catalog, q, loc, args.radius_km, 10), runs[:max(1, len(runs) // 10)]
+        ),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+GTFSService benchmark on a synthetic city-scale feed
+Serves a generated feed from a local static file server and measures ingest
+(download + index build) time, snapshot load time, peak memory, the memory
+a worker holds for the loaded indexes, search_routes latency and
+get_live_arrivals latency.
+
+Usage (from backend/):
+    python -m benchmarks.bench_gtfs --routes 600 --queries 20
+    python -m benchmarks.bench_gtfs --feed-dir /tmp/gtfs --queries 5 --json baseline.json
+
+--feed-dir reuses a feed written by benchmarks.gtfs_synth; otherwise one is
+generated into a temporary directory with the given --routes and --seed.
+"""
+import argparse
+import asyncio
+import csv
+import functools
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from app.tools.gtfs_service import GTFSService
+from benchmarks import gtfs_synth
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory: str) -> ThreadingHTTPServer:
+    """Start a static file server on a free localhost port"""
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/max in milliseconds"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def stop_names(feed_dir: str) -> List[str]:
+    with open(os.path.join(feed_dir, "stops.txt"), newline="", encoding="utf-8") as f:
+        return [row["stop_name"] for row in csv.DictReader(f)]
+
+
+async def run(feed_root: str, queries: int, seed: int) -> Dict[str, Any]:
+    server = serve_directory(feed_root)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    snapshot_dir = tempfile.mkdtemp()
+    service = GTFSService()
+    service.bmtc_url = f"{base}/bmtc"
+    service.bmrcl_url = f"{base}/bmrcl"
+    service.snapshot_dir = snapshot_dir
+
+    try:
+        # Ingest: download every file the service reads and compile the indexes
+        tracemalloc.start()
+        started = time.perf_counter()
+        await service.warm()
+        ingest_secs = time.perf_counter() - started
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # What a freshly started worker pays instead, with the snapshot on disk
+        fresh = GTFSService()
+        fresh.snapshot_dir = snapshot_dir
+        tracemalloc.start()
+        started = time.perf_counter()
+        fresh.load_snapshot(service.bmtc_url)
+        fresh.load_snapshot(service.bmrcl_url)
+        snapshot_secs = time.perf_counter() - started
+        index_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        rng = random.Random(seed)
+        bus_stops = stop_names(os.path.join(feed_root, "bmtc"))
+        metro_stops = stop_names(os.path.join(feed_root, "bmrcl"))
+
+        search = []
+        for _ in range(queries):
+            names = metro_stops if rng.random() < 0.3 else bus_stops
+            origin, destination = rng.sample(names, 2)
+            started = time.perf_counter()
+            await service.search_routes(origin, destination)
+            search.append(time.perf_counter() - started)
+
+        arrivals = []
+        for _ in range(queries):
+            started = time.perf_counter()
+            await service.get_live_arrivals(rng.choice(bus_stops))
+            arrivals.append(time.perf_counter() - started)
+    finally:
+        server.shutdown()
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    return {
+        "feed_rows": {stat["feed"].split("/")[-1]: stat["rows"] for stat in service.feed_stats()},
+        "ingest_seconds": round(ingest_secs, 3),
+        "snapshot_load_seconds": round(snapshot_secs, 3),
+        "ingest_peak_traced_mb": round(peak_bytes / 2**20, 1),
+        "worker_index_traced_mb": round(index_bytes / 2**20, 1),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "search_routes": percentiles(search),
+        "get_live_arrivals": percentiles(arrivals),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feed-dir", help="Existing feed root containing bmtc/ and bmrcl/")
+    parser.add_argument("--routes", type=int, default=600, help="Bus routes to generate (6000 = full BMTC)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--queries", type=int, default=20, help="Queries per latency benchmark")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        feed_root = args.feed_dir
+        if not feed_root:
+            feed_root = tmp
+            started = time.perf_counter()
+            gtfs_synth.generate(feed_root, routes=args.routes, seed=args.seed)
+            print(f"Generated {args.routes} routes in {time.perf_counter() - started:.1f}s")
+        results = asyncio.run(run(feed_root, args.queries, args.seed))
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
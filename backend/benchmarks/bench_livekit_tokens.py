@@ -0,0 +1,79 @@
+"""
+LiveKit token issuance benchmark
+Single-core tokens/sec for the old per-request AccessToken path, the
+template signer with unique identities (every call signs), reconnects
+served from the token cache, and bulk pre-issue for one room.
+
+Usage (from backend/):
+    python -m benchmarks.bench_livekit_tokens --tokens 20000
+"""
+import argparse
+import json
+import os
+import time
+from typing import Callable, Dict
+
+# Dummy credentials; nothing is sent to a LiveKit server
+os.environ.setdefault("LIVEKIT_API_KEY", "bench-key")
+os.environ.setdefault("LIVEKIT_API_SECRET", "bench-secret-bench-secret-bench-secret")
+
+from livekit import api
+
+from app.tools.livekit_tokens import LiveKitTokenService
+
+
+def legacy_token(identity: str) -> str:
+    """What the /livekit/token handler did before: a fresh AccessToken per request"""
+    token = api.AccessToken(os.environ["LIVEKIT_API_KEY"], os.environ["LIVEKIT_API_SECRET"])
+    token.with_identity(identity)
+    token.with_name("Guest")
+    token.with_grants(api.VideoGrants(room_join=True, room="namma-guide", can_publish=True, can_subscribe=True))
+    return token.to_jwt()
+
+
+def rate(fn: Callable[[int], object], calls: int) -> Dict[str, float]:
+    started = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    elapsed = time.perf_counter() - started
+    return {"tokens_per_sec": round(calls / elapsed), "us_per_token": round(elapsed / calls * 1e6, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--reconnect-users", type=int, default=1000, help="Distinct users in the reconnect run")
+    parser.add_argument("--bulk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    verifier = api.TokenVerifier()
+    service = LiveKitTokenService()
+    claims = verifier.verify(service.issue("check", room="namma-guide")["token"])
+    assert claims.video.room == "namma-guide" and claims.video.room_join
+
+    cold = LiveKitTokenService()
+    warm = LiveKitTokenService()
+    for i in range(args.reconnect_users):
+        warm.issue(f"user-{i}")
+
+    bulk = LiveKitTokenService()
+    batches = max(1, args.tokens // args.bulk_size)
+    started = time.perf_counter()
+    for b in range(batches):
+        bulk.issue_bulk(f"event-{b}", [f"user-{i}" for i in range(args.bulk_size)])
+    bulk_secs = time.perf_counter() - started
+
+    print(json.dumps({
+        "tokens": args.tokens,
+        "legacy_access_token": rate(lambda i: legacy_token(f"user-{i}"), args.tokens),
+        "service_unique_identities": rate(lambda i: cold.issue(f"user-{i}"), args.tokens),
+        "service_reconnects": rate(lambda i: warm.issue(f"user-{i % args.reconnect_users}"), args.tokens),
+        "bulk_pre_issue": {
+            "tokens_per_sec": round(batches * args.bulk_size / bulk_secs),
+            "ms_per_batch": round(bulk_secs / batches * 1000, 2),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Payment ledger benchmark
+Creates and verifies orders from several processes (like uvicorn workers),
+each with several threads, against one SQLiteLedger file. Every order is
+sent twice under the same idempotency key, from different processes, so
+the run also checks that retries never create duplicates.
+
+Usage (from backend/):
+    python -m benchmarks.bench_payments --processes 4 --threads 4 --orders 2000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from app.tools.payment_ledger import SQLiteLedger, request_hash
+
+
+def _order(n: int, worker: int) -> Dict[str, Any]:
+    return {
+        "id": f"order_{worker}_{n}",
+        "entity": "order",
+        "amount": 10000 + n,
+        "amount_paid": 0,
+        "amount_due": 10000 + n,
+        "currency": "INR",
+        "receipt": f"rcpt_{n}",
+        "status": "created",
+        "attempts": 0,
+        "notes": {},
+        "created_at": int(time.time()),
+    }
+
+
+def _payment(order_id: str, amount: int) -> Dict[str, Any]:
+    return {
+        "id": f"pay_{order_id}",
+        "entity": "payment",
+        "amount": amount,
+        "currency": "INR",
+        "status": "captured",
+        "order_id": order_id,
+        "captured": True,
+        "created_at": int(time.time()),
+    }
+
+
+def _worker(path: str, worker: int, numbers: List[int], threads: int, results):
+    ledger = SQLiteLedger(path)
+
+    def create(n: int):
+        params = {"amount": 10000 + n, "currency": "INR", "receipt": f"rcpt_{n}", "notes": {}}
+        started = time.perf_counter()
+        order, created = ledger.create_order(_order(n, worker), f"key_{n}", request_hash(params))
+        return time.perf_counter() - started, order, created
+
+    def verify(order: Dict[str, Any]):
+        started = time.perf_counter()
+        ledger.record_payment(_payment(order["id"], order["amount"]))
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(threads) as pool:
+        started = time.perf_counter()
+        created = list(pool.map(create, numbers))
+        create_secs = time.perf_counter() - started
+
+        # Only the first creator of each key verifies; the retry saw created=False
+        fresh = [order for _, order, is_new in created if is_new]
+        started = time.perf_counter()
+        verified = list(pool.map(verify, fresh))
+        verify_secs = time.perf_counter() - started
+
+    results.put({
+        "create": [latency for latency, _, _ in created],
+        "create_secs": create_secs,
+        "replayed": sum(1 for _, _, is_new in created if not is_new),
+        "verify": verified,
+        "verify_secs": verify_secs,
+    })
+
+
+def _summary(samples: List[float], wall_secs: float) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "ops": len(ordered),
+        "ops_per_sec": round(len(ordered) / wall_secs, 1) if wall_secs else 0.0,
+        "p50_ms": round(statistics.median(ordered) * 1000, 3) if ordered else 0.0,
+        "p99_ms": round(ordered[int(len(ordered) * 0.99)] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--orders", type=int, default=2000, help="Distinct orders (each sent twice)")
+    parser.add_argument("--db", help="Ledger file (default: a temporary file)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "payments.db")
+    SQLiteLedger(path).get_order("warmup")  # Create the schema before the workers race for it
+
+    # Each order number goes to two different processes: the original and its retry
+    shares: List[List[int]] = [[] for _ in range(args.processes)]
+    for n in range(args.orders):
+        shares[n % args.processes].append(n)
+        shares[(n + 1) % args.processes].append(n)
+
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=_worker, args=(path, i, shares[i], args.threads, results))
+        for i in range(args.processes)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    reports = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    wall_secs = time.perf_counter() - started
+
+    ledger = SQLiteLedger(path)
+    conn = ledger._conn()
+    stored_orders = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    paid_orders = conn.execute("SELECT COUNT(*) FROM orders WHERE status = 'paid'").fetchone()[0]
+
+    print(json.dumps({
+        "processes": args.processes,
+        "threads_per_process": args.threads,
+        "wall_secs": round(wall_secs, 2),
+        # Per-process phases overlap, so throughput is measured over the slowest process
+        "create": _summary(
+            [s for r in reports for s in r["create"]], max(r["create_secs"] for r in reports)
+        ),
+        "verify": _summary(
+            [s for r in reports for s in r["verify"]], max(r["verify_secs"] for r in reports)
+        ),
+        "idempotency": {
+            "requests": sum(len(share) for share in shares),
+            "replayed": sum(r["replayed"] for r in reports),
+            "stored_orders": stored_orders,
+            "duplicates": stored_orders - args.orders,
+            "paid_orders": paid_orders,
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
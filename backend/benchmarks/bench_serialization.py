@@ -0,0 +1,103 @@
+"""
+Per-response serialization CPU microbenchmark
+Compares FastAPI's default dict path against the FastJSONResponse model path
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization [--steps 300] [--iterations 2000]
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.responses import FastJSONResponse
+from app.routes import TransportResponse
+
+
+def build_payload(steps: int) -> Dict[str, Any]:
+    """Transport response with long step lists, the shape that dominates serialization"""
+    def route(mode: str) -> Dict[str, Any]:
+        return {
+            "mode": mode,
+            "duration": "42 mins",
+            "distance": "18.4 km",
+            "cost": "₹40-50",
+            "steps": [
+                f"Step {i}: continue on Outer Ring Road towards Marathahalli for {i % 7 + 1}00 m"
+                for i in range(steps)
+            ],
+            "line": "Purple Line",
+            "stations": 14
+        }
+
+    return {
+        "from": "Kengeri Bus Station",
+        "to": "Whitefield",
+        "routes": [route("Metro"), route("Bus"), route("Cab")],
+        "traffic": "Moderate",
+        "best_option": "Metro"
+    }
+
+
+def run_sync(coro) -> Any:
+    """Drive a coroutine that never suspends, without event loop overhead"""
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def measure(fn: Callable[[], bytes], iterations: int) -> float:
+    """Mean process CPU microseconds per call"""
+    fn()  # warm up
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=300, help="Steps per route")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    payload = build_payload(args.steps)
+    field = create_model_field("response", TransportResponse, mode="serialization")
+    plain = JSONResponse(None)
+
+    def before_dict() -> bytes:
+        # Handler returns a dict: jsonable_encoder + stdlib json
+        return plain.render(jsonable_encoder(payload))
+
+    def before_response_model() -> bytes:
+        # Handler builds the model and declares response_model: validated twice
+        model = TransportResponse.model_validate(payload)
+        return plain.render(run_sync(serialize_response(field=field, response_content=model)))
+
+    def after() -> bytes:
+        # Validate once, serialize straight from the compiled schema
+        return FastJSONResponse(TransportResponse.model_validate(payload)).body
+
+    assert json.loads(after()) == json.loads(before_dict())
+
+    size = len(after())
+    print(f"Response: {size / 1024:.1f} KiB, {args.steps} steps/route, {args.iterations} iterations")
+    results = {
+        "before (dict + jsonable_encoder + json)": measure(before_dict, args.iterations),
+        "before (response_model, double validation)": measure(before_response_model, args.iterations),
+        "after (validate once + FastJSONResponse)": measure(after, args.iterations),
+    }
+    baseline = results["before (dict + jsonable_encoder + json)"]
+    for name, micros in results.items():
+        print(f"  {name:<46} {micros:9.1f} µs/response  ({baseline / micros:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Seeded synthetic GTFS feed generator
+Writes a valid city-scale BMTC bus feed and a BMRCL metro feed laid out over
+Bengaluru, for benchmarking GTFSService offline.
+
+Usage (from backend/):
+    python -m benchmarks.gtfs_synth --out /tmp/gtfs --routes 6000 --seed 42
+
+The output directory gets bmtc/ and bmrcl/ subdirectories, each a complete
+feed (agency, stops, routes, trips, stop_times, calendar, frequencies).
+"""
+import argparse
+import csv
+import math
+import os
+import random
+from typing import Dict, List, Tuple
+
+from app.tools.mock_gtfs import MockGTFSService
+
+# Bengaluru bounding box
+LAT_MIN, LAT_MAX = 12.80, 13.15
+LNG_MIN, LNG_MAX = 77.45, 77.80
+GRID_CELLS = 40
+
+SERVICE_START = 5 * 3600
+SERVICE_END = 23 * 3600
+
+AREAS = [
+    "Majestic", "Kempegowda Bus Station", "Shivajinagar", "MG Road", "Indiranagar", "Koramangala",
+    "Silk Board", "BTM Layout", "HSR Layout", "Electronic City", "Whitefield", "Marathahalli",
+    "KR Puram", "Hebbal", "Yelahanka", "Jayanagar", "JP Nagar", "Banashankari", "Basavanagudi",
+    "Rajajinagar", "Malleshwaram", "Yeshwanthpur", "Peenya", "Vijayanagar", "Kengeri",
+    "RR Nagar", "Bellandur", "Sarjapur", "Domlur", "Ulsoor", "Frazer Town", "RT Nagar",
+    "Banaswadi", "Hennur", "Kalyan Nagar", "Mahadevapura", "Hoodi", "Kadugodi", "Brookefield",
+    "Bommanahalli", "Begur", "Hulimavu", "Bannerghatta Road", "Uttarahalli", "Kumaraswamy Layout",
+    "Chamarajpet", "KR Market", "Lalbagh", "Wilson Garden", "Shanti Nagar", "Richmond Town",
+    "Sadashivanagar", "Mathikere", "Jalahalli", "Vidyaranyapura", "Nagarbhavi", "Kamakshipalya",
+    "Basaveshwaranagar", "Magadi Road", "Mysore Road", "Attiguppe", "Nayandahalli", "Kanakapura Road",
+]
+SUFFIXES = [
+    "", "Bus Stop", "Circle", "Cross", "Main Road", "Junction", "Depot", "Bus Station",
+    "1st Block", "2nd Stage", "Police Station", "Post Office", "Market", "Gate", "Signal",
+]
+
+
+def _time(seconds: int) -> str:
+    """GTFS HH:MM:SS (hours may exceed 24 for after-midnight service)"""
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _distance_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    dlat = (b[0] - a[0]) * 111.0
+    dlng = (b[1] - a[1]) * 111.0 * math.cos(math.radians(a[0]))
+    return math.hypot(dlat, dlng)
+
+
+def _write(path: str, header: List[str], rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _write_common(feed_dir: str, agency_id: str, agency_name: str):
+    _write(
+        os.path.join(feed_dir, "agency.txt"),
+        ["agency_id", "agency_name", "agency_url", "agency_timezone"],
+        [[agency_id, agency_name, "https://example.invalid", "Asia/Kolkata"]],
+    )
+    _write(
+        os.path.join(feed_dir, "calendar.txt"),
+        ["service_id", "monday", "tuesday", "wednesday", "thursday", "friday",
+         "saturday", "sunday", "start_date", "end_date"],
+        [
+            ["WKDY", 1, 1, 1, 1, 1, 0, 0, "20250101", "20271231"],
+            ["SAT", 0, 0, 0, 0, 0, 1, 0, "20250101", "20271231"],
+            ["SUN", 0, 0, 0, 0, 0, 0, 1, "20250101", "20271231"],
+        ],
+    )
+
+
+def generate_bmtc(
+    feed_dir: str,
+    rng: random.Random,
+    routes: int,
+    stops: int,
+    trips_per_route: int,
+    frequency_share: float
+) -> Dict[str, int]:
+    """Write the bus feed; returns row counts per file"""
+    os.makedirs(feed_dir, exist_ok=True)
+    _write_common(feed_dir, "BMTC", "Bangalore Metropolitan Transport Corporation")
+
+    # Stops: well-known names first, then area/suffix combinations
+    names: List[str] = []
+    seen = set()
+    for area in AREAS:
+        names.append(area)
+        seen.add(area)
+    while len(names) < stops:
+        name = f"{rng.choice(AREAS)} {rng.choice(SUFFIXES)}".strip()
+        if name in seen:
+            name = f"{name} ({len(names)})"
+        seen.add(name)
+        names.append(name)
+
+    coords = [(rng.uniform(LAT_MIN, LAT_MAX), rng.uniform(LNG_MIN, LNG_MAX)) for _ in names]
+    cells: Dict[Tuple[int, int], List[int]] = {}
+    for i, (lat, lng) in enumerate(coords):
+        cell = (
+            int((lat - LAT_MIN) / (LAT_MAX - LAT_MIN) * (GRID_CELLS - 1)),
+            int((lng - LNG_MIN) / (LNG_MAX - LNG_MIN) * (GRID_CELLS - 1)),
+        )
+        cells.setdefault(cell, []).append(i)
+    occupied = list(cells)
+
+    _write(
+        os.path.join(feed_dir, "stops.txt"),
+        ["stop_id", "stop_name", "stop_lat", "stop_lon"],
+        ([f"S{i}", name, f"{lat:.6f}", f"{lng:.6f}"] for i, (name, (lat, lng)) in enumerate(zip(names, coords))),
+    )
+
+    route_rows = []
+    trip_rows = []
+    frequency_rows = []
+    stop_time_count = 0
+
+    with open(os.path.join(feed_dir, "stop_times.txt"), "w", newline="", encoding="utf-8") as f:
+        stop_times = csv.writer(f)
+        stop_times.writerow(["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"])
+
+        for r in range(routes):
+            # Walk across grid cells from one end of the route to the other
+            start, end = rng.choice(occupied), rng.choice(occupied)
+            length = rng.randint(20, 60)
+            path: List[int] = []
+            used = set()
+            for k in range(length * 2):
+                t = k / (length * 2 - 1)
+                cell = (
+                    round(start[0] + (end[0] - start[0]) * t + rng.uniform(-1, 1)),
+                    round(start[1] + (end[1] - start[1]) * t + rng.uniform(-1, 1)),
+                )
+                candidates = cells.get(cell)
+                if candidates:
+                    stop = rng.choice(candidates)
+                    if stop not in used:
+                        used.add(stop)
+                        path.append(stop)
+                if len(path) >= length:
+                    break
+            if len(path) < 2:
+                path = rng.sample(range(len(names)), 2)
+
+            # Seconds from the first stop, assuming 12-22 km/h plus dwell time
+            speed = rng.uniform(12, 22) / 3600
+            offsets = [0]
+            for a, b in zip(path, path[1:]):
+                offsets.append(offsets[-1] + int(_distance_km(coords[a], coords[b]) / speed) + 20)
+
+            route_id = f"R{r}"
+            short_name = f"{rng.randint(1, 600)}{rng.choice(['', 'A', 'B', 'C', 'D', 'E', 'K', 'M'])}"
+            ac = rng.random() < 0.08
+            long_name = f"{names[path[0]]} to {names[path[-1]]}"
+            if ac:
+                long_name = f"Vayu Vajra {long_name}"
+            route_rows.append([route_id, "BMTC", short_name, long_name, names[path[-1]], 3])
+
+            uses_frequencies = rng.random() < frequency_share
+            span_secs = max(SERVICE_END - SERVICE_START - offsets[-1], 0)
+            # Frequency trips split the service day into back-to-back windows
+            window_secs = (SERVICE_END - SERVICE_START) // max(trips_per_route, 1)
+            for t in range(trips_per_route):
+                direction = t % 2
+                sequence = path if direction == 0 else path[::-1]
+                seq_offsets = offsets if direction == 0 else [offsets[-1] - o for o in offsets[::-1]]
+                trip_id = f"{route_id}_T{t}"
+                service_id = "WKDY" if t % 5 else rng.choice(["SAT", "SUN"])
+                trip_rows.append([route_id, service_id, trip_id, names[sequence[-1]], direction])
+
+                if uses_frequencies:
+                    departure = SERVICE_START + window_secs * t
+                    frequency_rows.append([
+                        trip_id, _time(departure), _time(departure + window_secs),
+                        rng.choice([300, 600, 900, 1200]), 0
+                    ])
+                else:
+                    departure = SERVICE_START + int(span_secs * t / max(trips_per_route, 1)) + rng.randint(0, 300)
+
+                for seq, (stop, offset) in enumerate(zip(sequence, seq_offsets), start=1):
+                    stamp = _time(departure + offset)
+                    stop_times.writerow([trip_id, stamp, stamp, f"S{stop}", seq])
+                stop_time_count += len(sequence)
+
+    _write(
+        os.path.join(feed_dir, "routes.txt"),
+        ["route_id", "agency_id", "route_short_name", "route_long_name", "route_desc", "route_type"],
+        route_rows,
+    )
+    _write(
+        os.path.join(feed_dir, "trips.txt"),
+        ["route_id", "service_id", "trip_id", "trip_headsign", "direction_id"],
+        trip_rows,
+    )
+    _write(
+        os.path.join(feed_dir, "frequencies.txt"),
+        ["trip_id", "start_time", "end_time", "headway_secs", "exact_times"],
+        frequency_rows,
+    )
+
+    return {
+        "stops": len(names),
+        "routes": len(route_rows),
+        "trips": len(trip_rows),
+        "stop_times": stop_time_count,
+        "frequencies": len(frequency_rows),
+    }
+
+
+def generate_bmrcl(feed_dir: str, rng: random.Random, headway_secs: int = 480) -> Dict[str, int]:
+    """Write the metro feed using the real Purple and Green line station lists (explicit trips, no frequencies)"""
+    os.makedirs(feed_dir, exist_ok=True)
+    _write_common(feed_dir, "BMRCL", "Bangalore Metro Rail Corporation")
+
+    lines = MockGTFSService().metro_lines
+    stop_ids: Dict[str, str] = {}
+    stop_rows = []
+    route_rows = []
+    trip_rows = []
+    stop_time_count = 0
+
+    with open(os.path.join(feed_dir, "stop_times.txt"), "w", newline="", encoding="utf-8") as f:
+        stop_times = csv.writer(f)
+        stop_times.writerow(["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"])
+
+        for line_id, line in lines.items():
+            stations = line["stations"]
+            start = (rng.uniform(LAT_MIN, LAT_MAX), rng.uniform(LNG_MIN, LNG_MAX))
+            end = (rng.uniform(LAT_MIN, LAT_MAX), rng.uniform(LNG_MIN, LNG_MAX))
+            for i, name in enumerate(stations):
+                if name not in stop_ids:
+                    stop_ids[name] = f"M{len(stop_ids)}"
+                    t = i / (len(stations) - 1)
+                    stop_rows.append([
+                        stop_ids[name], name,
+                        f"{start[0] + (end[0] - start[0]) * t:.6f}", f"{start[1] + (end[1] - start[1]) * t:.6f}"
+                    ])
+
+            route_rows.append([line_id, "BMRCL", line_id.title(), line["line_name"], "", 1])
+
+            for direction in (0, 1):
+                sequence = stations if direction == 0 else stations[::-1]
+                departure = SERVICE_START
+                t = 0
+                while departure < SERVICE_END:
+                    trip_id = f"{line_id}_{direction}_{t}"
+                    trip_rows.append([line_id, "WKDY", trip_id, sequence[-1], direction])
+                    for seq, name in enumerate(sequence, start=1):
+                        stamp = _time(departure + (seq - 1) * 150)
+                        stop_times.writerow([trip_id, stamp, stamp, stop_ids[name], seq])
+                    stop_time_count += len(sequence)
+                    departure += headway_secs
+                    t += 1
+
+    _write(os.path.join(feed_dir, "stops.txt"), ["stop_id", "stop_name", "stop_lat", "stop_lon"], stop_rows)
+    _write(
+        os.path.join(feed_dir, "routes.txt"),
+        ["route_id", "agency_id", "route_short_name", "route_long_name", "route_desc", "route_type"],
+        route_rows,
+    )
+    _write(
+        os.path.join(feed_dir, "trips.txt"),
+        ["route_id", "service_id", "trip_id", "trip_headsign", "direction_id"],
+        trip_rows,
+    )
+    _write(
+        os.path.join(feed_dir, "frequencies.txt"),
+        ["trip_id", "start_time", "end_time", "headway_secs", "exact_times"],
+        [],
+    )
+
+    return {
+        "stops": len(stop_rows),
+        "routes": len(route_rows),
+        "trips": len(trip_rows),
+        "stop_times": stop_time_count,
+    }
+
+
+def generate(
+    out_dir: str,
+    routes: int = 6000,
+    stops: int = None,
+    trips_per_route: int = 20,
+    frequency_share: float = 0.2,
+    seed: int = 42
+) -> Dict[str, Dict[str, int]]:
+    """
+    Generate bmtc/ and bmrcl/ feeds under out_dir
+
+    Args:
+        out_dir: Output directory
+        routes: Number of bus routes (about 6,000 for full BMTC scale)
+        stops: Number of bus stops (defaults to 1.5 per route)
+        trips_per_route: Trips per bus route, alternating direction
+        frequency_share: Share of bus routes described by frequencies.txt
+        seed: RNG seed; the same arguments always produce identical files
+
+    Returns:
+        Row counts per feed
+    """
+    rng = random.Random(seed)
+    return {
+        "bmtc": generate_bmtc(
+            os.path.join(out_dir, "bmtc"), rng, routes,
+            stops or max(len(AREAS), int(routes * 1.5)), trips_per_route, frequency_share
+        ),
+        "bmrcl": generate_bmrcl(os.path.join(out_dir, "bmrcl"), rng),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--routes", type=int, default=6000)
+    parser.add_argument("--stops", type=int, default=None)
+    parser.add_argument("--trips-per-route", type=int, default=20)
+    parser.add_argument("--frequency-share", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    counts = generate(
+        args.out, args.routes, args.stops, args.trips_per_route, args.frequency_share, args.seed
+    )
+    for feed, rows in counts.items():
+        print(feed, ", ".join(f"{k}={v:,}" for k, v in rows.items()))
+
+
+if __name__ == "__main__":
+    main()
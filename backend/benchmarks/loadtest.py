@@ -0,0 +1,346 @@
+"""
+HTTP load-test harness for the FastAPI app
+Drives /api/transport/search, /api/discovery/search, /livekit/token and
+/health with a synthetic Bengaluru traffic mix, or replays a recorded request
+log at N× speed, and writes p50/p95/p99, throughput and error rates as JSON
+so runs can be compared between commits.
+
+Usage (from backend/):
+    python -m benchmarks.loadtest mix --rate 200 --duration 30 --json baseline.json
+    python -m benchmarks.loadtest replay prod.ndjson --speed 5 --json replay.json
+    python -m benchmarks.loadtest compare baseline.json candidate.json --max-regression 0.1
+
+Requests are sent open-loop on a seeded Poisson schedule and latency is
+measured from each request's scheduled time, so a stalled server shows up as
+tail latency instead of silently lowering the offered load. --in-process runs
+against app.main:app through ASGITransport instead of --base-url. Point the
+app at standins.upstream (MAPPLS_BASE_URL etc.) to exercise the real
+upstream code paths without network. /livekit/token needs LIVEKIT_API_KEY
+and LIVEKIT_API_SECRET set on the server (any values sign a token).
+
+Replay logs are NDJSON, one request per line:
+    {"ts": 1718000000.25, "method": "POST", "path": "/api/transport/search", "body": {...}}
+ts is in seconds; only differences between lines matter.
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+# Weighted endpoint mix for synthetic traffic
+ENDPOINT_MIX = {
+    "transport": 0.55,
+    "discovery": 0.30,
+    "livekit_token": 0.05,
+    "health": 0.10,
+}
+
+# Ordered roughly by trip volume; origins and destinations are drawn Zipf-like
+# so popular pairs repeat the way real commute traffic does
+AREAS = [
+    "Majestic", "Koramangala", "Whitefield", "Electronic City", "Silk Board",
+    "Indiranagar", "MG Road", "Marathahalli", "HSR Layout", "Hebbal",
+    "Jayanagar", "BTM Layout", "KR Puram", "Yeshwanthpur", "Banashankari",
+    "Bellandur", "Malleshwaram", "Kengeri", "Yelahanka", "JP Nagar",
+]
+
+TRANSPORT_MODES = {"all": 0.7, "metro": 0.1, "bus": 0.1, "cab": 0.1}
+
+DISCOVERY_QUERIES = [
+    "masala dosa", "filter coffee", "idli", "chinese", "biryani",
+    "craft beer", "bookstores", "street food", "rooftop restaurant", "shopping",
+]
+
+
+@dataclass
+class PlannedRequest:
+    offset: float  # Seconds after the run starts
+    label: str
+    method: str
+    path: str
+    body: Optional[Dict[str, Any]] = None
+
+
+def _zipf_weights(n: int, s: float = 1.0) -> List[float]:
+    return [1 / (rank + 1) ** s for rank in range(n)]
+
+
+def synthetic_plan(rate: float, duration: float, seed: int) -> List[PlannedRequest]:
+    """Poisson arrivals at `rate` req/s for `duration` seconds"""
+    rng = random.Random(seed)
+    labels, label_weights = zip(*ENDPOINT_MIX.items())
+    modes, mode_weights = zip(*TRANSPORT_MODES.items())
+    area_weights = _zipf_weights(len(AREAS))
+
+    plan = []
+    offset = rng.expovariate(rate)
+    while offset < duration:
+        label = rng.choices(labels, label_weights)[0]
+        if label == "transport":
+            origin, destination = rng.choices(AREAS, area_weights, k=2)
+            while destination == origin:
+                destination = rng.choices(AREAS, area_weights)[0]
+            request = PlannedRequest(offset, label, "POST", "/api/transport/search", {
+                "from_location": origin,
+                "to_location": destination,
+                "mode": rng.choices(modes, mode_weights)[0],
+            })
+        elif label == "discovery":
+            request = PlannedRequest(offset, label, "POST", "/api/discovery/search", {
+                "query": rng.choice(DISCOVERY_QUERIES),
+                "location": rng.choices(AREAS, area_weights)[0],
+            })
+        elif label == "livekit_token":
+            request = PlannedRequest(offset, label, "POST", "/livekit/token", {
+                "userId": f"load-{rng.getrandbits(32):08x}",
+                "room": "namma-guide",
+            })
+        else:
+            request = PlannedRequest(offset, label, "GET", "/health")
+        plan.append(request)
+        offset += rng.expovariate(rate)
+    return plan
+
+
+def replay_plan(path: str, speed: float, limit: Optional[int] = None) -> List[PlannedRequest]:
+    """Schedule a recorded NDJSON request log, compressed by `speed`"""
+    entries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    entries.sort(key=lambda e: e["ts"])
+    if limit:
+        entries = entries[:limit]
+    if not entries:
+        return []
+
+    start = entries[0]["ts"]
+    return [
+        PlannedRequest(
+            offset=(e["ts"] - start) / speed,
+            label=e["path"].split("?")[0],
+            method=e.get("method", "GET").upper(),
+            path=e["path"],
+            body=e.get("body"),
+        )
+        for e in entries
+    ]
+
+
+class Recorder:
+    """Latency samples and status counts per endpoint label"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def add(self, label: str, latency: float, status: str):
+        self.latencies[label].append(latency)
+        self.statuses[label][status] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {
+            label: _summarize(self.latencies[label], self.statuses[label], elapsed)
+            for label in sorted(self.latencies)
+        }
+        overall = _summarize(
+            [s for samples in self.latencies.values() for s in samples],
+            sum(self.statuses.values(), Counter()),
+            elapsed
+        )
+        return {"overall": overall, "endpoints": endpoints}
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    # Nearest-rank percentile
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))]
+
+
+def _summarize(samples: List[float], statuses: Counter, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    summary = {
+        "count": len(ordered),
+        "errors": errors,
+        "error_rate": round(errors / len(ordered), 4) if ordered else 0.0,
+        "throughput_rps": round((len(ordered) - errors) / elapsed, 2) if elapsed else 0.0,
+        "status": dict(sorted(statuses.items())),
+    }
+    if ordered:
+        summary.update({
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+        })
+    return summary
+
+
+async def _send(client: httpx.AsyncClient, request: PlannedRequest, scheduled: float,
+                recorder: Recorder, slots: asyncio.Semaphore):
+    async with slots:
+        try:
+            response = await client.request(request.method, request.path, json=request.body)
+            await response.aread()
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = f"error:{type(e).__name__}"
+    recorder.add(request.label, time.perf_counter() - scheduled, status)
+
+
+async def execute(plan: List[PlannedRequest], client: httpx.AsyncClient, max_in_flight: int) -> Dict[str, Any]:
+    """Fire the plan on schedule and return the latency summary"""
+    recorder = Recorder()
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks = []
+    started = time.perf_counter()
+
+    for request in plan:
+        scheduled = started + request.offset
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(_send(client, request, scheduled, recorder, slots)))
+
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    results = recorder.summary(elapsed)
+    results["elapsed_seconds"] = round(elapsed, 3)
+    results["offered_rps"] = round(len(plan) / plan[-1].offset, 2) if plan and plan[-1].offset else None
+    return results
+
+
+def _client(args: argparse.Namespace) -> httpx.AsyncClient:
+    if args.in_process:
+        from app.main import app
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://loadtest",
+            timeout=args.timeout
+        )
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    return httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout)
+
+
+async def _run(args: argparse.Namespace, plan: List[PlannedRequest]) -> Dict[str, Any]:
+    async with _client(args) as client:
+        return await execute(plan, client, args.max_in_flight)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], max_regression: float) -> List[str]:
+    """Print per-endpoint deltas and return the regressions found"""
+    regressions = []
+    rows = [("overall", baseline["overall"], candidate["overall"])]
+    rows += [
+        (label, baseline["endpoints"][label], candidate["endpoints"][label])
+        for label in sorted(set(baseline["endpoints"]) & set(candidate["endpoints"]))
+    ]
+
+    print(f"{'endpoint':<28}{'metric':<16}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for label, old, new in rows:
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "error_rate"):
+            if metric not in old or metric not in new:
+                continue
+            change = (new[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+            print(f"{label:<28}{metric:<16}{old[metric]:>12}{new[metric]:>12}{change:>+10.1%}")
+
+            if metric in ("p95_ms", "p99_ms") and change > max_regression:
+                regressions.append(f"{label} {metric} +{change:.1%}")
+            elif metric == "throughput_rps" and change < -max_regression:
+                regressions.append(f"{label} throughput {change:.1%}")
+            elif metric == "error_rate" and new[metric] - old[metric] > 0.01:
+                regressions.append(f"{label} error rate {old[metric]:.2%} -> {new[metric]:.2%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    target = argparse.ArgumentParser(add_help=False)
+    target.add_argument("--base-url", default="http://127.0.0.1:8000")
+    target.add_argument("--in-process", action="store_true", help="Drive app.main:app without a server")
+    target.add_argument("--max-in-flight", type=int, default=256)
+    target.add_argument("--timeout", type=float, default=30.0)
+    target.add_argument("--json", help="Write results to this file")
+
+    mix = commands.add_parser("mix", parents=[target], help="Synthetic Bengaluru traffic")
+    mix.add_argument("--rate", type=float, default=50.0, help="Offered requests per second")
+    mix.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    mix.add_argument("--seed", type=int, default=42)
+
+    replay = commands.add_parser("replay", parents=[target], help="Replay a recorded NDJSON log")
+    replay.add_argument("log", help="NDJSON request log")
+    replay.add_argument("--speed", type=float, default=1.0, help="Replay at N× the recorded rate")
+    replay.add_argument("--limit", type=int, help="Replay at most this many requests")
+
+    comparison = commands.add_parser("compare", help="Compare two result files")
+    comparison.add_argument("baseline")
+    comparison.add_argument("candidate")
+    comparison.add_argument("--max-regression", type=float, default=0.1,
+                            help="Allowed fractional p95/p99/throughput regression")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.candidate) as f:
+            candidate = json.load(f)
+        regressions = compare(baseline, candidate, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        sys.exit(1 if regressions else 0)
+
+    if args.command == "mix":
+        plan = synthetic_plan(args.rate, args.duration, args.seed)
+        config = {"rate": args.rate, "duration": args.duration, "seed": args.seed}
+    else:
+        plan = replay_plan(args.log, args.speed, args.limit)
+        config = {"log": args.log, "speed": args.speed, "limit": args.limit}
+    if not plan:
+        parser.error("Nothing to send")
+
+    print(f"Sending {len(plan)} requests over {plan[-1].offset:.1f}s")
+    results = {
+        "meta": {
+            "mode": args.command,
+            "target": "in-process" if args.in_process else args.base_url,
+            "config": config,
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        **asyncio.run(_run(args, plan)),
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,153 @@
 """
 Simplified LiveKit Voice Agent - Basic Connection Test
 """
+import asyncio
 import os
 import logging
+import time
 from dotenv import load_dotenv
-from livekit.agents import AutoSubscribe, JobContext, WorkerOptions, cli
+from livekit.agents import AutoSubscribe, JobContext, JobProcess, WorkerOptions, cli
 
 load_dotenv()
 logger = logging.getLogger("namma-guide")
 logging.basicConfig(level=logging.INFO)
 
+# Imported after load_dotenv so the services see .env settings
+from app.agent.functions import NammaGuideFunctions
+from app.agent.latency import SessionLatency
+from app.agent.load import LOAD_THRESHOLD, JobLoadReporter, admit_job, worker_load
+from app.agent.prefetch import Gazetteer, SpeculativePrefetcher
+from app.agent.runner import ToolRunner
+from app.agent.session_context import session_contexts
+from app.agent.tools import AgentTools
+from app.tools import http_pool
+from app.tools.catalog_sync import catalog_sync
+from app.tools.gtfs_service import gtfs_service
+from app.tools.mappls_service import mappls_service
+from app.tools.mock_gtfs import mock_gtfs
+from app.tools.mock_mappls import mock_mappls
+from app.tools.mock_ondc import mock_ondc
+from app.tools.ondc_service import ondc_service
+
+# Seconds a worker process may spend in prewarm; a cold GTFS build of the
+# full BMTC feed takes longer than LiveKit's 10 s default
+PREWARM_TIMEOUT = float(os.getenv("AGENT_PREWARM_TIMEOUT", "120"))
+
+
+def prewarm(proc: JobProcess):
+    """
+    Load transit indexes and open HTTP clients once per worker process
+    
+    Runs before the process accepts a job, so every job it runs starts with
+    the GTFS snapshot, stop-name and spatial indexes, the food catalog and
+    pooled clients ready. The API process keeps the catalog store synced;
+    searches here reload it when that sync moves forward.
+    """
+    started = time.perf_counter()
+    
+    # The job's event loop is already set (not yet running); warm up on it so
+    # pooled connections belong to the loop the jobs will use
+    loop = asyncio.get_event_loop()
+    http_pool.prewarm()
+    
+    # Same service choice as the API routes
+    transit = gtfs_service if os.getenv("BMTC_GTFS_URL") else mock_gtfs
+    if transit is gtfs_service:
+        loop.run_until_complete(gtfs_service.warm())
+    loop.run_until_complete(catalog_sync.load())
+    if catalog_sync.food_count == 0:
+        # Nothing synced yet (no API process, or it has not run): sync once here
+        try:
+            loop.run_until_complete(catalog_sync.sync_once())
+        except Exception as e:
+            logger.error(f"Catalog sync error: {e}")
+    
+    proc.userdata["transit"] = transit
+    proc.userdata["maps"] = mappls_service if os.getenv("MAPPLS_API_KEY") else mock_mappls
+    proc.userdata["mobility"] = ondc_service if os.getenv("ONDC_GATEWAY_URL") else mock_ondc
+
+    # Place names the prefetcher listens for in partial transcripts
+    tools = AgentTools(transit, proc.userdata["maps"], proc.userdata["mobility"])
+    proc.userdata["gazetteer"] = Gazetteer(tools.place_names())
+
+    logger.info(f"🔥 Worker prewarmed in {time.perf_counter() - started:.2f}s (transit: {type(transit).__name__})")
+
 
 async def entrypoint(ctx: JobContext):
     """Main entry point for LiveKit agent"""
     logger.info("🏙️ Namma Guide agent starting...")
     
+    # Shared, already-warm services from prewarm()
+    services = ctx.proc.userdata
+    logger.info(f"Tools ready: {', '.join(sorted(services))}")
+
+    # Per-session tool runner; the function context is what the LLM calls
+    runner = ToolRunner(AgentTools(services["transit"], services["maps"], services["mobility"]))
+    prefetcher = SpeculativePrefetcher(runner, services["gazetteer"])
+    fnc_ctx = NammaGuideFunctions(runner)
+    logger.info(f"LLM functions: {', '.join(sorted(fnc_ctx.ai_functions))}")
+
+    # Report this job's load to the worker's admission control
+    load_reporter = JobLoadReporter(ctx.job.id, runner)
+    load_reporter.start()
+    latency = SessionLatency()
+    utterance_done = False  # The last segment was final: the next one starts a new turn
+
+    def on_transcription(segments, participant=None, publication=None):
+        # Interim segments start prefetches while the user is still speaking
+        nonlocal utterance_done
+        if participant is None or participant.identity == ctx.room.local_participant.identity:
+            return
+        for segment in segments:
+            if utterance_done:
+                # The agent has answered the previous utterance: close its turn so
+                # its results and prefetch budget do not carry into this one
+                prefetcher.end_turn()
+                utterance_done = False
+            if segment.final:
+                utterance_done = True
+                # A new utterance closes the previous turn's timings
+                latency.end_turn(runner.tool_seconds)
+                latency.mark("stt_final", runner.tool_seconds)
+                prefetcher.on_final(segment.text)
+            else:
+                prefetcher.on_partial(segment.text)
+
+    def on_participant_disconnected(participant):
+        # Their places, routes and subscriptions are of no use to anyone else
+        if session_contexts.drop(ctx.room.name, participant.identity):
+            logger.info(f"🧹 Dropped session context for {participant.identity}")
+
     try:
         # Connect to room
         await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
         logger.info("✅ Connected to LiveKit room")
-        
+        ctx.room.on("transcription_received", on_transcription)
+        ctx.room.on("participant_disconnected", on_participant_disconnected)
+
         # Wait for participant
         participant = await ctx.wait_for_participant()
         logger.info(f"👤 Participant joined: {participant.identity}")
-        
+
+        # Follow-ups ("and by bus?") reuse what this participant already asked
+        runner.context = session_contexts.get(ctx.room.name, participant.identity)
+
         # Agent is now ready and listening
         logger.info("🎤 Voice agent ready!")
-        
+
     except Exception as e:
         logger.error(f"❌ Error: {e}")
 
+    async def report():
+        load_reporter.stop()
+        prefetcher.end_turn()
+        latency.end_turn(runner.tool_seconds)
+        logger.info(f"📊 Tool stats: {runner.stats()}")
+        logger.info(f"⏱️ Latency: {latency.stats()}")
+        session_contexts.drop_room(ctx.room.name)
+
+    ctx.add_shutdown_callback(report)
+
 
 if __name__ == "__main__":
     api_key = os.getenv("LIVEKIT_API_KEY")
@@ -43,6 +161,11 @@ if __name__ == "__main__":
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            request_fnc=admit_job,
+            load_fnc=worker_load,
+            load_threshold=LOAD_THRESHOLD,
+            initialize_process_timeout=PREWARM_TIMEOUT,
             api_key=api_key,
             api_secret=api_secret,
             ws_url=ws_url,
@@ -0,0 +1 @@
+# Local stand-in servers package
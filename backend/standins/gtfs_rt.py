@@ -0,0 +1,214 @@
+"""
+Local GTFS-Realtime publisher
+Replays recorded TripUpdates and VehiclePositions feeds, one protobuf file
+per frame, advancing a frame every --interval seconds, so the real-time
+poller can be exercised without a live feed. With --synthesize, frames are
+first recorded from a static feed: seeded random-walk delays where only a
+share of the trips change from one frame to the next.
+
+Usage (from backend/):
+    python -m standins.gtfs_rt --recordings /tmp/gtfs_rt --synthesize /tmp/gtfs --frames 40
+    python -m standins.gtfs_rt --recordings /tmp/gtfs_rt --port 8902 --interval 15
+
+Recordings are laid out as <operator>/<trip_updates|vehicle_positions>/<frame>.pb.
+Then point the app at it:
+    BMTC_GTFS_RT_URL=http://127.0.0.1:8902/gtfs-rt/bmtc/trip_updates
+    BMTC_GTFS_RT_VEHICLES_URL=http://127.0.0.1:8902/gtfs-rt/bmtc/vehicle_positions
+"""
+import argparse
+import csv
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from fastapi import FastAPI, HTTPException, Response
+from google.transit import gtfs_realtime_pb2
+
+from app.tools.gtfs_index import seconds_of_day
+
+FEEDS = ("trip_updates", "vehicle_positions")
+OCCUPANCY = [
+    gtfs_realtime_pb2.VehiclePosition.MANY_SEATS_AVAILABLE,
+    gtfs_realtime_pb2.VehiclePosition.FEW_SEATS_AVAILABLE,
+    gtfs_realtime_pb2.VehiclePosition.STANDING_ROOM_ONLY,
+]
+
+
+def _active_trips(feed_dir: str, now: int, window: int) -> Dict[str, List[Tuple[str, int]]]:
+    """Trips with a stop in [now - window, now + window], as ordered (stop_id, scheduled seconds)"""
+    by_trip: Dict[str, List[Tuple[int, str, int]]] = defaultdict(list)
+    with open(os.path.join(feed_dir, "stop_times.txt"), newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            seconds = seconds_of_day(row["arrival_time"])
+            if seconds is not None:
+                by_trip[row["trip_id"]].append((int(row["stop_sequence"]), row["stop_id"], seconds))
+    return {
+        trip_id: [(stop_id, seconds) for _, stop_id, seconds in sorted(rows)]
+        for trip_id, rows in by_trip.items()
+        if any(abs(seconds - now) <= window for _, _, seconds in rows)
+    }
+
+
+def _stop_coords(feed_dir: str) -> Dict[str, Tuple[float, float]]:
+    with open(os.path.join(feed_dir, "stops.txt"), newline="", encoding="utf-8") as f:
+        return {row["stop_id"]: (float(row["stop_lat"]), float(row["stop_lon"])) for row in csv.DictReader(f)}
+
+
+def synthesize(
+    gtfs_dir: str,
+    out_dir: str,
+    frames: int,
+    trips: int,
+    change_rate: float,
+    interval: float,
+    seed: int
+) -> Dict[str, int]:
+    """Record `frames` frames per operator; returns trips covered per operator"""
+    rng = random.Random(seed)
+    midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+    now = int(time.time() - midnight)
+    covered = {}
+
+    for operator in sorted(os.listdir(gtfs_dir)):
+        feed_dir = os.path.join(gtfs_dir, operator)
+        if not os.path.exists(os.path.join(feed_dir, "stop_times.txt")):
+            continue
+        active = _active_trips(feed_dir, now, 3600)
+        coords = _stop_coords(feed_dir)
+        chosen = rng.sample(sorted(active), min(trips, len(active)))
+        covered[operator] = len(chosen)
+
+        # Per trip: current delay (s), stop position, occupancy, cancelled
+        state = {
+            trip_id: {"delay": rng.randint(-60, 300), "position": 0, "occupancy": rng.choice(OCCUPANCY), "cancelled": False}
+            for trip_id in chosen
+        }
+        for feed in FEEDS:
+            os.makedirs(os.path.join(out_dir, operator, feed), exist_ok=True)
+
+        for frame in range(frames):
+            timestamp = int(midnight + now + frame * interval)
+            trip_updates = gtfs_realtime_pb2.FeedMessage()
+            vehicles = gtfs_realtime_pb2.FeedMessage()
+            for message in (trip_updates, vehicles):
+                message.header.gtfs_realtime_version = "2.0"
+                message.header.timestamp = timestamp
+
+            for trip_id in chosen:
+                trip = state[trip_id]
+                stops = active[trip_id]
+                if frame and rng.random() < change_rate and not trip["cancelled"]:
+                    trip["delay"] = max(-120, min(1800, trip["delay"] + rng.randint(-60, 120)))
+                    trip["occupancy"] = rng.choice(OCCUPANCY)
+                    trip["cancelled"] = rng.random() < 0.01
+                # The vehicle is at the last stop it should have reached by now
+                elapsed = now + frame * interval - trip["delay"]
+                trip["position"] = max(0, sum(1 for _, seconds in stops if seconds <= elapsed) - 1)
+
+                entity = trip_updates.entity.add()
+                entity.id = f"tu-{trip_id}"
+                entity.trip_update.trip.trip_id = trip_id
+                if trip["cancelled"]:
+                    entity.trip_update.trip.schedule_relationship = gtfs_realtime_pb2.TripDescriptor.CANCELED
+                    continue
+                stop_id, _ = stops[trip["position"]]
+                update = entity.trip_update.stop_time_update.add()
+                update.stop_id = stop_id
+                update.arrival.delay = trip["delay"]
+
+                entity = vehicles.entity.add()
+                entity.id = f"vp-{trip_id}"
+                entity.vehicle.trip.trip_id = trip_id
+                entity.vehicle.vehicle.id = f"V-{trip_id}"
+                lat, lng = coords.get(stop_id, (0.0, 0.0))
+                entity.vehicle.position.latitude = lat
+                entity.vehicle.position.longitude = lng
+                entity.vehicle.occupancy_status = trip["occupancy"]
+                entity.vehicle.timestamp = timestamp
+
+            for feed, message in zip(FEEDS, (trip_updates, vehicles)):
+                with open(os.path.join(out_dir, operator, feed, f"{frame:05d}.pb"), "wb") as f:
+                    f.write(message.SerializeToString())
+    return covered
+
+
+def load_recordings(recordings_dir: str) -> Dict[Tuple[str, str], List[bytes]]:
+    """(operator, feed) -> frames in order"""
+    recordings = {}
+    for operator in sorted(os.listdir(recordings_dir)):
+        for feed in FEEDS:
+            feed_dir = os.path.join(recordings_dir, operator, feed)
+            if not os.path.isdir(feed_dir):
+                continue
+            frames = []
+            for name in sorted(os.listdir(feed_dir)):
+                if name.endswith(".pb"):
+                    with open(os.path.join(feed_dir, name), "rb") as f:
+                        frames.append(f.read())
+            if frames:
+                recordings[(operator, feed)] = frames
+    return recordings
+
+
+def create_app(recordings: Dict[Tuple[str, str], List[bytes]], interval: float) -> FastAPI:
+    app = FastAPI(title="GTFS-Realtime stand-in")
+    started = time.monotonic()
+    served: Counter = Counter()
+
+    def frame_number(frames: List[bytes]) -> int:
+        # Replays loop, so a long test keeps seeing changes
+        return int((time.monotonic() - started) / interval) % len(frames)
+
+    @app.get("/gtfs-rt/{operator}/{feed}")
+    async def feed(operator: str, feed: str):
+        frames = recordings.get((operator, feed))
+        if not frames:
+            raise HTTPException(status_code=404, detail="No recording for this feed")
+        served[(operator, feed)] += 1
+        return Response(content=frames[frame_number(frames)], media_type="application/x-protobuf")
+
+    @app.get("/__standin/stats")
+    async def stats():
+        return {
+            f"{operator}/{feed}": {
+                "frames": len(frames),
+                "current_frame": frame_number(frames),
+                "served": served[(operator, feed)],
+            }
+            for (operator, feed), frames in recordings.items()
+        }
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8902)
+    parser.add_argument("--recordings", required=True, help="Directory of recorded frames")
+    parser.add_argument("--interval", type=float, default=15.0, help="Seconds per frame")
+    parser.add_argument("--synthesize", metavar="GTFS_DIR", help="Record frames from this static feed root first")
+    parser.add_argument("--frames", type=int, default=40)
+    parser.add_argument("--trips", type=int, default=500, help="Trips with real-time data per operator")
+    parser.add_argument("--change-rate", dest="change_rate", type=float, default=0.2,
+                        help="Share of trips whose update changes between frames")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.synthesize:
+        covered = synthesize(
+            args.synthesize, args.recordings, args.frames, args.trips, args.change_rate, args.interval, args.seed
+        )
+        print(f"Recorded {args.frames} frames: {covered}")
+
+    uvicorn.run(create_app(load_recordings(args.recordings), args.interval), host=args.host, port=args.port,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Local ONDC gateway + provider (BPP) simulator for mobility search
+Acknowledges each /search at once, then has every simulated provider POST an
+on_search catalog to the caller's bap_uri after its own sampled latency.
+Provider count, latency distribution and drop rate are configurable and the
+RNG is seeded, so fan-out behaviour is reproducible.
+
+Usage (from backend/):
+    python -m standins.ondc_bpp --port 8901 --providers 40 --latency-ms 400 --drop-rate 0.05
+
+Then point the app at it:
+    ONDC_GATEWAY_URL=http://127.0.0.1:8901
+    ONDC_BAP_URI=http://127.0.0.1:8000/ondc
+"""
+import argparse
+import asyncio
+import math
+import random
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+from fastapi import FastAPI, Request
+
+from app.tools.distance_matrix import distance_engine, parse_coordinates
+
+PROVIDER_NAMES = [
+    "Namma Yatri", "Yatri Sathi", "Rapido", "Uber", "Ola", "BluSmart",
+    "Quick Ride", "Bharat Taxi", "Metro Cabs", "Auto Raja",
+]
+
+# (Beckn vehicle category, ₹ per km, ₹ base fare, average km/h)
+VEHICLES = [
+    ("AUTO_RICKSHAW", 15.0, 30, 20.0),
+    ("CAB", 22.0, 80, 22.0),
+    ("TWO_WHEELER", 8.0, 20, 28.0),
+]
+
+DEFAULT_DISTANCE_KM = 10.0  # When a stop has no GPS
+
+
+@dataclass
+class BPPConfig:
+    providers: int = 20
+    latency_ms: float = 400.0  # Median callback delay per provider
+    latency_sigma: float = 0.6  # Lognormal shape
+    drop_rate: float = 0.05  # Share of providers that never answer a search
+    items_per_provider: int = 2
+    seed: int = 42
+
+
+def _provider(index: int, seed: int) -> Dict[str, Any]:
+    """Fixed identity, vehicle mix and price multiplier for one provider"""
+    rng = random.Random(f"{seed}:provider:{index}")
+    base = PROVIDER_NAMES[index % len(PROVIDER_NAMES)]
+    return {
+        "id": f"P{index:03d}",
+        "name": base if index < len(PROVIDER_NAMES) else f"{base} {index // len(PROVIDER_NAMES) + 1}",
+        "bpp_id": f"bpp{index:03d}.standin.local",
+        "vehicles": rng.sample(VEHICLES, k=rng.randint(1, len(VEHICLES))),
+        "multiplier": rng.uniform(0.85, 1.25),
+    }
+
+
+def _trip_km(message: Dict[str, Any]) -> float:
+    stops = message.get("intent", {}).get("fulfillment", {}).get("stops", [])
+    coords = [parse_coordinates(s.get("location", {}).get("gps", "")) for s in stops]
+    if len(coords) < 2 or not coords[0] or not coords[-1]:
+        return DEFAULT_DISTANCE_KM
+    metres, _ = distance_engine.compute([coords[0]], [coords[-1]])
+    return float(metres[0, 0]) / 1000
+
+
+def on_search_payload(
+    provider: Dict[str, Any],
+    context: Dict[str, Any],
+    km: float,
+    items_per_provider: int
+) -> Dict[str, Any]:
+    """Beckn TRV10 on_search catalog with one item per offered vehicle"""
+    fulfillments, items = [], []
+    for n, (category, per_km, base_fare, speed) in enumerate(provider["vehicles"][:items_per_provider]):
+        fare = (base_fare + per_km * km) * provider["multiplier"]
+        fulfillments.append({"id": f"F{n}", "type": "DELIVERY", "vehicle": {"category": category}})
+        items.append({
+            "id": f"I{n}",
+            "descriptor": {"code": "RIDE", "name": category.replace("_", " ").title()},
+            "price": {"currency": "INR", "value": f"{fare:.2f}"},
+            "fulfillment_ids": [f"F{n}"],
+            "time": {"duration": f"PT{max(1, math.ceil(km / speed * 60))}M"},
+        })
+    return {
+        "context": {
+            **context,
+            "action": "on_search",
+            "bpp_id": provider["bpp_id"],
+            "bpp_uri": f"http://{provider['bpp_id']}",
+        },
+        "message": {"catalog": {
+            "descriptor": {"name": "Mobility Catalog"},
+            "providers": [{
+                "id": provider["id"],
+                "descriptor": {"name": provider["name"]},
+                "fulfillments": fulfillments,
+                "items": items,
+            }],
+        }},
+    }
+
+
+def create_app(config: BPPConfig) -> FastAPI:
+    """Build the simulator ASGI app"""
+    providers = [_provider(i, config.seed) for i in range(config.providers)]
+    rng = random.Random(config.seed)
+    stats: Counter = Counter()
+    pending = set()
+    client: Optional[httpx.AsyncClient] = None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        nonlocal client
+        async with httpx.AsyncClient(timeout=5.0) as http:
+            client = http
+            yield
+            for task in pending:
+                task.cancel()
+
+    app = FastAPI(title="Namma Guide ONDC BPP stand-in", lifespan=lifespan)
+
+    async def reply(delay: float, callback_url: str, payload: Dict[str, Any]):
+        await asyncio.sleep(delay)
+        try:
+            response = await client.post(callback_url, json=payload)
+            response.raise_for_status()
+            stats["callbacks_sent"] += 1
+        except httpx.HTTPError:
+            stats["callbacks_failed"] += 1
+
+    @app.post("/search")
+    async def search(request: Request):
+        body = await request.json()
+        context = body.get("context", {})
+        if context.get("action") != "search" or not context.get("bap_uri"):
+            return {"message": {"ack": {"status": "NACK"}},
+                    "error": {"type": "CONTEXT-ERROR", "message": "Expected a search with bap_uri"}}
+
+        stats["searches"] += 1
+        km = _trip_km(body.get("message", {}))
+        callback_url = f"{context['bap_uri'].rstrip('/')}/on_search"
+
+        for provider in providers:
+            if rng.random() < config.drop_rate:
+                stats["callbacks_dropped"] += 1
+                continue
+            delay = config.latency_ms * math.exp(rng.gauss(0, config.latency_sigma)) / 1000
+            payload = on_search_payload(provider, context, km, config.items_per_provider)
+            task = asyncio.create_task(reply(delay, callback_url, payload))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        return {"message": {"ack": {"status": "ACK"}}}
+
+    @app.get("/__standin/stats")
+    async def get_stats():
+        return {**stats, "in_flight": len(pending), "providers": len(providers)}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--providers", type=int, default=20)
+    parser.add_argument("--latency-ms", dest="latency_ms", type=float, default=400.0)
+    parser.add_argument("--latency-sigma", dest="latency_sigma", type=float, default=0.6)
+    parser.add_argument("--drop-rate", dest="drop_rate", type=float, default=0.05)
+    parser.add_argument("--items-per-provider", dest="items_per_provider", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = BPPConfig(
+        providers=args.providers,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        drop_rate=args.drop_rate,
+        items_per_provider=args.items_per_provider,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Deterministic local stand-in for Mappls, Google Custom Search and GTFS hosting
+Implements the endpoints MapplsService, the discovery route and GTFSService
+call, with a seeded RNG and configurable latency, error and 429 injection, so
+the real HTTP code paths can be load-tested without network.
+
+Usage (from backend/):
+    python -m standins.upstream --port 8900 --latency-ms 60 --error-rate 0.01 \\
+        --rate-limit-rps 200 --gtfs-dir /tmp/gtfs
+
+Then point the app at it:
+    MAPPLS_BASE_URL=http://127.0.0.1:8900
+    GOOGLE_CSE_URL=http://127.0.0.1:8900/customsearch/v1
+    BMTC_GTFS_URL=http://127.0.0.1:8900/gtfs/bmtc
+    BMRCL_GTFS_URL=http://127.0.0.1:8900/gtfs/bmrcl
+
+Per-endpoint profiles can be given as JSON with --config, e.g.
+    {"seed": 7, "default": {"latency_ms": 40},
+     "endpoints": {"distance_matrix": {"latency_ms": 250, "throttle_rate": 0.05}}}
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
+from fastapi.staticfiles import StaticFiles
+
+from app.tools.mock_mappls import MockMapplsService
+
+ENDPOINTS = ["auth_token", "route", "place_search", "nearby", "distance_matrix", "custom_search", "gtfs"]
+
+# Bengaluru bounding box for places not in the known POI list
+LAT_MIN, LAT_MAX = 12.80, 13.15
+LNG_MIN, LNG_MAX = 77.45, 77.80
+
+SPEED_KMH = {"driving": 22.0, "biking": 18.0}
+ROAD_DETOUR = 1.3  # Road distance vs great-circle distance
+
+
+@dataclass
+class EndpointProfile:
+    """Latency and fault model for one endpoint"""
+    latency_ms: float = 40.0  # Median latency
+    latency_sigma: float = 0.5  # Lognormal shape: p99 is about median * e^(2.33 * sigma)
+    error_rate: float = 0.0  # Share of requests answered with 503
+    throttle_rate: float = 0.0  # Share of requests answered with 429 regardless of load
+    rate_limit_rps: Optional[float] = None  # Token bucket; excess requests get 429
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], base: "EndpointProfile" = None) -> "EndpointProfile":
+        values = {f.name: getattr(base, f.name) for f in fields(cls)} if base else {}
+        values.update({k: v for k, v in data.items() if k in {f.name for f in fields(cls)}})
+        return cls(**values)
+
+
+@dataclass
+class StandinConfig:
+    seed: int = 42
+    default: EndpointProfile = field(default_factory=EndpointProfile)
+    endpoints: Dict[str, EndpointProfile] = field(default_factory=dict)
+    gtfs_dir: Optional[str] = None
+    token_ttl: int = 3600
+
+    def profile(self, endpoint: str) -> EndpointProfile:
+        return self.endpoints.get(endpoint, self.default)
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class FaultInjector:
+    """Samples latency and failures from a seeded RNG"""
+
+    def __init__(self, config: StandinConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.buckets = {
+            name: _TokenBucket(config.profile(name).rate_limit_rps)
+            for name in ENDPOINTS if config.profile(name).rate_limit_rps
+        }
+        self.stats: Counter = Counter()
+
+    async def apply(self, endpoint: str):
+        profile = self.config.profile(endpoint)
+        self.stats[(endpoint, "requests")] += 1
+
+        bucket = self.buckets.get(endpoint)
+        if (bucket and not bucket.take()) or self.rng.random() < profile.throttle_rate:
+            self.stats[(endpoint, "429")] += 1
+            raise HTTPException(status_code=429, detail="Rate limit exceeded", headers={"Retry-After": "1"})
+
+        latency = profile.latency_ms * math.exp(self.rng.gauss(0, profile.latency_sigma)) / 1000
+        failed = self.rng.random() < profile.error_rate
+        await asyncio.sleep(latency)
+
+        if failed:
+            self.stats[(endpoint, "503")] += 1
+            raise HTTPException(status_code=503, detail="Injected upstream failure")
+        self.stats[(endpoint, "200")] += 1
+
+
+def _haversine_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def create_app(config: StandinConfig) -> FastAPI:
+    """Build the stand-in ASGI app"""
+    app = FastAPI(title="Namma Guide upstream stand-in")
+    faults = FaultInjector(config)
+    pois = MockMapplsService().bengaluru_pois
+    issued_tokens: Dict[str, float] = {}
+
+    def place_rng(text: str) -> random.Random:
+        # Keyed by text, so answers do not depend on request order
+        return random.Random(f"{config.seed}:{text.lower().strip()}")
+
+    def locate(text: str) -> Tuple[float, float, str]:
+        """Coordinates and display name for a place name or "lat,lng" string"""
+        parts = text.split(",")
+        if len(parts) == 2:
+            try:
+                return float(parts[0]), float(parts[1]), text
+            except ValueError:
+                pass
+        key = text.lower().strip().replace(" ", "_")
+        if key in pois:
+            return pois[key]
+        rng = place_rng(text)
+        return rng.uniform(LAT_MIN, LAT_MAX), rng.uniform(LNG_MIN, LNG_MAX), f"{text.title()}, Bengaluru"
+
+    def require_token(authorization: Optional[str]):
+        token = (authorization or "").removeprefix("Bearer ").strip()
+        if issued_tokens.get(token, 0) < time.time():
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    @app.post("/advancedmaps/v1/auth/token")
+    async def auth_token(request: Request):
+        await faults.apply("auth_token")
+        form = parse_qs((await request.body()).decode())
+        if form.get("grant_type") != ["client_credentials"]:
+            raise HTTPException(status_code=400, detail="Unsupported grant_type")
+        token = f"standin-{faults.rng.getrandbits(64):016x}"
+        issued_tokens[token] = time.time() + config.token_ttl
+        return {"access_token": token, "token_type": "bearer", "expires_in": config.token_ttl}
+
+    @app.get("/advancedmaps/v1/{api_key}/route")
+    async def route(
+        api_key: str,
+        start: str,
+        destination: str,
+        profile: str = "driving",
+        steps: str = "true",
+        traffic: str = "true",
+        authorization: Optional[str] = Header(None)
+    ):
+        require_token(authorization)
+        await faults.apply("route")
+        origin, dest = locate(start), locate(destination)
+        distance = _haversine_km(origin[:2], dest[:2]) * ROAD_DETOUR * 1000
+        duration = distance / 1000 / SPEED_KMH.get(profile, 22.0) * 3600
+        rng = place_rng(f"{start}->{destination}")
+        traffic_duration = duration * (rng.uniform(1.1, 1.8) if traffic == "true" else 1.0)
+        legs = [{"steps": [
+            {"instruction": f"Head towards {dest[2]}", "distance": distance * 0.3, "duration": duration * 0.3},
+            {"instruction": "Continue on Outer Ring Road", "distance": distance * 0.5, "duration": duration * 0.5},
+            {"instruction": f"Arrive at {dest[2]}", "distance": distance * 0.2, "duration": duration * 0.2},
+        ] if steps == "true" else []}]
+        return {"routes": [{
+            "distance": round(distance),
+            "duration": round(duration),
+            "traffic_duration": round(traffic_duration),
+            "geometry": "".join(rng.choices("abcdefghijklmnopqrstuvwxyz_{}~", k=120)),
+            "legs": legs,
+        }]}
+
+    @app.get("/advancedmaps/v1/{api_key}/place_search")
+    async def place_search(
+        api_key: str,
+        query: str,
+        location: Optional[str] = None,
+        authorization: Optional[str] = Header(None)
+    ):
+        require_token(authorization)
+        await faults.apply("place_search")
+        lat, lng, name = locate(query)
+        ref = locate(location) if location else None
+        results = []
+        for i in range(5):
+            rng = place_rng(f"{query}#{i}")
+            plat, plng = (lat, lng) if i == 0 else (lat + rng.uniform(-0.02, 0.02), lng + rng.uniform(-0.02, 0.02))
+            results.append({
+                "eLoc": f"SI{rng.randint(0, 10**6):06d}",
+                "placeName": name if i == 0 else f"{name.split(',')[0]} {i}",
+                "placeAddress": f"{name}, Karnataka",
+                "latitude": round(plat, 6),
+                "longitude": round(plng, 6),
+                "type": "locality" if i == 0 else "POI",
+                "distance": round(_haversine_km(ref[:2], (plat, plng)) * 1000) if ref else None,
+            })
+        return {"results": results}
+
+    @app.get("/advancedmaps/v1/{api_key}/nearby")
+    async def nearby(
+        api_key: str,
+        keywords: str,
+        refLocation: str,
+        radius: int = 1000,
+        authorization: Optional[str] = Header(None)
+    ):
+        require_token(authorization)
+        await faults.apply("nearby")
+        lat, lng, _ = locate(refLocation)
+        rng = place_rng(f"{keywords}@{refLocation}")
+        places = []
+        for i in range(8):
+            plat = lat + rng.uniform(-1, 1) * radius / 111_000
+            plng = lng + rng.uniform(-1, 1) * radius / 111_000
+            places.append({
+                "eLoc": f"NB{rng.randint(0, 10**6):06d}",
+                "placeName": f"{keywords.title()} {i + 1}",
+                "placeAddress": "Bengaluru, Karnataka",
+                "latitude": round(plat, 6),
+                "longitude": round(plng, 6),
+                "distance": round(_haversine_km((lat, lng), (plat, plng)) * 1000),
+                "rating": round(rng.uniform(3.5, 4.8), 1),
+            })
+        places.sort(key=lambda p: p["distance"])
+        return {"suggestedLocations": places}
+
+    @app.post("/advancedmaps/v1/{api_key}/distance_matrix/driving")
+    async def distance_matrix(api_key: str, request: Request, authorization: Optional[str] = Header(None)):
+        require_token(authorization)
+        await faults.apply("distance_matrix")
+        body = await request.json()
+        origins: List[str] = body.get("origins", [])
+        destinations: List[str] = body.get("destinations", [])
+        rows = []
+        for o in origins:
+            a = locate(o)
+            elements = []
+            for d in destinations:
+                km = _haversine_km(a[:2], locate(d)[:2]) * ROAD_DETOUR
+                minutes = km / SPEED_KMH["driving"] * 60
+                elements.append({
+                    "distance": {"value": round(km * 1000), "text": f"{km:.1f} km"},
+                    "duration": {"value": round(minutes * 60), "text": f"{int(minutes)} mins"},
+                })
+            rows.append({"elements": elements})
+        return {"results": {"rows": rows}}
+
+    @app.get("/customsearch/v1")
+    async def custom_search(q: str, key: str = "", cx: str = "", num: int = 5):
+        await faults.apply("custom_search")
+        rng = place_rng(q)
+        topic = q.split(" in ")[0].title()
+        return {"items": [
+            {
+                "title": f"{topic} - Result {i + 1}",
+                "snippet": f"Popular spot for {topic.lower()} rated {rng.uniform(3.8, 4.9):.1f}",
+                "link": f"https://example.invalid/{rng.getrandbits(32):08x}",
+            }
+            for i in range(min(num, 10))
+        ]}
+
+    @app.get("/__standin/stats")
+    async def stats():
+        summary: Dict[str, Dict[str, int]] = {}
+        for (endpoint, outcome), count in faults.stats.items():
+            summary.setdefault(endpoint, {})[outcome] = count
+        return summary
+
+    if config.gtfs_dir:
+        files = StaticFiles(directory=config.gtfs_dir)
+
+        @app.middleware("http")
+        async def gtfs_faults(request: Request, call_next):
+            if request.url.path.startswith("/gtfs/"):
+                try:
+                    await faults.apply("gtfs")
+                except HTTPException as e:
+                    return JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+            return await call_next(request)
+
+        app.mount("/gtfs", files, name="gtfs")
+
+    return app
+
+
+def load_config(args: argparse.Namespace) -> StandinConfig:
+    data: Dict[str, Any] = {}
+    if args.config:
+        with open(args.config) as f:
+            data = json.load(f)
+
+    default = EndpointProfile.from_dict(data.get("default", {}))
+    for name in ("latency_ms", "latency_sigma", "error_rate", "throttle_rate", "rate_limit_rps"):
+        value = getattr(args, name)
+        if value is not None:
+            setattr(default, name, value)
+
+    return StandinConfig(
+        seed=args.seed if args.seed is not None else data.get("seed", 42),
+        default=default,
+        endpoints={
+            name: EndpointProfile.from_dict(profile, base=default)
+            for name, profile in data.get("endpoints", {}).items()
+        },
+        gtfs_dir=args.gtfs_dir or data.get("gtfs_dir"),
+    )
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--config", help="JSON file with default and per-endpoint profiles")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--latency-ms", dest="latency_ms", type=float, default=None)
+    parser.add_argument("--latency-sigma", dest="latency_sigma", type=float, default=None)
+    parser.add_argument("--error-rate", dest="error_rate", type=float, default=None)
+    parser.add_argument("--throttle-rate", dest="throttle_rate", type=float, default=None)
+    parser.add_argument("--rate-limit-rps", dest="rate_limit_rps", type=float, default=None)
+    parser.add_argument("--gtfs-dir", help="Feed root with bmtc/ and bmrcl/ (see benchmarks.gtfs_synth)")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(load_config(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()